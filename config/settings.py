@@ -1,5 +1,6 @@
 from pydantic.v1 import BaseSettings, Field
 from pathlib import Path
+from typing import Literal
 
 
 class Settings(BaseSettings):
@@ -14,12 +15,78 @@ class Settings(BaseSettings):
         description="Port on which the gRPC service is exposed",
         env="GRPC_PORT",
     )
+    grpc_stream_mode: Literal["low-latency", "balanced", "throughput"] = Field(
+        default="balanced",
+        description="StreamChat coalescing when the client sends no x-stream-mode",
+    )
+    grpc_coalesce_ms: float = Field(
+        default=25.0, description="Max delay before buffered tokens are sent (balanced)"
+    )
+    grpc_coalesce_tokens: int = Field(
+        default=8, description="Tokens per ChatResponse before flushing (balanced)"
+    )
+    grpc_throughput_coalesce_ms: float = Field(
+        default=150.0,
+        description="Max delay before buffered tokens are sent (throughput)",
+    )
+    grpc_throughput_coalesce_tokens: int = Field(
+        default=64, description="Tokens per ChatResponse before flushing (throughput)"
+    )
+    grpc_compression: Literal["none", "gzip", "deflate"] = Field(
+        default="none",
+        description="Default response compression (clients may override per call)",
+    )
 
     # === Local model settings ===
     model_dir: Path = Field(
         default=Path.home() / ".secu-genie" / "models",
         description="Directory where user-downloaded GGUF models are stored",
     )
+    llm_backend: Literal["llama_cpp", "echo"] = Field(
+        default="echo",
+        description=(
+            "Chat backend: an echo stub, or local GGUF models via llama.cpp "
+            "(set LLM_BACKEND=llama_cpp once models are in model_dir)"
+        ),
+    )
+    llm_max_resident_models: int = Field(
+        default=2, description="GGUF models kept loaded (least recently used evicted)"
+    )
+    llm_max_batch_sequences: int = Field(
+        default=8, description="Chat sequences decoded together per model step"
+    )
+    llm_batch_tokens: int = Field(
+        default=512,
+        description="Tokens per decode step (new tokens plus prompt chunks)",
+    )
+    llm_max_queued_requests: int = Field(
+        default=64,
+        description="Chats waiting for a decode slot before RESOURCE_EXHAUSTED",
+    )
+    llm_worker_idle_seconds: float = Field(
+        default=30.0,
+        description="Idle time before a model's decode worker frees its KV cache",
+    )
+    llm_prefix_cache_bytes: int = Field(
+        default=512 * 1024 * 1024,
+        description="KV state kept for recent conversations (0 disables)",
+    )
+    llm_prefix_block_tokens: int = Field(
+        default=64,
+        description="Granularity (and minimum length) of cached prompt prefixes",
+    )
+    llm_context_size: int = Field(
+        default=4096, description="Context window per chat sequence"
+    )
+    llm_threads: int = Field(
+        default=0, description="llama.cpp CPU threads per model (0 = auto)"
+    )
+    llm_gpu_layers: int = Field(
+        default=0, description="Layers offloaded to the GPU (-1 = all)"
+    )
+    llm_max_tokens: int = Field(default=512, description="Maximum tokens per answer")
+    llm_temperature: float = Field(default=0.7, description="Sampling temperature")
+    llm_top_k: int = Field(default=40, description="Sample from the k likeliest tokens")
 
     # === FAISS index settings ===
     faiss_index_dir: Path = Field(
@@ -29,6 +96,211 @@ class Settings(BaseSettings):
     faiss_index_file: str = Field(
         default="index.faiss", description="Filename for the FAISS index"
     )
+    faiss_index_type: Literal["flat", "ivf_flat", "ivf_pq", "hnsw"] = Field(
+        default="flat",
+        description="ANN index used for new stores and by scripts.train_index",
+    )
+    faiss_ivf_nlist: int = Field(
+        default=1024, description="Inverted lists (centroids) for IVF indexes"
+    )
+    faiss_pq_m: int = Field(
+        default=48, description="PQ sub-quantizers; must divide the embedding dim"
+    )
+    faiss_pq_nbits: int = Field(default=8, description="Bits per PQ sub-quantizer")
+    faiss_hnsw_m: int = Field(default=32, description="HNSW neighbours per node")
+    faiss_hnsw_ef_construction: int = Field(
+        default=200, description="HNSW candidate list size while building"
+    )
+    faiss_nprobe: int = Field(
+        default=16, description="Default IVF lists visited per query"
+    )
+    faiss_ef_search: int = Field(
+        default=64, description="Default HNSW candidate list size per query"
+    )
+    faiss_train_sample: int = Field(
+        default=100_000, description="Maximum vectors used to train IVF indexes"
+    )
+    faiss_delta_rows: int = Field(
+        default=4096,
+        description="Rows per in-memory delta index (each upsert copies the open one)",
+    )
+
+    # === Collections ===
+    default_collection: str = Field(
+        default="default",
+        description="Collection used by uploads and chats that name none",
+    )
+    collection_memory_bytes: int = Field(
+        default=2 * 1024**3,
+        description="Estimated memory of open collections before LRU ones are closed",
+    )
+
+    # === Hybrid search ===
+    search_mode: Literal["dense", "lexical", "hybrid"] = Field(
+        default="dense",
+        description="Retrieval: ANN only, BM25 only, or both fused by reciprocal rank "
+        "(lexical and hybrid scores are rank-based, not L2 distances)",
+    )
+    hybrid_candidates: int = Field(
+        default=50, description="Candidates taken from each ranking before fusion"
+    )
+    hybrid_rrf_k: int = Field(
+        default=60, description="Reciprocal rank fusion constant (higher = flatter)"
+    )
+
+    # === Embedding engine settings ===
+    embedding_model: str = Field(
+        default="sentence-transformers/all-MiniLM-L6-v2",
+        description="Hugging Face id of the embedding model (and chunk tokenizer)",
+    )
+    embedding_backend: Literal["torch", "torch_int8", "onnx"] = Field(
+        default="torch",
+        description="Inference backend; torch_int8 and onnx apply to CPU only",
+    )
+    embedding_onnx_file: str | None = Field(
+        default=None,
+        description="ONNX file inside the model repo, e.g. onnx/model_qint8_avx512.onnx",
+    )
+    embedding_device: str | None = Field(
+        default=None, description="Torch device for embeddings (auto when unset)"
+    )
+    embedding_threads: int = Field(
+        default=0, description="Torch intra-op threads for CPU inference (0 = auto)"
+    )
+    embedding_batch_size: int = Field(
+        default=0,
+        description="Fixed texts per forward pass (0 sizes batches from free memory)",
+    )
+    embedding_max_batch_size: int = Field(
+        default=256, description="Upper bound for dynamically sized batches"
+    )
+    embedding_memory_fraction: float = Field(
+        default=0.25,
+        description="Share of free RAM/VRAM a single forward pass may use",
+    )
+
+    # === Embedding cache settings ===
+    embedding_cache_enabled: bool = Field(
+        default=True, description="Cache embeddings by model and text hash"
+    )
+    embedding_cache_memory_items: int = Field(
+        default=10_000, description="Vectors kept in the in-memory LRU tier"
+    )
+    embedding_cache_disk_items: int = Field(
+        default=100_000,
+        description="Rows in the memory-mapped on-disk tier (0 disables it)",
+    )
+
+    # === Write-ahead log settings ===
+    wal_segment_max_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        description="Rotate the active WAL segment once it grows past this size",
+    )
+    wal_compact_bytes: int = Field(
+        default=128 * 1024 * 1024,
+        description="Total WAL size that triggers a background snapshot compaction",
+    )
+    wal_fsync: bool = Field(
+        default=True, description="fsync every WAL append before acknowledging it"
+    )
+    tombstone_compact_ratio: float = Field(
+        default=0.2,
+        description="Share of deleted rows that triggers a compaction dropping them",
+    )
+    reader_refresh_seconds: float = Field(
+        default=2.0,
+        description="How often a store opened read-only (another process is its "
+        "writer) checks for a newer snapshot",
+    )
+
+    # === Ingestion pipeline settings ===
+    ingest_executor: Literal["thread", "process"] = Field(
+        default="thread",
+        description="Pool type for the CPU-bound load and split stages",
+    )
+    ingest_load_workers: int = Field(
+        default=2, description="Concurrent workers for the load and split stages"
+    )
+    ingest_embed_workers: int = Field(
+        default=1, description="Concurrent workers for the embedding stage"
+    )
+    ingest_queue_size: int = Field(
+        default=8, description="Capacity of the bounded queue between two stages"
+    )
+    ingest_max_pending: int = Field(
+        default=32,
+        description="Files admitted to the pipeline before uploads are rejected with 429",
+    )
+    ingest_batch_size: int = Field(
+        default=256, description="Chunks per embed/index micro-batch"
+    )
+    ingest_stream_batches: int = Field(
+        default=2,
+        description="Chunk batches a loader may produce ahead of the embed stage",
+    )
+    ingest_page_workers: int = Field(
+        default=0,
+        description="Processes parsing PDF pages, XLSX sheets and PPTX slides (0 = CPUs, 1 = off)",
+    )
+    ingest_pages_per_task: int = Field(
+        default=8, description="Pages, sheets or slides parsed per page-worker task"
+    )
+    upload_spool_chunk_bytes: int = Field(
+        default=1024 * 1024, description="Bytes read per step when spooling uploads"
+    )
+
+    # === Batch ingestion jobs ===
+    job_workers: int = Field(
+        default=1, description="Batch upload jobs processed concurrently"
+    )
+    job_max_queued: int = Field(
+        default=16,
+        description="Batch jobs waiting to run before /upload/batch returns 429",
+    )
+    job_history_size: int = Field(
+        default=256, description="Finished jobs kept in memory for status polling"
+    )
+    job_commit_chunks: int = Field(
+        default=4096,
+        description="Embedded chunks (with their vectors) a batch job holds before "
+        "committing them in one WAL append",
+    )
+
+    # === Retrieval-augmented chat ===
+    rag_enabled: bool = Field(
+        default=True, description="Retrieve context and citations for StreamChat"
+    )
+    rag_top_k: int = Field(default=4, description="Chunks retrieved per chat prompt")
+    rag_timeout_seconds: float = Field(
+        default=2.0,
+        description="Answer without context if retrieval takes longer than this",
+    )
+    rag_workers: int = Field(
+        default=2, description="Threads embedding prompts and searching FAISS"
+    )
+    rag_snippet_chars: int = Field(
+        default=500, description="Maximum characters of chunk text per Citation"
+    )
+
+    # === Response cache ===
+    response_cache_enabled: bool = Field(
+        default=False, description="Answer near-duplicate chat prompts from cache"
+    )
+    response_cache_threshold: float = Field(
+        default=0.95, description="Minimum cosine similarity between prompts"
+    )
+    response_cache_ttl_seconds: float = Field(
+        default=24 * 3600, description="Age after which a cached answer is ignored"
+    )
+    response_cache_max_entries: int = Field(
+        default=1000, description="Cached answers kept (oldest evicted)"
+    )
+
+    # === Metrics ===
+    metrics_enabled: bool = Field(
+        default=True,
+        description="Record stage timings and serve them on /metrics (Prometheus)",
+    )
 
     # === Chunking parameters ===
     chunk_size: int = Field(
@@ -37,6 +309,10 @@ class Settings(BaseSettings):
     chunk_overlap: int = Field(
         default=200, description="Overlap characters between chunks"
     )
+    chunk_max_tokens: int = Field(
+        default=256,
+        description="Embedder window in tokens; longer chunks are cut (0 = chars only)",
+    )
 
     # === Cloud Keys ===
     openai_api_key: str | None = Field(
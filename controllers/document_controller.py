@@ -0,0 +1,41 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from controllers.file_controller import (
+    COLLECTION_QUERY,
+    collections,
+    resolve_collection,
+    store_locked,
+)
+from models.delete_response import DeleteResponse
+from services.collection_service import CollectionNotFoundError
+from services.storage.writer_lock import StoreLockedError
+
+document_controller = APIRouter()
+
+
+@document_controller.delete(
+    path="/documents/{source:path}",
+    response_model=DeleteResponse,
+    summary="Delete every indexed chunk of an uploaded document",
+    responses={
+        400: {"description": "Invalid collection name"},
+        404: {"description": "Unknown collection or no indexed chunks for this source"},
+        503: {"description": "Another process is the collection's writer"},
+    },
+)
+async def delete_document(source: str, collection: Optional[str] = COLLECTION_QUERY):
+    collection = resolve_collection(collection)
+    try:
+        async with collections.lease_async(collection) as store:
+            # Deleted chunks disappear from search at once; compaction reclaims them
+            removed = await asyncio.to_thread(store.delete_source, source)
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except StoreLockedError as e:
+        raise store_locked(e)
+    if not removed:
+        raise HTTPException(status_code=404, detail=f"Unknown document: {source}")
+    return DeleteResponse(
+        source=source, collection=collection, num_chunks_deleted=removed
+    )
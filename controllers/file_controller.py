@@ -1,34 +1,157 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+import os
+from typing import Iterable, List, Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from config.settings import settings
+from models.job import JobStatus
 from models.upload_response import UploadResponse
 from services import file_service
-from services.vector_service import VectorService
+from services.collection_service import (
+    CollectionManager,
+    InvalidCollectionError,
+    collection_path,
+)
+from services.ingest_pipeline import IngestionPipeline, PipelineFullError, StageError
+from services.job_service import JobQueueFullError, JobScheduler
+from services.storage.writer_lock import StoreLockedError
 
-vector_service = VectorService()
+collections = CollectionManager()
+ingest_pipeline = IngestionPipeline()
+job_scheduler = JobScheduler(ingest_pipeline, collections)
 file_controller = APIRouter()
 
+COLLECTION_QUERY = Query(
+    None, description="Target collection (settings.default_collection when omitted)"
+)
+
+
+def resolve_collection(collection: Optional[str]) -> str:
+    """Collection name for a request, or 400 if it is not a valid name."""
+    collection = collection or settings.default_collection
+    try:
+        collection_path(collection)
+    except InvalidCollectionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return collection
+
+
+def store_locked(e: StoreLockedError) -> HTTPException:
+    """503 for a write to a collection another process is the writer of."""
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+
+def _discard(paths: Iterable[str]) -> None:
+    """Remove spooled uploads that no pipeline or job took over."""
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
 
 @file_controller.post(
     path="/upload",
     response_model=UploadResponse,
     summary="Upload a document, ingest it into chunks, and index with FAISS",
+    responses={
+        400: {"description": "Invalid collection name"},
+        429: {"description": "Ingestion pipeline is full; retry later"},
+        503: {"description": "Another process is the collection's writer"},
+    },
 )
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(
+    file: UploadFile = File(...), collection: Optional[str] = COLLECTION_QUERY
+):
+    collection = resolve_collection(collection)
+    suffix, _ = file_service.resolve_loader(file.filename)
+    if ingest_pipeline.pending >= settings.ingest_max_pending:
+        raise HTTPException(
+            status_code=429,
+            detail="Ingestion queue is full",
+            headers={"Retry-After": "5"},
+        )
+
     try:
-        chunks = await file_service.ingest_file(file)  # Break into chunks
-    except HTTPException:
-        raise
+        tmp_path = await file_service.spool_upload(file, suffix)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ingestion failed: {e}")
 
+    handed_over = False
     try:
-        vector_service.upsert(chunks=chunks)  # Embed into FAISS
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Indexing failed: {e}")
+        # Load → split → embed → index, all off the event loop; the lease
+        # keeps the collection open until its chunks are indexed
+        async with collections.lease_async(collection, create=True) as store:
+            store.require_writer()
+            handed_over = True  # `submit` removes the file whatever happens
+            result = await ingest_pipeline.submit(
+                tmp_path, file.filename, suffix, store
+            )
+    except StoreLockedError as e:
+        raise store_locked(e)
+    except PipelineFullError as e:
+        raise HTTPException(
+            status_code=429, detail=str(e), headers={"Retry-After": "5"}
+        )
+    except StageError as e:
+        if isinstance(e.error, StoreLockedError):
+            raise store_locked(e.error)
+        if e.stage in ("embed", "index"):
+            raise HTTPException(status_code=500, detail=f"Indexing failed: {e.error}")
+        raise HTTPException(status_code=500, detail=f"Ingestion failed: {e.error}")
+    finally:
+        if not handed_over:
+            _discard([tmp_path])
 
     # TODO: Add support for Pinecone
 
     return UploadResponse(
         filename=file.filename,
-        num_chunks_indexed=len(chunks),
-        first_chunk_id=chunks[0].chunk_id if chunks else None,
+        collection=collection,
+        num_chunks_indexed=result.added,
+        num_chunks_skipped=result.skipped,
+        num_chunks_removed=result.removed,
+        first_chunk_id=result.first_chunk_id,
     )
+
+
+@file_controller.post(
+    path="/upload/batch",
+    response_model=JobStatus,
+    status_code=202,
+    summary="Upload many documents and ingest them as one background job",
+    responses={
+        400: {"description": "Invalid collection name or duplicate filenames"},
+        429: {"description": "Too many batch jobs queued; retry later"},
+        503: {"description": "Another process is the collection's writer"},
+    },
+)
+async def upload_batch(
+    files: List[UploadFile] = File(...), collection: Optional[str] = COLLECTION_QUERY
+):
+    collection = resolve_collection(collection)
+    # Validate every extension before spooling anything
+    suffixes = [file_service.resolve_loader(file.filename)[0] for file in files]
+    # Each file replaces the previous upload of its name
+    if len({file.filename for file in files}) < len(files):
+        raise HTTPException(
+            status_code=400, detail="A batch cannot contain the same filename twice"
+        )
+    try:
+        async with collections.lease_async(collection, create=True) as store:
+            store.require_writer()
+    except StoreLockedError as e:
+        raise store_locked(e)
+
+    specs, job = [], None
+    try:
+        for file, suffix in zip(files, suffixes):
+            tmp_path = await file_service.spool_upload(file, suffix)
+            specs.append((tmp_path, file.filename, suffix))
+        job = job_scheduler.submit(specs, collection)
+    except JobQueueFullError as e:
+        raise HTTPException(
+            status_code=429, detail=str(e), headers={"Retry-After": "5"}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ingestion failed: {e}")
+    finally:
+        if job is None:
+            _discard(path for path, _, _ in specs)
+    return job
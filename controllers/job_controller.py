@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException
+from controllers.file_controller import job_scheduler
+from models.job import JobStatus
+
+job_controller = APIRouter()
+
+
+@job_controller.get(
+    path="/jobs/{job_id}",
+    response_model=JobStatus,
+    summary="Poll the per-file progress of a batch ingestion job",
+)
+async def get_job(job_id: str):
+    job = job_scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
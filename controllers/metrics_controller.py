@@ -0,0 +1,46 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from config.settings import settings
+from controllers.file_controller import collections, ingest_pipeline
+from services import metrics
+from services.embedding_cache import CachedEmbeddings
+
+metrics_controller = APIRouter()
+
+
+def _open_total(size) -> float:
+    """Sum of `size(store)` over the open collections."""
+    return sum(size(store) for store in collections.open_services())
+
+
+# Sizes are read from the live objects only when /metrics is scraped
+metrics.INDEX_ROWS.set_function(lambda: _open_total(lambda s: s.num_rows))
+metrics.INDEX_DELETED_ROWS.set_function(
+    lambda: _open_total(lambda s: s.tombstones.count)
+)
+metrics.INDEX_SEGMENTS.set_function(lambda: _open_total(lambda s: s.num_segments))
+metrics.WAL_BYTES.set_function(lambda: _open_total(lambda s: s.wal_bytes))
+metrics.COLLECTIONS_OPEN.set_function(lambda: collections.num_open)
+metrics.COLLECTIONS_MEMORY_BYTES.set_function(lambda: collections.memory_bytes)
+metrics.INGEST_PENDING_FILES.set_function(lambda: ingest_pipeline.pending)
+if isinstance(collections.embedder, CachedEmbeddings):
+    embedding_cache = collections.embedder
+    metrics.observe_cache(
+        "embedding",
+        lambda: (
+            embedding_cache.hits_memory + embedding_cache.hits_disk,
+            embedding_cache.misses,
+        ),
+    )
+
+
+@metrics_controller.get(
+    path="/metrics",
+    response_class=PlainTextResponse,
+    summary="Prometheus metrics for ingestion, search and chat",
+    responses={404: {"description": "Metrics are disabled"}},
+)
+async def get_metrics():
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
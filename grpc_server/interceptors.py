@@ -0,0 +1,103 @@
+# backend/grpc_server/interceptors.py
+
+"""
+Server interceptor recording per-method RPC counts, status codes, duration
+and in-flight calls (see services.metrics).
+
+GRPCServer installs it only when settings.metrics_enabled is on, so a
+disabled server does not wrap any handler.
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+import grpc
+from grpc import aio
+from services import metrics
+
+
+def _status(context: aio.ServicerContext, default: grpc.StatusCode) -> str:
+    """Status set by the handler (e.g. via abort), else `default`."""
+    code = context.code()
+    if isinstance(code, grpc.StatusCode):
+        return code.name
+    return default.name
+
+
+class _Call:
+    """Bookkeeping for one RPC from the handler's start to its end."""
+
+    def __init__(self, method: str):
+        self.method = method
+        self.started = time.perf_counter()
+        metrics.GRPC_IN_FLIGHT.labels(method).inc()
+
+    def finish(self, code: str) -> None:
+        metrics.GRPC_IN_FLIGHT.labels(self.method).dec()
+        metrics.GRPC_REQUESTS.labels(self.method, code).inc()
+        metrics.GRPC_REQUEST_SECONDS.labels(self.method).observe(
+            time.perf_counter() - self.started
+        )
+
+
+class MetricsInterceptor(aio.ServerInterceptor):
+    """Wraps unary-unary and unary-stream handlers; others pass through."""
+
+    async def intercept_service(
+        self,
+        continuation: Callable[[grpc.HandlerCallDetails], Awaitable[Any]],
+        handler_call_details: grpc.HandlerCallDetails,
+    ) -> Optional[grpc.RpcMethodHandler]:
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            return None
+        # "/secugenie.proto.chat.ChatService/StreamChat" -> "StreamChat"
+        method = handler_call_details.method.rsplit("/", 1)[-1]
+
+        if handler.unary_stream is not None:
+            behavior = handler.unary_stream
+
+            async def unary_stream(request: Any, context: Any) -> AsyncIterator[Any]:
+                call = _Call(method)
+                code = None
+                try:
+                    async for response in behavior(request, context):
+                        yield response
+                except (asyncio.CancelledError, GeneratorExit):
+                    code = grpc.StatusCode.CANCELLED.name
+                    raise
+                except Exception:
+                    code = _status(context, grpc.StatusCode.UNKNOWN)
+                    raise
+                finally:
+                    call.finish(code or _status(context, grpc.StatusCode.OK))
+
+            return grpc.unary_stream_rpc_method_handler(
+                unary_stream,
+                request_deserializer=handler.request_deserializer,
+                response_serializer=handler.response_serializer,
+            )
+
+        if handler.unary_unary is not None:
+            behavior = handler.unary_unary
+
+            async def unary_unary(request: Any, context: Any) -> Any:
+                call = _Call(method)
+                code = None
+                try:
+                    return await behavior(request, context)
+                except asyncio.CancelledError:
+                    code = grpc.StatusCode.CANCELLED.name
+                    raise
+                except Exception:
+                    code = _status(context, grpc.StatusCode.UNKNOWN)
+                    raise
+                finally:
+                    call.finish(code or _status(context, grpc.StatusCode.OK))
+
+            return grpc.unary_unary_rpc_method_handler(
+                unary_unary,
+                request_deserializer=handler.request_deserializer,
+                response_serializer=handler.response_serializer,
+            )
+        return handler
@@ -4,15 +4,23 @@
 GRPCServer sets up and manages the lifecycle of our gRPC aio server.
 
 It:
-  1. Registers the ChatServiceServicer implementation.
+  1. Registers the ChatServiceServicer implementation, backed by a
+     Retriever and a ResponseCache over the CollectionManager, behind
+     the metrics interceptor when settings.metrics_enabled is on.
   2. Binds to settings.grpc_host:settings.grpc_port.
   3. Exposes start() and stop() methods for integration into FastAPI's lifespan.
 """
 
 from grpc import aio
 from config.settings import settings
+from grpc_server.interceptors import MetricsInterceptor
+from grpc_server.streaming import COMPRESSION
 from proto.chat_pb2_grpc import add_ChatServiceServicer_to_server
 from grpc_server.servicer import ChatServiceServicerImpl
+from services import metrics
+from services.collection_service import CollectionManager
+from services.response_cache import ResponseCache
+from services.retrieval_service import Retriever
 
 
 class GRPCServer:
@@ -21,13 +29,27 @@ class GRPCServer:
 
     Attributes:
         server (aio.Server): The underlying gRPC asynchronous server.
+        retriever (Retriever): Chat retrieval over the requested collection.
+        response_cache (ResponseCache): Answers for near-duplicate prompts.
     """
 
-    def __init__(self):
-        # Create an aio server instance
-        self.server = aio.server()
+    def __init__(self, collections: CollectionManager):
+        # Create an aio server instance; calls may still pick their own compression
+        self.server = aio.server(
+            compression=COMPRESSION[settings.grpc_compression],
+            interceptors=[MetricsInterceptor()] if settings.metrics_enabled else [],
+        )
+        self.retriever = Retriever(collections)
+        self.response_cache = ResponseCache(collections)
+        metrics.observe_cache(
+            "response",
+            lambda: (self.response_cache.hits, self.response_cache.misses),
+        )
         # Register our ChatService implementation on this server
-        add_ChatServiceServicer_to_server(ChatServiceServicerImpl(), self.server)
+        add_ChatServiceServicer_to_server(
+            ChatServiceServicerImpl(self.retriever, self.response_cache, collections),
+            self.server,
+        )
 
     async def start(self) -> None:
         """
@@ -55,4 +77,5 @@ class GRPCServer:
             grace (int): Maximum seconds to wait for ongoing RPCs to finish.
         """
         await self.server.stop(grace)
+        self.retriever.shutdown()
         print("🛑 gRPC server shut down")
@@ -1,7 +1,40 @@
+import asyncio
 import grpc
-from proto.chat_pb2 import ChatResponse
+import logging
+import time
+from contextlib import aclosing
+from typing import List, Tuple
+from config.settings import settings
+from models.chunk import Chunk
+from proto.chat_pb2 import ChatResponse, Citation
 from proto.chat_pb2_grpc import ChatServiceServicer
-from services.llm_service import stream_chat
+from grpc_server.streaming import call_compression, coalesce, stream_policy
+from services import llm_service, metrics
+from services.chat_scheduler import SchedulerFullError
+from services.collection_service import CollectionManager, collection_path
+from services.model_pool import BackendUnavailableError, ModelNotFoundError
+from services.response_cache import ResponseCache
+from services.retrieval_service import Retriever
+
+logger = logging.getLogger(__name__)
+
+
+def to_citations(hits: List[Tuple[Chunk, float]]) -> List[Citation]:
+    """
+    Convert search hits into Citation messages.
+
+    Hits come from Retriever.retrieve, already scored as a similarity
+    (higher is closer) for the configured search mode.
+    """
+    return [
+        Citation(
+            chunk_id=chunk.chunk_id,
+            source=chunk.source,
+            snippet=chunk.text[: settings.rag_snippet_chars],
+            score=score,
+        )
+        for chunk, score in hits
+    ]
 
 
 class ChatServiceServicerImpl(ChatServiceServicer):
@@ -10,30 +43,142 @@ class ChatServiceServicerImpl(ChatServiceServicer):
 
     The StreamChat method receives a ChatRequest and yields ChatResponse
     messages, streaming tokens as they become available or the final text.
+    Responses are grounded in chunks retrieved from the requested collection;
+    their citations go out first. With settings.response_cache_enabled,
+    answers to near-identical prompts come from a ResponseCache in a single
+    message.
     """
 
+    def __init__(
+        self,
+        retriever: Retriever,
+        response_cache: ResponseCache,
+        collections: CollectionManager,
+    ):
+        self.retriever = retriever
+        self.response_cache = response_cache
+        self.collections = collections
+
+    async def _cached_response(self, prompt, history, model_name, collection):
+        """ResponseCache lookup off the event loop; errors count as a miss."""
+        if not settings.response_cache_enabled:
+            return None
+        try:
+            return await asyncio.to_thread(
+                self.response_cache.get, prompt, history, model_name, collection
+            )
+        except Exception:
+            logger.exception("Response cache lookup failed")
+            return None
+
+    async def _cache_response(self, prompt, history, model_name, *args):
+        if not settings.response_cache_enabled:
+            return
+        try:
+            await asyncio.to_thread(
+                self.response_cache.put, prompt, history, model_name, *args
+            )
+        except Exception:
+            logger.exception("Response cache insert failed")
+
     async def StreamChat(self, request, context):
         """
         Server‐side streaming handler for chat.
 
+        Retrieval (prompt embedding + FAISS search, on a thread pool) runs
+        concurrently with model warm-up, so time-to-first-token grows by at
+        most the difference between the two, not by the retrieval latency.
+
+        Tokens are coalesced per the client's `x-stream-mode` metadata (see
+        grpc_server.streaming). Each yield waits for the previous message to
+        be written, so a slow reader gets bigger messages, not more of them.
+
         Args:
-            request (ChatRequest): Contains `prompt`, `history`, and `model`.
+            request (ChatRequest): Contains `prompt`, `history`, `model` and
+                `collection` (settings.default_collection when empty).
             context (grpc.aio.ServicerContext): RPC context (for metadata, cancellation).
 
         Yields:
             ChatResponse: One or more messages containing:
+              - cite: citations for the retrieved chunks (first message only)
               - token: incremental token(s) if streaming
               - final_text: complete answer on the last message
+            A cache hit sends citations and final_text together in one message.
         """
+        started = time.perf_counter()
         # Extract fields from the request
         prompt = request.prompt
         history = list(request.history)
         model_name = request.model
+        collection = request.collection or settings.default_collection
+        try:
+            collection_path(collection)
+        except ValueError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        if not self.collections.exists(collection):
+            await context.abort(
+                grpc.StatusCode.NOT_FOUND, f"Unknown collection: {collection}"
+            )
+        metadata = context.invocation_metadata()
+        compression = call_compression(metadata)
+        if compression is not None:
+            context.set_compression(compression)
+
+        # Near-duplicate question: skip retrieval and generation entirely
+        cached = await self._cached_response(prompt, history, model_name, collection)
+        if cached is not None:
+            metrics.CHAT_FIRST_TOKEN.observe(time.perf_counter() - started)
+            yield ChatResponse(
+                token="", final_text=cached.final_text, cite=to_citations(cached.hits)
+            )
+            metrics.CHAT_TOTAL.observe(time.perf_counter() - started)
+            return
+
+        # Retrieve context while the model warms up
+        corpus_version = self.response_cache.corpus_version(collection)
+        try:
+            hits, _ = await asyncio.gather(
+                self.retriever.retrieve(prompt, collection),
+                llm_service.warmup(model_name),
+            )
+        except ModelNotFoundError as e:
+            await context.abort(grpc.StatusCode.NOT_FOUND, str(e))
+        except BackendUnavailableError as e:
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(e))
+
+        # Let clients render sources before the first token arrives
+        if hits:
+            yield ChatResponse(token="", final_text="", cite=to_citations(hits))
 
         # Delegate to llm_service.stream_chat, which is an async generator
-        async for token, final_text in stream_chat(prompt, history, model_name):
-            # If we have a final_text, send it in the final response
-            if final_text:
-                yield ChatResponse(token="", final_text=final_text)
-            else:
-                yield ChatResponse(token=token, final_text="")
+        # Leaving this loop early (client cancelled) closes the stream, which
+        # frees the request's decode slot at the next batch step
+        chunks = [chunk for chunk, _ in hits]
+        stream = coalesce(
+            llm_service.stream_chat(prompt, history, model_name, context=chunks),
+            *stream_policy(metadata),
+        )
+        first = True
+        try:
+            async with aclosing(stream):
+                async for token, final_text in stream:
+                    if first:
+                        metrics.CHAT_FIRST_TOKEN.observe(time.perf_counter() - started)
+                        first = False
+                    # If we have a final_text, send it in the final response
+                    if final_text:
+                        yield ChatResponse(token="", final_text=final_text)
+                        await self._cache_response(
+                            prompt,
+                            history,
+                            model_name,
+                            collection,
+                            final_text,
+                            hits,
+                            corpus_version,
+                        )
+                    else:
+                        yield ChatResponse(token=token, final_text="")
+        except SchedulerFullError as e:
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
+        metrics.CHAT_TOTAL.observe(time.perf_counter() - started)
@@ -1,8 +1,10 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 import routes
+from controllers.file_controller import collections, ingest_pipeline, job_scheduler
 from config.settings import settings
 from grpc_server.server import GRPCServer
+from services import llm_service
 
 
 @asynccontextmanager
@@ -12,18 +14,23 @@ async def lifespan(fastApi: FastAPI):
       1. Ensures model & FAISS directories exist.
       2. Starts the gRPC server.
       3. Yields control to run FastAPI.
-      4. On shutdown, gracefully stops gRPC.
+      4. On shutdown, gracefully stops gRPC, stops batch jobs and the
+         ingestion pipeline, and closes every open collection.
     """
     settings.model_dir.mkdir(parents=True, exist_ok=True)  # Check for local models
     settings.faiss_index_dir.mkdir(
         parents=True, exist_ok=True
     )  # Check for local faiss pickle
-    grpc_server = GRPCServer()  # Instantiate gRPC
+    grpc_server = GRPCServer(collections)  # Instantiate gRPC
     await grpc_server.start()  # Start gRPC server
 
     yield
 
     await grpc_server.stop()  # Stop gRPC server on shutdown
+    llm_service.shutdown()  # Stop decode threads and unload local models
+    await job_scheduler.shutdown()  # Stop batch job workers
+    await ingest_pipeline.shutdown()  # Stop ingestion workers and pools
+    collections.close()  # Flush WALs and stop background compaction
 
 
 app = FastAPI(title="SecuGenie Backend", lifespan=lifespan)
@@ -1,7 +1,7 @@
 # backend/models/chunk.py
 
 from pydantic import BaseModel, Field
-from typing import Any, Dict
+from typing import Any, Dict, Tuple, Union
 
 
 class Chunk(BaseModel):
@@ -9,7 +9,7 @@ class Chunk(BaseModel):
     Represents a single text chunk extracted from an input document.
 
     Attributes:
-        chunk_id: A unique identifier for this chunk (e.g. UUID or hash).
+        chunk_id: Content-addressed identifier (hash of normalized text + source).
         text: The chunk’s raw text content.
         source: Original file path or URL where this chunk came from.
         type: File type/loader name (e.g., "pdf", "csv", "notion").
@@ -26,3 +26,53 @@ class Chunk(BaseModel):
         default_factory=dict,
         description="Additional loader-specific metadata for this chunk",
     )
+
+
+class ChunkRecord:
+    """
+    Unvalidated chunk passed between the splitter, the ingest stages and the
+    vector store; same fields as Chunk at a fraction of the construction
+    cost. Convert with `to_chunk()` where a chunk is returned from the API.
+    """
+
+    __slots__ = ("chunk_id", "text", "source", "type", "index", "metadata")
+
+    def __init__(
+        self,
+        chunk_id: str,
+        text: str,
+        source: str,
+        type: str,
+        index: int,
+        metadata: Dict[str, Any],
+    ):
+        self.chunk_id = chunk_id
+        self.text = text
+        self.source = source
+        self.type = type
+        self.index = index
+        self.metadata = metadata
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return ChunkRecord, (
+            self.chunk_id,
+            self.text,
+            self.source,
+            self.type,
+            self.index,
+            self.metadata,
+        )
+
+    def to_chunk(self) -> Chunk:
+        return Chunk(
+            chunk_id=self.chunk_id,
+            text=self.text,
+            source=self.source,
+            type=self.type,
+            index=self.index,
+            metadata=dict(self.metadata),
+        )
+
+
+# Anything VectorService can index: API models or splitter records
+ChunkLike = Union[Chunk, ChunkRecord]
@@ -0,0 +1,15 @@
+# backend/models/delete_response.py
+
+from pydantic import BaseModel, Field
+
+
+class DeleteResponse(BaseModel):
+    """
+    Response returned after a document's chunks were deleted.
+    """
+
+    source: str = Field(..., description="Filename the chunks were uploaded as")
+    collection: str = Field(..., description="Collection the chunks were deleted from")
+    num_chunks_deleted: int = Field(
+        ..., description="Number of chunks removed from the index"
+    )
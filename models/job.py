@@ -0,0 +1,44 @@
+# backend/models/job.py
+
+from datetime import datetime, timezone
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+JobState = Literal["queued", "running", "completed", "failed"]
+FileState = Literal["queued", "loading", "embedding", "embedded", "indexed", "failed"]
+
+
+class FileProgress(BaseModel):
+    """
+    Progress of one file inside a batch ingestion job.
+    """
+
+    filename: str = Field(..., description="Original filename uploaded by the user")
+    status: FileState = Field("queued", description="Current stage of this file")
+    chunks_produced: int = Field(0, description="Chunks produced by the splitter")
+    chunks_skipped: int = Field(
+        0, description="Chunks already indexed and therefore not re-embedded"
+    )
+    chunks_embedded: int = Field(0, description="Chunks embedded so far")
+    chunks_removed: int = Field(
+        0, description="Chunks of a previous upload of this file that were deleted"
+    )
+    error: Optional[str] = Field(None, description="Failure reason, if any")
+
+
+class JobStatus(BaseModel):
+    """
+    Snapshot of a batch ingestion job, returned by `/upload/batch` and `/jobs/{id}`.
+    """
+
+    job_id: str = Field(..., description="Identifier to poll with GET /jobs/{id}")
+    status: JobState = Field("queued", description="Overall job state")
+    collection: str = Field(..., description="Collection the files are indexed into")
+    files: List[FileProgress] = Field(
+        default_factory=list, description="Per-file progress, in upload order"
+    )
+    num_chunks_indexed: int = Field(
+        0, description="New chunks written by the job's index commits"
+    )
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: Optional[datetime] = Field(None)
@@ -10,8 +10,16 @@ class UploadResponse(BaseModel):
     """
 
     filename: str = Field(..., description="Original filename uploaded by the user")
+    collection: str = Field(..., description="Collection the chunks were indexed into")
     num_chunks_indexed: int = Field(
-        ..., description="Number of text chunks created and indexed"
+        ..., description="Number of new text chunks embedded and indexed"
+    )
+    num_chunks_skipped: int = Field(
+        0, description="Number of chunks skipped because they were already indexed"
+    )
+    num_chunks_removed: int = Field(
+        0,
+        description="Chunks of a previous upload of this file that were deleted",
     )
     first_chunk_id: Optional[str] = Field(
         None, description="ID of the first chunk (for preview or verification)"
@@ -1,6 +1,12 @@
 from fastapi import FastAPI
+from controllers.document_controller import document_controller
 from controllers.file_controller import file_controller
+from controllers.job_controller import job_controller
+from controllers.metrics_controller import metrics_controller
 
 
 def register(app: FastAPI):
     app.include_router(file_controller)
+    app.include_router(job_controller)
+    app.include_router(document_controller)
+    app.include_router(metrics_controller)
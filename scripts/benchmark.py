@@ -0,0 +1,495 @@
+# backend/scripts/benchmark.py
+
+"""
+End-to-end performance benchmark for ingestion, search and chat.
+
+Usage:
+    python -m scripts.benchmark [--output bench.json] [--corpus-sizes 1000,10000]
+        [--clients 1,4,16] [--embedder hashing] [--skip chat]
+
+Stages, each reported in one JSON document for comparison between runs:
+  - ingest: synthetic files of every extension in EXTENSION_LOADER_MAP go
+    through `file_service.ingest_file` (chunks/sec, MB/sec) and, separately,
+    `chunk_util.split_document` on already loaded Documents. Extensions
+    whose loader or writer dependency is missing are reported with an error.
+  - embed: embed_documents throughput over the ingested chunks.
+  - search: `VectorService.upsert` throughput, then search p50/p99 latency
+    per mode as synthetic chunks grow the corpus to each --corpus-sizes step.
+  - chat: an in-process GRPCServer over that corpus; N concurrent clients
+    (one channel each) call StreamChat and report time-to-first-token and
+    tokens/sec. Streams use `x-stream-mode: low-latency`, so one message is
+    one generated token.
+
+Runs offline by default: the "hashing" embedder (scripts.synthetic_corpus)
+replaces the sentence-transformers model and the "echo" LLM backend replaces
+llama.cpp. Pass --embedder <model id> or --llm-backend llama_cpp --model
+<name> to measure the real ones. Everything is written to a temporary
+directory; the configured index is never touched.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from config.settings import settings
+from models.chunk import Chunk
+from scripts.synthetic_corpus import HashingEmbedder, TextSource, write_corpus
+from services.loaders.loaders import EXTENSION_LOADER_MAP
+from utils import chunk_util
+
+SEARCH_MODES = ("dense", "lexical", "hybrid")
+UPSERT_BATCH = 512
+QUERY_SEED = 1
+
+
+def _log(message: str) -> None:
+    print(message, file=sys.stderr, flush=True)
+
+
+def _error(e: BaseException) -> str:
+    return f"{type(e).__name__}: {e}"
+
+
+def latency_summary(samples: Sequence[float]) -> Dict[str, float]:
+    """p50/p90/p99/mean/max in milliseconds of samples given in seconds."""
+    if not samples:
+        return {"count": 0}
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {
+        "count": len(ms),
+        "p50_ms": round(float(p50), 3),
+        "p90_ms": round(float(p90), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def _rate(count: float, seconds: float) -> float:
+    return round(count / seconds, 2) if seconds > 0 else 0.0
+
+
+# --- Ingest -------------------------------------------------------------------
+
+
+async def _ingest(paths: List[Path]) -> List[Chunk]:
+    from fastapi import UploadFile
+    from services import file_service
+
+    chunks = []
+    for path in paths:
+        with open(path, "rb") as f:
+            upload = UploadFile(file=f, filename=path.name)
+            chunks.extend(await file_service.ingest_file(upload))
+    return chunks
+
+
+def bench_ingest(
+    workdir: Path, files: int, chars: int
+) -> Tuple[Dict[str, Any], List[Chunk]]:
+    """
+    Ingest `files` synthetic documents of every supported extension.
+
+    Returns:
+        Tuple[Dict[str, Any], List[Chunk]]: Per-extension results and every
+        chunk produced, for the embed and search stages.
+    """
+    results: Dict[str, Any] = {}
+    all_chunks: List[Chunk] = []
+    for suffix, loader_cls in EXTENSION_LOADER_MAP.items():
+        try:
+            paths = write_corpus(workdir / suffix.lstrip("."), suffix, files, chars)
+            size = sum(path.stat().st_size for path in paths)
+
+            asyncio.run(_ingest(paths[:1]))  # warm-up (lazy loader imports)
+            started = time.perf_counter()
+            chunks = asyncio.run(_ingest(paths))
+            ingest_seconds = time.perf_counter() - started
+
+            docs = [list(loader_cls(str(path)).lazy_load()) for path in paths]
+            started = time.perf_counter()
+            split = sum(
+                1
+                for path, loaded in zip(paths, docs)
+                for _ in chunk_util.split_document(loaded, path.name, suffix)
+            )
+            split_seconds = time.perf_counter() - started
+        except Exception as e:
+            results[suffix] = {"error": _error(e)}
+            _log(f"ingest {suffix}: {results[suffix]['error']}")
+            continue
+
+        all_chunks.extend(chunks)
+        results[suffix] = {
+            "files": len(paths),
+            "bytes": size,
+            "chunks": len(chunks),
+            "ingest_seconds": round(ingest_seconds, 4),
+            "chunks_per_sec": _rate(len(chunks), ingest_seconds),
+            "mb_per_sec": _rate(size / 1e6, ingest_seconds),
+            "split_seconds": round(split_seconds, 4),
+            "split_chunks_per_sec": _rate(split, split_seconds),
+        }
+        _log(f"ingest {suffix}: {results[suffix]['chunks_per_sec']} chunks/s")
+    return results, all_chunks
+
+
+# --- Embed --------------------------------------------------------------------
+
+
+def bench_embed(embedder: Any, texts: List[str]) -> Dict[str, Any]:
+    """embed_documents throughput in settings.ingest_batch_size batches."""
+    batch = settings.ingest_batch_size
+    embedder.embed_documents(texts[:batch])  # warm-up (model load)
+    started = time.perf_counter()
+    for i in range(0, len(texts), batch):
+        embedder.embed_documents(texts[i : i + batch])
+    seconds = time.perf_counter() - started
+    result = {
+        "texts": len(texts),
+        "batch_size": batch,
+        "seconds": round(seconds, 4),
+        "texts_per_sec": _rate(len(texts), seconds),
+        "chars_per_sec": _rate(sum(map(len, texts)), seconds),
+    }
+    _log(f"embed: {result['texts_per_sec']} texts/s")
+    return result
+
+
+# --- Upsert and search --------------------------------------------------------
+
+
+def _synthetic_chunks(text: TextSource, start: int, count: int) -> List[Chunk]:
+    chunks = []
+    for i in range(start, start + count):
+        body = text.paragraph()[: settings.chunk_size]
+        source = f"synthetic-{i // 100:05d}.txt"
+        chunks.append(
+            Chunk(
+                chunk_id=chunk_util.content_hash(f"{i} {body}", source),
+                text=body,
+                source=source,
+                type="txt",
+                index=i % 100,
+            )
+        )
+    return chunks
+
+
+def _timed_upsert(vector_service: Any, chunks: List[Chunk]) -> Tuple[int, float]:
+    added, seconds = 0, 0.0
+    for i in range(0, len(chunks), UPSERT_BATCH):
+        started = time.perf_counter()
+        added += vector_service.upsert(chunks[i : i + UPSERT_BATCH]).added
+        seconds += time.perf_counter() - started
+    return added, seconds
+
+
+def bench_search(
+    vector_service: Any,
+    ingested: List[Chunk],
+    corpus_sizes: Sequence[int],
+    queries: int,
+    top_k: int,
+) -> Dict[str, Any]:
+    """
+    Upsert the ingested chunks, then grow the corpus to each size in
+    `corpus_sizes` with synthetic chunks and time `queries` searches per
+    mode at every step.
+    """
+    added, seconds = _timed_upsert(vector_service, ingested)
+    result: Dict[str, Any] = {
+        "index_kind": vector_service.index_kind,
+        "upsert": {
+            "rows": added,
+            "seconds": round(seconds, 4),
+            "rows_per_sec": _rate(added, seconds),
+        },
+        "steps": [],
+    }
+
+    text = TextSource(QUERY_SEED)
+    prompts = [text.sentence() for _ in range(queries)]
+    for size in sorted(corpus_sizes):
+        missing = size - vector_service.num_rows
+        grown, grow_seconds = 0, 0.0
+        if missing > 0:
+            grown, grow_seconds = _timed_upsert(
+                vector_service,
+                _synthetic_chunks(text, vector_service.num_rows, missing),
+            )
+        step: Dict[str, Any] = {
+            "corpus_rows": vector_service.num_rows,
+            "upsert_rows_per_sec": _rate(grown, grow_seconds),
+        }
+        for mode in SEARCH_MODES:
+            vector_service.search(prompts[0], top_k, mode=mode)  # warm-up
+            samples = []
+            for prompt in prompts:
+                started = time.perf_counter()
+                vector_service.search(prompt, top_k, mode=mode)
+                samples.append(time.perf_counter() - started)
+            step[mode] = latency_summary(samples)
+        result["steps"].append(step)
+        _log(
+            f"search @{step['corpus_rows']} rows: "
+            + ", ".join(f"{m} p99 {step[m]['p99_ms']}ms" for m in SEARCH_MODES)
+        )
+    return result
+
+
+# --- Chat ---------------------------------------------------------------------
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind((settings.grpc_host, 0))
+        return s.getsockname()[1]
+
+
+async def _chat_client(
+    address: str, model: str, prompts: List[str], stats: Dict[str, List[float]]
+) -> None:
+    from grpc import aio
+    from proto.chat_pb2 import ChatRequest
+    from proto.chat_pb2_grpc import ChatServiceStub
+    from grpc_server.streaming import STREAM_MODE_KEY
+
+    async with aio.insecure_channel(address) as channel:
+        stub = ChatServiceStub(channel)
+        for prompt in prompts:
+            started = time.perf_counter()
+            first = None
+            tokens = 0
+            try:
+                call = stub.StreamChat(
+                    ChatRequest(prompt=prompt, model=model),
+                    metadata=((STREAM_MODE_KEY, "low-latency"),),
+                )
+                async for response in call:
+                    if response.token or response.final_text:
+                        if first is None:
+                            first = time.perf_counter()
+                        tokens += bool(response.token)
+            except aio.AioRpcError as e:
+                stats["errors"].append(e.code().name)
+                continue
+            done = time.perf_counter()
+            stats["ttft"].append((first or done) - started)
+            stats["total"].append(done - started)
+            stats["tokens"].append(tokens)
+            if tokens and first is not None and done > first:
+                stats["stream_tps"].append(tokens / (done - first))
+
+
+async def _bench_chat(
+    collections: Any, clients: Sequence[int], requests: int, model: str
+) -> Dict[str, Any]:
+    from grpc_server.server import GRPCServer
+    from services import llm_service
+
+    settings.grpc_port = _free_port()
+    server = GRPCServer(collections)
+    await server.start()
+    address = f"{settings.grpc_host}:{settings.grpc_port}"
+    text = TextSource(QUERY_SEED + 1)
+    result: Dict[str, Any] = {"steps": []}
+    try:
+        for n in sorted(clients):
+            stats: Dict[str, List[Any]] = {
+                "ttft": [],
+                "total": [],
+                "tokens": [],
+                "stream_tps": [],
+                "errors": [],
+            }
+            started = time.perf_counter()
+            await asyncio.gather(
+                *(
+                    _chat_client(
+                        address,
+                        model,
+                        [text.sentence() for _ in range(requests)],
+                        stats,
+                    )
+                    for _ in range(n)
+                )
+            )
+            wall = time.perf_counter() - started
+            step = {
+                "clients": n,
+                "requests": len(stats["total"]),
+                "errors": len(stats["errors"]),
+                "wall_seconds": round(wall, 4),
+                "time_to_first_token": latency_summary(stats["ttft"]),
+                "request_latency": latency_summary(stats["total"]),
+                "tokens": int(sum(stats["tokens"])),
+                "aggregate_tokens_per_sec": _rate(sum(stats["tokens"]), wall),
+                "per_stream_tokens_per_sec": round(
+                    float(np.mean(stats["stream_tps"])) if stats["stream_tps"] else 0,
+                    2,
+                ),
+            }
+            result["steps"].append(step)
+            _log(
+                f"chat x{n}: ttft p50 {step['time_to_first_token'].get('p50_ms')}ms, "
+                f"{step['aggregate_tokens_per_sec']} tok/s"
+            )
+    finally:
+        await server.stop(grace=1)
+        llm_service.shutdown()
+    return result
+
+
+# --- Entry point --------------------------------------------------------------
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", type=Path, help="JSON file (default: stdout)")
+    parser.add_argument("--files-per-type", type=int, default=3)
+    parser.add_argument(
+        "--file-chars", type=int, default=50_000, help="Text per synthetic file"
+    )
+    parser.add_argument("--corpus-sizes", type=_int_list, default=[1000, 10000])
+    parser.add_argument("--queries", type=int, default=200, help="Per mode and size")
+    parser.add_argument("--top-k", type=int, default=settings.rag_top_k)
+    parser.add_argument("--clients", type=_int_list, default=[1, 4, 16])
+    parser.add_argument("--requests-per-client", type=int, default=4)
+    parser.add_argument(
+        "--embedder",
+        default="hashing",
+        help='"hashing" (offline stand-in) or a sentence-transformers model id',
+    )
+    parser.add_argument("--dimension", type=int, default=384, help="Hashing only")
+    parser.add_argument(
+        "--index-type",
+        choices=["flat", "ivf_flat", "ivf_pq", "hnsw"],
+        default=settings.faiss_index_type,
+    )
+    parser.add_argument("--llm-backend", choices=["echo", "llama_cpp"], default="echo")
+    parser.add_argument("--model", default="echo", help="Model name for chat")
+    parser.add_argument(
+        "--skip",
+        type=lambda v: set(v.split(",")),
+        default=set(),
+        help="Comma-separated stages to skip: ingest,embed,search,chat",
+    )
+    parser.add_argument(
+        "--workdir", type=Path, help="Keep corpus and index here instead of a tmp dir"
+    )
+    args = parser.parse_args()
+
+    # Services print progress to stdout, which may carry the report
+    with tempfile.TemporaryDirectory(
+        prefix="secugenie-bench-"
+    ) as tmp, contextlib.redirect_stdout(sys.stderr):
+        workdir = args.workdir or Path(tmp)
+        settings.faiss_index_dir = workdir / "index"
+        settings.faiss_index_type = args.index_type
+        settings.embedding_cache_enabled = False  # measure the embedder itself
+        settings.response_cache_enabled = False  # every prompt is generated
+        settings.llm_backend = args.llm_backend
+
+        if args.embedder == "hashing":
+            embedder = HashingEmbedder(args.dimension)
+        else:
+            from services.embedding_engine import EmbeddingEngine
+
+            embedder = EmbeddingEngine.from_settings(args.embedder)
+
+        report: Dict[str, Any] = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+            },
+            "config": {
+                **{
+                    k: str(v) if isinstance(v, Path) else v
+                    for k, v in vars(args).items()
+                },
+                "skip": sorted(args.skip),
+                "chunk_size": settings.chunk_size,
+                "chunk_overlap": settings.chunk_overlap,
+            },
+        }
+
+        chunks: List[Chunk] = []
+        if "ingest" not in args.skip:
+            report["ingest"], chunks = bench_ingest(
+                workdir / "corpus", args.files_per_type, args.file_chars
+            )
+        if "embed" not in args.skip:
+            texts = [c.text for c in chunks] or [
+                c.text for c in _synthetic_chunks(TextSource(), 0, 2000)
+            ]
+            report["embed"] = bench_embed(embedder, texts)
+
+        if not {"search", "chat"} <= args.skip:
+            from services.collection_service import CollectionManager
+
+            collections = CollectionManager(embedder)
+            try:
+                with collections.lease() as vector_service:
+                    if "search" not in args.skip:
+                        report["search"] = bench_search(
+                            vector_service,
+                            chunks,
+                            args.corpus_sizes,
+                            args.queries,
+                            args.top_k,
+                        )
+                    if "chat" not in args.skip:
+                        report["chat"] = asyncio.run(
+                            _bench_chat(
+                                collections,
+                                args.clients,
+                                args.requests_per_client,
+                                args.model,
+                            )
+                        )
+            finally:
+                collections.close()
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+        _log(f"✅ Wrote {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
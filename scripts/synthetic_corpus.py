@@ -0,0 +1,326 @@
+# backend/scripts/synthetic_corpus.py
+
+"""
+Deterministic synthetic documents for every extension in
+`services.loaders.loaders.EXTENSION_LOADER_MAP`, plus a tiny offline
+embedder, used by `scripts.benchmark`.
+
+Text is drawn from a fixed pseudo-word vocabulary with a seeded RNG, so two
+runs with the same seed and size produce byte-identical files. TXT, MD, PDF,
+CSV, JSON, EML and ICS are written with the standard library. DOCX, PPTX and
+XLSX use python-docx, python-pptx and openpyxl, which the matching
+unstructured loaders need anyway; if one is missing its writer raises
+ModuleNotFoundError and the benchmark reports the extension as skipped.
+"""
+
+import csv
+import json
+import random
+import zlib
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_SYLLABLES = "ka lo mi nu ra se ti vo ze an el in or us qua pre tor lin mar sec".split()
+_PDF_LINE_CHARS = 90
+_PDF_PAGE_LINES = 48
+
+
+class TextSource:
+    """
+    Seeded generator of pseudo-English words, sentences and paragraphs.
+
+    Args:
+        seed (int): RNG seed; equal seeds give equal text.
+        vocabulary (int): Number of distinct words. Word frequencies follow a
+            Zipf-like curve, so BM25 sees realistic common and rare terms.
+    """
+
+    def __init__(self, seed: int = 0, vocabulary: int = 5000):
+        self.rng = random.Random(seed)
+        words = set()
+        while len(words) < vocabulary:
+            words.add("".join(self.rng.choices(_SYLLABLES, k=self.rng.randint(1, 4))))
+        self.words = sorted(words)
+        self.weights = [1.0 / (rank + 1) for rank in range(len(self.words))]
+
+    def sentence(self) -> str:
+        words = self.rng.choices(self.words, self.weights, k=self.rng.randint(8, 20))
+        return " ".join(words).capitalize() + "."
+
+    def paragraph(self) -> str:
+        return " ".join(self.sentence() for _ in range(self.rng.randint(3, 7)))
+
+    def paragraphs(self, target_chars: int) -> List[str]:
+        """Paragraphs totalling at least `target_chars` characters."""
+        out, size = [], 0
+        while size < target_chars:
+            out.append(self.paragraph())
+            size += len(out[-1]) + 2
+        return out
+
+
+# --- Writers ------------------------------------------------------------------
+
+
+def _write_txt(path: Path, text: TextSource, size: int) -> None:
+    path.write_text("\n\n".join(text.paragraphs(size)), encoding="utf-8")
+
+
+def _write_md(path: Path, text: TextSource, size: int) -> None:
+    parts = []
+    for i, paragraph in enumerate(text.paragraphs(size)):
+        if i % 4 == 0:
+            parts.append(f"## {text.sentence()[:-1]}")
+        parts.append(paragraph)
+    path.write_text("# Report\n\n" + "\n\n".join(parts), encoding="utf-8")
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _write_pdf(path: Path, text: TextSource, size: int) -> None:
+    """Minimal multi-page PDF 1.4 with Helvetica text, one object per part."""
+    lines: List[str] = []
+    for paragraph in text.paragraphs(size):
+        line = ""
+        for word in paragraph.split():
+            if len(line) + len(word) + 1 > _PDF_LINE_CHARS:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        lines.extend([line, ""])
+    pages = [
+        lines[i : i + _PDF_PAGE_LINES] for i in range(0, len(lines), _PDF_PAGE_LINES)
+    ]
+
+    # 1: catalog, 2: page tree, 3: font, then (page, content) pairs
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page in pages:
+        body = (
+            "BT /F1 10 Tf 14 TL 50 760 Td "
+            + " ".join(f"({_pdf_escape(line)}) '" for line in page)
+            + " ET"
+        )
+        stream = zlib.compress(body.encode("latin-1"))
+        page_id, content_id = len(objects) + 1, len(objects) + 2
+        kids.append(f"{page_id} 0 R")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> "
+            f"/Contents {content_id} 0 R >>".encode("ascii")
+        )
+        header = f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n"
+        objects.append(header.encode("ascii") + stream + b"\nendstream")
+    tree = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    objects[1] = tree.encode("ascii")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode("ascii") + obj + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("ascii")
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode("ascii")
+    path.write_bytes(bytes(out))
+
+
+def _write_docx(path: Path, text: TextSource, size: int) -> None:
+    import docx
+
+    document = docx.Document()
+    document.add_heading("Report", level=1)
+    for i, paragraph in enumerate(text.paragraphs(size)):
+        if i % 4 == 0:
+            document.add_heading(text.sentence()[:-1], level=2)
+        document.add_paragraph(paragraph)
+    document.save(str(path))
+
+
+def _records(text: TextSource, size: int) -> Iterator[Dict[str, object]]:
+    day = datetime(2024, 1, 1)
+    for i, paragraph in enumerate(text.paragraphs(size)):
+        yield {
+            "id": i,
+            "title": text.sentence()[:-1],
+            "body": paragraph,
+            "amount": round(text.rng.uniform(1, 10000), 2),
+            "date": (day + timedelta(days=i)).date().isoformat(),
+        }
+
+
+def _write_csv(path: Path, text: TextSource, size: int) -> None:
+    rows = list(_records(text, size))
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _write_json(path: Path, text: TextSource, size: int) -> None:
+    path.write_text(json.dumps(list(_records(text, size)), indent=1), encoding="utf-8")
+
+
+def _write_pptx(path: Path, text: TextSource, size: int) -> None:
+    import pptx
+
+    presentation = pptx.Presentation()
+    layout = presentation.slide_layouts[1]  # Title and Content
+    paragraphs = text.paragraphs(size)
+    for i in range(0, len(paragraphs), 2):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = text.sentence()[:-1]
+        body = slide.placeholders[1].text_frame
+        body.text = paragraphs[i]
+        for paragraph in paragraphs[i + 1 : i + 2]:
+            body.add_paragraph().text = paragraph
+    presentation.save(str(path))
+
+
+def _write_xlsx(path: Path, text: TextSource, size: int) -> None:
+    import openpyxl
+
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    rows = list(_records(text, size))
+    per_sheet = max(1, len(rows) // 4)
+    for start in range(0, len(rows), per_sheet):
+        sheet = workbook.create_sheet(f"Sheet{start // per_sheet + 1}")
+        sheet.append(list(rows[0]))
+        for row in rows[start : start + per_sheet]:
+            sheet.append(list(row.values()))
+    workbook.save(str(path))
+
+
+def _write_eml(path: Path, text: TextSource, size: int) -> None:
+    message = EmailMessage()
+    message["Subject"] = text.sentence()[:-1]
+    message["From"] = "alice@example.com"
+    message["To"] = "bob@example.com"
+    message["Date"] = "Mon, 01 Jan 2024 09:00:00 +0000"
+    message.set_content("\n\n".join(text.paragraphs(size)))
+    path.write_bytes(bytes(message))
+
+
+def _ics_text(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(",", "\\,").replace(";", "\\;")
+
+
+def _write_ics(path: Path, text: TextSource, size: int) -> None:
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//benchmark//EN"]
+    start = datetime(2024, 1, 1, 9)
+    for i, paragraph in enumerate(text.paragraphs(size)):
+        begin = start + timedelta(hours=6 * i)
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:event-{i}@benchmark",
+            f"DTSTAMP:{start:%Y%m%dT%H%M%SZ}",
+            f"DTSTART:{begin:%Y%m%dT%H%M%SZ}",
+            f"DTEND:{begin + timedelta(hours=1):%Y%m%dT%H%M%SZ}",
+            f"SUMMARY:{_ics_text(text.sentence()[:-1])}",
+            f"LOCATION:Room {i % 12}",
+            "ORGANIZER:mailto:alice@example.com",
+            "STATUS:CONFIRMED",
+            f"DESCRIPTION:{_ics_text(paragraph)}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    # Long content lines are valid input for icalendar; no folding needed
+    path.write_text("\r\n".join(lines) + "\r\n", encoding="utf-8")
+
+
+WRITERS: Dict[str, Callable[[Path, TextSource, int], None]] = {
+    ".txt": _write_txt,
+    ".md": _write_md,
+    ".pdf": _write_pdf,
+    ".docx": _write_docx,
+    ".csv": _write_csv,
+    ".json": _write_json,
+    ".pptx": _write_pptx,
+    ".xlsx": _write_xlsx,
+    ".eml": _write_eml,
+    ".ics": _write_ics,
+}
+
+
+def write_corpus(
+    directory: Path, suffix: str, files: int, size: int, seed: int = 0
+) -> List[Path]:
+    """
+    Write `files` synthetic documents with extension `suffix`.
+
+    Args:
+        directory (Path): Output directory (created if missing).
+        suffix (str): Extension from EXTENSION_LOADER_MAP, e.g. ".pdf".
+        files (int): Number of documents.
+        size (int): Approximate characters of text per document.
+        seed (int): RNG seed.
+
+    Returns:
+        List[Path]: The written files.
+
+    Raises:
+        KeyError: If there is no writer for `suffix`.
+        ModuleNotFoundError: If the writer's optional library is missing.
+    """
+    writer = WRITERS[suffix]
+    directory.mkdir(parents=True, exist_ok=True)
+    text = TextSource(seed)
+    paths = []
+    for i in range(files):
+        path = directory / f"doc-{i:03d}{suffix}"
+        writer(path, text, size)
+        paths.append(path)
+    return paths
+
+
+# --- Embedder -----------------------------------------------------------------
+
+
+class HashingEmbedder(Embeddings):
+    """
+    Feature-hashing bag-of-words embedder: no model, no network, no torch.
+
+    Each word adds a pseudo-random ±1 pattern to a few of `dimension`
+    buckets and the sum is L2-normalized, so texts sharing words are close.
+    Throughput is far above a real transformer; benchmarks use it to
+    measure everything around the embedding model.
+
+    Args:
+        dimension (int): Output size (384 matches all-MiniLM-L6-v2).
+    """
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                h = zlib.crc32(word.encode("utf-8"))
+                for shift in (0, 11, 22):
+                    bucket = (h >> shift) % self.dimension
+                    out[row, bucket] += 1.0 if (h >> (shift + 10)) & 1 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
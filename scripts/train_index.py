@@ -0,0 +1,68 @@
+# backend/scripts/train_index.py
+
+"""
+Train a new FAISS index from the vectors already stored and swap it in.
+
+Usage:
+    python -m scripts.train_index --type ivf_pq [--nlist 4096] [--pq-m 48]
+        [--collection NAME]
+
+Stop the API server first: the index directory must have a single writer,
+and the script exits with an error while the server holds it.
+The new index is written as a fresh snapshot and the CHECKPOINT is switched
+atomically, so an interrupted run leaves the previous index in place.
+"""
+
+import argparse
+import sys
+import time
+from config.settings import settings
+from services.collection_service import CollectionManager, CollectionNotFoundError
+from services.storage.writer_lock import StoreLockedError
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--type",
+        choices=["flat", "ivf_flat", "ivf_pq", "hnsw"],
+        default=settings.faiss_index_type,
+        help="Target index type (default: settings.faiss_index_type)",
+    )
+    parser.add_argument("--nlist", type=int, help="IVF inverted lists")
+    parser.add_argument("--pq-m", type=int, help="PQ sub-quantizers")
+    parser.add_argument("--hnsw-m", type=int, help="HNSW neighbours per node")
+    parser.add_argument(
+        "--collection",
+        default=settings.default_collection,
+        help="Collection to retrain (default: settings.default_collection)",
+    )
+    args = parser.parse_args()
+
+    if args.nlist:
+        settings.faiss_ivf_nlist = args.nlist
+    if args.pq_m:
+        settings.faiss_pq_m = args.pq_m
+    if args.hnsw_m:
+        settings.faiss_hnsw_m = args.hnsw_m
+
+    collections = CollectionManager()
+    try:
+        with collections.lease(args.collection) as vector_service:
+            print(
+                f"Current index of {args.collection}: {vector_service.index_kind} "
+                f"({vector_service.num_rows} vectors)"
+            )
+            started = time.perf_counter()
+            vector_service.migrate_index(args.type)
+            elapsed = time.perf_counter() - started
+            print(f"✅ Swapped in {args.type} index in {elapsed:.1f}s")
+    except (StoreLockedError, CollectionNotFoundError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        collections.close()
+
+
+if __name__ == "__main__":
+    main()
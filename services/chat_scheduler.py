@@ -0,0 +1,488 @@
+# backend/services/chat_scheduler.py
+
+"""
+Continuous (in-flight) batching of chat sequences on local GGUF models.
+
+Every model with pending chats gets one decode worker thread. The worker
+owns a llama.cpp context with `settings.llm_max_batch_sequences` KV
+sequence slots. Each step it builds one batch holding:
+
+  - the next token of every active sequence (one per sequence, so every
+    running chat advances at the same rate), and
+  - prompt chunks of newly admitted sequences, oldest first, filling the
+    rest of `settings.llm_batch_tokens`,
+
+and runs a single forward pass for all of them. Sequences join as soon as a
+slot frees up and leave as soon as they finish or their caller cancels, so
+concurrent chats share matrix multiplies instead of fighting over cores.
+
+A retiring sequence's KV state goes into a shared PrefixCache; a new chat
+whose prompt repeats a cached conversation restores it into its slot and
+prefills only the tokens that are new this turn.
+
+Waiting chats are admitted first-come, first-served; beyond
+`settings.llm_max_queued_requests` waiting chats `generate` raises
+SchedulerFullError.
+"""
+
+import asyncio
+import codecs
+import ctypes
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+import numpy as np
+from config.settings import settings
+from services import metrics
+from services.model_pool import ModelPool
+from services.prefix_cache import PrefixCache
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class SchedulerFullError(Exception):
+    """Raised when too many chats are already waiting for a decode slot."""
+
+
+@dataclass(eq=False)
+class ChatSequence:
+    """One chat request as seen by a decode worker."""
+
+    messages: List[Dict[str, str]]
+    max_tokens: int
+    temperature: float
+    loop: asyncio.AbstractEventLoop
+    outbox: asyncio.Queue
+    cancelled: threading.Event = field(default_factory=threading.Event)
+    enqueued_at: float = field(default_factory=time.monotonic)
+    # Worker-side state
+    slot: int = -1
+    prompt: List[int] = field(default_factory=list)
+    n_past: int = 0
+    last_token: Optional[int] = None
+    output: List[int] = field(default_factory=list)
+    decoder: Any = field(
+        default_factory=lambda: codecs.getincrementaldecoder("utf-8")("replace")
+    )
+
+    def emit(self, item: Any) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self.outbox.put_nowait, item)
+        except RuntimeError:
+            self.cancelled.set()  # Event loop closed; nobody is listening
+
+
+class _Stats:
+    """Counters shared by all workers; read through `ChatScheduler.stats`."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.tokens_generated = 0
+        self.prompt_tokens = 0
+        self.decode_steps = 0
+        self.batched_sequences = 0
+        self.busy_seconds = 0.0
+        self.queue_wait_seconds = 0.0
+
+
+def _format_prompt(model: Any, messages: List[Dict[str, str]]) -> str:
+    """Render messages with the model's own chat template when it has one."""
+    template = model.metadata().get("tokenizer.chat_template")
+    if template:
+        from llama_cpp.llama_chat_format import Jinja2ChatFormatter
+
+        formatter = Jinja2ChatFormatter(
+            template=template,
+            eos_token=model.token_get_text(model.token_eos()),
+            bos_token=model.token_get_text(model.token_bos()),
+        )
+        return formatter(messages=messages).prompt
+    turns = "".join(f"{m['role']}: {m['content']}\n" for m in messages)
+    return f"{turns}assistant:"
+
+
+class _DecodeWorker(threading.Thread):
+    """Owns one model's batched context and steps its active sequences."""
+
+    def __init__(self, scheduler: "ChatScheduler", path: Path):
+        super().__init__(name=f"llm-decode-{path.stem}", daemon=True)
+        self.scheduler = scheduler
+        self.path = path
+        self.waiting: Deque[ChatSequence] = deque()
+        self.active: List[ChatSequence] = []
+        self.stopping = False
+
+    # --- Setup --------------------------------------------------------------
+
+    def _context(self, model: Any) -> Any:
+        import llama_cpp
+        from llama_cpp._internals import LlamaContext
+
+        slots = settings.llm_max_batch_sequences
+        params = llama_cpp.llama_context_default_params()
+        params.n_seq_max = slots
+        params.n_ctx = settings.llm_context_size * slots
+        params.n_batch = settings.llm_batch_tokens
+        params.n_ubatch = settings.llm_batch_tokens
+        if settings.llm_threads:
+            params.n_threads = settings.llm_threads
+            params.n_threads_batch = settings.llm_threads
+        return LlamaContext(model=model, params=params, verbose=False)
+
+    def run(self) -> None:
+        try:
+            with self.scheduler.pool.lease(self.path.name) as resident:
+                self._serve(resident.model)
+        except Exception as e:
+            logger.exception("Decode worker for %s failed", self.path.name)
+            self.scheduler._worker_failed(self, e)
+
+    def _serve(self, model: Any) -> None:
+        from llama_cpp._internals import LlamaBatch
+
+        ctx = self._context(model)
+        batch = LlamaBatch(
+            n_tokens=settings.llm_batch_tokens, embd=0, n_seq_max=1, verbose=False
+        )
+        free_slots = list(range(settings.llm_max_batch_sequences - 1, -1, -1))
+        n_vocab = model.n_vocab()
+        try:
+            while self._wait_for_work():
+                self._admit(model, ctx, free_slots)
+                self._step(model, ctx, batch, n_vocab)
+                for seq in list(self.active):
+                    if seq.cancelled.is_set():
+                        self._retire(seq, ctx, free_slots, cancelled=True)
+                    elif self._finished(model, seq):
+                        self._retire(seq, ctx, free_slots)
+        finally:
+            # On failure, `run` reports the error to every active sequence;
+            # ending them with _DONE would pass a truncated answer as complete
+            batch.close()
+            ctx.close()
+
+    # --- Scheduling ---------------------------------------------------------
+
+    def _wait_for_work(self) -> bool:
+        """Block until something is runnable; False once idle for too long."""
+        cond = self.scheduler._cond
+        with cond:
+            deadline = time.monotonic() + settings.llm_worker_idle_seconds
+            while not self.active and not self.waiting:
+                remaining = deadline - time.monotonic()
+                if self.stopping or remaining <= 0:
+                    self.scheduler._workers.pop(self.path, None)
+                    return False
+                cond.wait(remaining)
+            return True
+
+    def _admit(self, model: Any, ctx: Any, free_slots: List[int]) -> None:
+        """Move waiting sequences into free KV slots, oldest first."""
+        with self.scheduler._cond:
+            admitted = []
+            while free_slots and self.waiting:
+                seq = self.waiting.popleft()
+                if seq.cancelled.is_set():
+                    seq.emit(_DONE)
+                    continue
+                seq.slot = free_slots.pop()
+                admitted.append(seq)
+        for seq in admitted:
+            prompt = _format_prompt(model, seq.messages).encode("utf-8")
+            tokens = model.tokenize(prompt, add_bos=model.add_bos_token(), special=True)
+            # Keep the most recent context when the chat outgrows the window
+            budget = max(1, settings.llm_context_size - seq.max_tokens)
+            seq.prompt = tokens[-budget:]
+            self._restore_prefix(ctx, seq)
+            waited = time.monotonic() - seq.enqueued_at
+            metrics.CHAT_QUEUE_WAIT.observe(waited)
+            with self.scheduler._stats.lock:
+                self.scheduler._stats.prompt_tokens += len(seq.prompt)
+                self.scheduler._stats.queue_wait_seconds += waited
+            self.active.append(seq)
+
+    def _restore_prefix(self, ctx: Any, seq: ChatSequence) -> None:
+        """Load the longest cached KV prefix of seq.prompt into its slot."""
+        import llama_cpp
+
+        hit = self.scheduler.prefix_cache.lookup(self.path, seq.prompt)
+        if hit is None:
+            return
+        # At least one prompt token must still be decoded to get logits
+        reused, state = hit
+        reused = min(reused, len(seq.prompt) - 1)
+        if reused <= 0:
+            return
+        buffer = (ctypes.c_uint8 * len(state)).from_buffer_copy(state)
+        if not llama_cpp.llama_state_seq_set_data(
+            ctx.ctx, buffer, len(state), seq.slot
+        ):
+            ctx.kv_cache_seq_rm(seq.slot, -1, -1)
+            return
+        ctx.kv_cache_seq_rm(seq.slot, reused, -1)
+        seq.n_past = reused
+
+    def _save_prefix(self, ctx: Any, seq: ChatSequence) -> None:
+        """Offer the KV state of a retiring sequence to the prefix cache."""
+        import llama_cpp
+
+        cache = self.scheduler.prefix_cache
+        if not cache.enabled or seq.n_past < cache.block_tokens:
+            return
+        size = llama_cpp.llama_state_seq_get_size(ctx.ctx, seq.slot)
+        if not size or size > cache.max_bytes:
+            return
+        buffer = (ctypes.c_uint8 * size)()
+        written = llama_cpp.llama_state_seq_get_data(ctx.ctx, buffer, size, seq.slot)
+        # The KV holds the prompt and every sampled token but the last
+        tokens = (seq.prompt + seq.output)[: seq.n_past]
+        cache.store(self.path, tokens, bytes(buffer)[:written])
+
+    def _step(self, model: Any, ctx: Any, batch: Any, n_vocab: int) -> None:
+        """Run one shared forward pass and sample a token per ready sequence."""
+        started = time.monotonic()
+        raw = batch.batch
+        n = 0
+        outputs: List[tuple] = []
+
+        def add(token: int, pos: int, slot: int, logits: bool) -> None:
+            nonlocal n
+            raw.token[n] = token
+            raw.pos[n] = pos
+            raw.n_seq_id[n] = 1
+            raw.seq_id[n][0] = slot
+            raw.logits[n] = logits
+            n += 1
+
+        # Decoding sequences first: each advances exactly one token per step
+        for seq in self.active:
+            if seq.last_token is not None and not seq.cancelled.is_set():
+                add(seq.last_token, seq.n_past, seq.slot, True)
+                outputs.append((seq, n - 1))
+
+        # Fill the rest of the step with prompt chunks, oldest chat first
+        for seq in self.active:
+            if seq.last_token is not None or seq.cancelled.is_set():
+                continue
+            room = settings.llm_batch_tokens - n
+            if room <= 0:
+                break
+            chunk = seq.prompt[seq.n_past : seq.n_past + room]
+            for i, token in enumerate(chunk):
+                last = seq.n_past + i == len(seq.prompt) - 1
+                add(token, seq.n_past + i, seq.slot, last)
+                if last:
+                    outputs.append((seq, n - 1))
+            seq.n_past += len(chunk)
+
+        if not n:
+            return
+        raw.n_tokens = n
+        ctx.decode(batch)
+
+        for seq, index in outputs:
+            if seq.last_token is not None:
+                seq.n_past += 1
+            logits = np.ctypeslib.as_array(ctx.get_logits_ith(index), shape=(n_vocab,))
+            token = self._sample(logits, seq.temperature)
+            seq.last_token = token
+            seq.output.append(token)
+            if not self._is_end(model, token):
+                piece = seq.decoder.decode(model.token_to_piece(token, special=False))
+                if piece:
+                    seq.emit(piece)
+
+        with self.scheduler._stats.lock:
+            stats = self.scheduler._stats
+            stats.decode_steps += 1
+            stats.batched_sequences += len(outputs)
+            stats.tokens_generated += len(outputs)
+            stats.busy_seconds += time.monotonic() - started
+
+    @staticmethod
+    def _sample(logits: np.ndarray, temperature: float) -> int:
+        if temperature <= 0:
+            return int(np.argmax(logits))
+        k = min(settings.llm_top_k or len(logits), len(logits))
+        top = np.argpartition(logits, -k)[-k:]
+        scaled = logits[top] / temperature
+        probs = np.exp(scaled - scaled.max())
+        return int(np.random.choice(top, p=probs / probs.sum()))
+
+    @staticmethod
+    def _is_end(model: Any, token: int) -> bool:
+        import llama_cpp
+
+        return bool(llama_cpp.llama_vocab_is_eog(model.vocab, token))
+
+    def _finished(self, model: Any, seq: ChatSequence) -> bool:
+        if seq.last_token is None:
+            return False
+        return (
+            self._is_end(model, seq.last_token)
+            or len(seq.output) >= seq.max_tokens
+            or seq.n_past + 1 >= settings.llm_context_size
+        )
+
+    def _retire(
+        self,
+        seq: ChatSequence,
+        ctx: Any,
+        free_slots: List[int],
+        cancelled: bool = False,
+    ) -> None:
+        self._save_prefix(ctx, seq)
+        ctx.kv_cache_seq_rm(seq.slot, -1, -1)
+        free_slots.append(seq.slot)
+        seq.slot = -1
+        self.active.remove(seq)
+        with self.scheduler._stats.lock:
+            if cancelled:
+                self.scheduler._stats.cancelled += 1
+            else:
+                self.scheduler._stats.completed += 1
+        tail = seq.decoder.decode(b"", final=True)
+        if tail:
+            seq.emit(tail)
+        seq.emit(_DONE)
+
+
+class ChatScheduler:
+    """
+    Front door for local generation: admits chats, routes them to per-model
+    decode workers and exposes queue and throughput metrics.
+    """
+
+    def __init__(self, pool: ModelPool):
+        self.pool = pool
+        self._cond = threading.Condition()
+        self._workers: Dict[Path, _DecodeWorker] = {}
+        self.prefix_cache = PrefixCache(
+            settings.llm_prefix_cache_bytes, settings.llm_prefix_block_tokens
+        )
+        self._stats = _Stats()
+
+    @property
+    def queue_depth(self) -> int:
+        """Chats waiting for a decode slot across all models."""
+        with self._cond:
+            return sum(len(w.waiting) for w in self._workers.values())
+
+    def _enqueue(self, path: Path, seq: ChatSequence) -> None:
+        with self._cond:
+            waiting = sum(len(w.waiting) for w in self._workers.values())
+            if waiting >= settings.llm_max_queued_requests:
+                raise SchedulerFullError(f"{waiting} chats already waiting")
+            worker = self._workers.get(path)
+            if worker is None:
+                worker = self._workers[path] = _DecodeWorker(self, path)
+                worker.start()
+            worker.waiting.append(seq)
+            self._cond.notify_all()
+
+    def _worker_failed(self, worker: _DecodeWorker, error: Exception) -> None:
+        with self._cond:
+            if self._workers.get(worker.path) is worker:
+                del self._workers[worker.path]
+            pending = list(worker.waiting) + worker.active
+            worker.waiting.clear()
+        with self._stats.lock:
+            self._stats.failed += len(pending)
+        for seq in pending:
+            seq.emit(error)
+
+    async def generate(
+        self,
+        model_name: str,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream text pieces for one chat as they are decoded.
+
+        Closing the iterator (e.g. because the gRPC call was cancelled) frees
+        the sequence's slot at the next decode step.
+
+        Raises:
+            ModelNotFoundError: If no GGUF file matches `model_name`.
+            SchedulerFullError: If settings.llm_max_queued_requests chats wait.
+        """
+        path = self.pool.resolve(model_name)
+        seq = ChatSequence(
+            messages=messages,
+            max_tokens=max_tokens or settings.llm_max_tokens,
+            temperature=(
+                settings.llm_temperature if temperature is None else temperature
+            ),
+            loop=asyncio.get_running_loop(),
+            outbox=asyncio.Queue(),
+        )
+        self._enqueue(path, seq)
+        try:
+            while (item := await seq.outbox.get()) is not _DONE:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            seq.cancelled.set()
+            with self._cond:
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, float]:
+        """Queue depth, concurrency, throughput and prefix cache counters."""
+        with self._cond:
+            waiting = sum(len(w.waiting) for w in self._workers.values())
+            active = sum(len(w.active) for w in self._workers.values())
+            workers = len(self._workers)
+        with self._stats.lock:
+            s = self._stats
+            stats = {
+                "queue_depth": waiting,
+                "active_sequences": active,
+                "decode_workers": workers,
+                "completed": s.completed,
+                "cancelled": s.cancelled,
+                "failed": s.failed,
+                "prompt_tokens": s.prompt_tokens,
+                "tokens_generated": s.tokens_generated,
+                "decode_steps": s.decode_steps,
+                "mean_batch_size": (
+                    s.batched_sequences / s.decode_steps if s.decode_steps else 0.0
+                ),
+                "tokens_per_second": (
+                    s.tokens_generated / s.busy_seconds if s.busy_seconds else 0.0
+                ),
+                "mean_queue_wait_seconds": (
+                    s.queue_wait_seconds / (s.completed + s.cancelled)
+                    if s.completed + s.cancelled
+                    else 0.0
+                ),
+            }
+        for name, value in self.prefix_cache.stats().items():
+            stats[f"prefix_cache_{name}"] = value
+        return stats
+
+    def shutdown(self) -> None:
+        """Stop idle workers; active chats are ended."""
+        with self._cond:
+            workers = list(self._workers.values())
+            for worker in workers:
+                worker.stopping = True
+                for seq in worker.waiting:
+                    seq.cancelled.set()
+                for seq in worker.active:
+                    seq.cancelled.set()
+            self._cond.notify_all()
+        for worker in workers:
+            worker.join(timeout=5)
+        self.prefix_cache.clear()
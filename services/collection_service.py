@@ -0,0 +1,298 @@
+# backend/services/collection_service.py
+
+"""
+Named collections, each an independent VectorService on disk.
+
+The default collection (settings.default_collection) lives directly in
+settings.faiss_index_dir, so a store created before collections existed is
+that collection; every other one has its own index, WAL and chunk store in
+settings.faiss_index_dir / "collections" / <name>. All collections share one
+embedding engine and one embedding cache, so the model loads once.
+
+Collections are opened on first use and kept in LRU order. Whenever one is
+opened or released, the least recently used collections nobody is using are
+closed until the estimated memory of the open ones
+(VectorService.memory_bytes) fits settings.collection_memory_bytes. A
+collection in use is never closed, so a single collection larger than the
+budget still works; it just keeps every other one on disk.
+"""
+
+import asyncio
+import logging
+import re
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from config.settings import settings
+from services import metrics
+from services.embedding_engine import EmbeddingEngine
+from services.vector_service import VectorService, build_embedding_cache
+
+logger = logging.getLogger(__name__)
+
+COLLECTIONS_DIR = "collections"
+_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+
+
+class InvalidCollectionError(ValueError):
+    """Raised for a collection name that is not a safe directory name."""
+
+
+class CollectionNotFoundError(Exception):
+    """Raised when reading from a collection nothing was ever uploaded to."""
+
+
+def collection_path(name: str) -> Path:
+    """
+    Directory holding collection `name`.
+
+    Args:
+        name (str): 1-64 letters, digits, "_", "." or "-", starting with a
+            letter or digit.
+
+    Returns:
+        Path: settings.faiss_index_dir for the default collection, else its
+        directory under settings.faiss_index_dir / "collections".
+
+    Raises:
+        InvalidCollectionError: If `name` is not a valid collection name.
+    """
+    if not _NAME.fullmatch(name):
+        raise InvalidCollectionError(f"Invalid collection name: {name!r}")
+    if name == settings.default_collection:
+        return settings.faiss_index_dir
+    return settings.faiss_index_dir / COLLECTIONS_DIR / name
+
+
+class _Entry:
+    """An open collection, its active leases and the epoch it was opened in."""
+
+    __slots__ = ("service", "leases", "epoch")
+
+    def __init__(self, service: VectorService, epoch: int):
+        self.service = service
+        self.leases = 1
+        self.epoch = epoch
+
+
+class CollectionManager:
+    """
+    Opens, shares and evicts the VectorService of every collection.
+
+    Thread-safe. Callers hold a lease while they use a collection (`lease`,
+    `lease_async`, or `acquire` followed by `release`). Opening and closing
+    a collection run outside the manager lock, so a slow load never blocks
+    searches in collections that are already open.
+
+    Args:
+        embedder: Embedding engine shared by every collection; the local
+            settings.embedding_model EmbeddingEngine when None.
+    """
+
+    def __init__(self, embedder=None):
+        self.engine = embedder or EmbeddingEngine.from_settings(
+            settings.embedding_model
+        )
+        self.embedder = build_embedding_cache(
+            self.engine, settings.faiss_index_dir / "embedding_cache"
+        )
+        self._open: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Held while a collection is opened or closed, so it never has two
+        # VectorServices over the same files
+        self._name_locks: Dict[str, threading.Lock] = {}
+        self._closed_versions: Dict[str, Tuple[int, int]] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    # --- Leases ---------------------------------------------------------------
+
+    def _lease_open(self, name: str) -> Optional[VectorService]:
+        """Lease `name` if it is open (caller holds the lock)."""
+        entry = self._open.get(name)
+        if entry is None:
+            return None
+        entry.leases += 1
+        self._open.move_to_end(name)
+        return entry.service
+
+    def acquire(
+        self, name: Optional[str] = None, create: bool = False
+    ) -> VectorService:
+        """
+        Lease collection `name`, opening it first if needed. Blocking.
+
+        Args:
+            name (Optional[str]): Collection name; the default when None.
+            create (bool): Create the collection if it does not exist yet
+                (uploads); otherwise only the default one is created.
+
+        Returns:
+            VectorService: The collection's store; pair with `release(name)`.
+
+        Raises:
+            InvalidCollectionError: If `name` is not a valid collection name.
+            CollectionNotFoundError: If the collection does not exist and
+                `create` is False.
+        """
+        name = name or settings.default_collection
+        path = collection_path(name)
+        with self._lock:
+            service = self._lease_open(name)
+            if service is not None:
+                return service
+            name_lock = self._name_locks.setdefault(name, threading.Lock())
+
+        with name_lock:
+            with self._lock:
+                service = self._lease_open(name)  # Opened while we waited
+                if service is not None:
+                    return service
+            if not (create or name == settings.default_collection or path.is_dir()):
+                raise CollectionNotFoundError(f"Unknown collection: {name}")
+            with metrics.COLLECTION_OPEN_SECONDS.time():
+                service = VectorService(self.embedder, index_path=path)
+            with self._lock:
+                self._epoch += 1
+                self._open[name] = _Entry(service, self._epoch)
+                self._closed_versions.pop(name, None)
+                victims = self._pick_victims()
+        self._close(victims)
+        return service
+
+    def release(self, name: Optional[str] = None) -> None:
+        """Return a lease taken by `acquire`; may close idle collections."""
+        name = name or settings.default_collection
+        with self._lock:
+            self._open[name].leases -= 1
+            victims = self._pick_victims()
+        self._close(victims)
+
+    @contextmanager
+    def lease(
+        self, name: Optional[str] = None, create: bool = False
+    ) -> Iterator[VectorService]:
+        """`acquire` / `release` around a block of blocking code."""
+        service = self.acquire(name, create)
+        try:
+            yield service
+        finally:
+            self.release(name)
+
+    @asynccontextmanager
+    async def lease_async(
+        self, name: Optional[str] = None, create: bool = False
+    ) -> AsyncIterator[VectorService]:
+        """`lease` for coroutines: opening and closing run off the event loop."""
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self.acquire, name, create))
+        try:
+            service = await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The thread still finishes opening; hand its lease back then
+            def give_back(future: asyncio.Future) -> None:
+                if not future.cancelled() and future.exception() is None:
+                    asyncio.get_running_loop().run_in_executor(None, self.release, name)
+
+            acquiring.add_done_callback(give_back)
+            raise
+        try:
+            yield service
+        finally:
+            await asyncio.to_thread(self.release, name)
+
+    # --- Eviction -------------------------------------------------------------
+
+    def _pick_victims(self) -> List[Tuple[str, VectorService, threading.Lock]]:
+        """
+        Unlink idle collections, least recently used first, until the open
+        ones fit settings.collection_memory_bytes (caller holds the lock).
+
+        Each victim's name lock is taken here and released by `_close`.
+        """
+        sizes = {name: entry.service.memory_bytes for name, entry in self._open.items()}
+        total = sum(sizes.values())
+        victims = []
+        for name, entry in list(self._open.items()):
+            if total <= settings.collection_memory_bytes:
+                break
+            name_lock = self._name_locks[name]
+            if entry.leases or not name_lock.acquire(blocking=False):
+                continue
+            del self._open[name]
+            self._closed_versions[name] = (entry.epoch, entry.service.corpus_version)
+            total -= sizes[name]
+            victims.append((name, entry.service, name_lock))
+        return victims
+
+    def _close(self, victims: List[Tuple[str, VectorService, threading.Lock]]) -> None:
+        for name, service, name_lock in victims:
+            try:
+                service.close()
+                self.evictions += 1
+                metrics.COLLECTION_EVICTIONS.inc()
+                logger.info("Closed collection %s to stay within memory budget", name)
+            except Exception:
+                logger.exception("Closing collection %s failed", name)
+            finally:
+                name_lock.release()
+
+    # --- Introspection --------------------------------------------------------
+
+    def exists(self, name: Optional[str] = None) -> bool:
+        """Whether `name` can be read (the default collection always can)."""
+        name = name or settings.default_collection
+        return name == settings.default_collection or collection_path(name).is_dir()
+
+    def names(self) -> List[str]:
+        """Every collection on disk, the default one first."""
+        root = settings.faiss_index_dir / COLLECTIONS_DIR
+        others = sorted(
+            path.name
+            for path in (root.iterdir() if root.is_dir() else ())
+            if path.is_dir() and _NAME.fullmatch(path.name)
+        )
+        return [settings.default_collection] + others
+
+    def version(self, name: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Token that changes whenever the searchable chunks of `name` may have.
+
+        Combines the epoch the collection was opened in with its
+        corpus_version, so reopening it never repeats an earlier token.
+        """
+        name = name or settings.default_collection
+        with self._lock:
+            entry = self._open.get(name)
+            if entry is not None:
+                return entry.epoch, entry.service.corpus_version
+            return self._closed_versions.get(name, (0, 0))
+
+    def open_services(self) -> List[VectorService]:
+        """Stores of the currently open collections (for metrics)."""
+        with self._lock:
+            return [entry.service for entry in self._open.values()]
+
+    @property
+    def num_open(self) -> int:
+        return len(self._open)
+
+    @property
+    def memory_bytes(self) -> int:
+        """Estimated memory of the open collections."""
+        return sum(service.memory_bytes for service in self.open_services())
+
+    def close(self) -> None:
+        """Close every open collection and flush the shared embedding cache."""
+        with self._lock:
+            entries = list(self._open.items())
+            self._open.clear()
+        for name, entry in entries:
+            try:
+                entry.service.close()
+            except Exception:
+                logger.exception("Closing collection %s failed", name)
+        flush = getattr(self.embedder, "flush", None)
+        if flush is not None:
+            flush()
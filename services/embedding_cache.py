@@ -0,0 +1,211 @@
+# backend/services/embedding_cache.py
+
+"""
+Two-tier embedding cache wrapped around a LangChain `Embeddings` model.
+
+- Tier 1: in-process LRU of recently used vectors.
+- Tier 2: a memory-mapped file of fixed-width rows under
+  `<faiss_index_dir>/embedding_cache/<model>/`, each row holding a 16-byte
+  key and the float32 vector. A key→row map is rebuilt from the file at start
+  up and rows are recycled least-recently-used first once the file is full.
+
+Keys are blake2b digests of (model name, "query"/"document", text), so a
+model change never serves stale vectors and nothing is shared across models.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_KEY_BYTES = 16
+_EMPTY_KEY = bytes(_KEY_BYTES)
+
+
+def _slug(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", model_name).strip("_") or "model"
+
+
+class _DiskTier:
+    """Fixed-capacity, memory-mapped key/vector table with LRU slot reuse."""
+
+    def __init__(self, directory: Path, capacity: int):
+        self.directory = directory
+        self.capacity = capacity
+        self._rows: Optional[np.memmap] = None
+        self._lru: "OrderedDict[bytes, int]" = OrderedDict()
+        self._free: List[int] = []
+
+        meta_path = directory / "meta.json"
+        if meta_path.exists() and (directory / "rows.bin").exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("capacity") == capacity:
+                self._open(meta["dim"], mode="r+")
+            else:
+                # Resized: start over rather than migrating rows
+                (directory / "rows.bin").unlink()
+                meta_path.unlink()
+
+    def _dtype(self, dim: int) -> np.dtype:
+        return np.dtype([("key", f"V{_KEY_BYTES}"), ("vec", "<f4", (dim,))])
+
+    def _open(self, dim: int, mode: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._rows = np.memmap(
+            self.directory / "rows.bin",
+            dtype=self._dtype(dim),
+            mode=mode,
+            shape=(self.capacity,),
+        )
+        if mode == "w+":
+            (self.directory / "meta.json").write_text(
+                json.dumps({"dim": dim, "capacity": self.capacity}), encoding="utf-8"
+            )
+        for row, key in enumerate(self._rows["key"]):
+            key = bytes(key)
+            if key == _EMPTY_KEY:
+                self._free.append(row)
+            else:
+                self._lru[key] = row
+        self._free.reverse()  # pop() hands out low rows first
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        row = self._lru.get(key)
+        if row is None:
+            return None
+        self._lru.move_to_end(key)
+        return np.array(self._rows["vec"][row])
+
+    def put(self, key: bytes, vector: np.ndarray) -> None:
+        if self.capacity <= 0 or key in self._lru:
+            return
+        if self._rows is None:
+            self._open(vector.shape[-1], mode="w+")
+        if vector.shape[-1] != self._rows.dtype["vec"].shape[0]:
+            return  # Dimension changed under the same model name; don't cache
+
+        if self._free:
+            row = self._free.pop()
+        else:
+            _, row = self._lru.popitem(last=False)
+        # Vector first, key last: a torn write leaves an unreadable slot,
+        # never a key pointing at the wrong vector
+        self._rows["key"][row] = _EMPTY_KEY
+        self._rows["vec"][row] = vector
+        self._rows["key"][row] = key
+        self._lru[key] = row
+
+    def flush(self) -> None:
+        if self._rows is not None:
+            self._rows.flush()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    `Embeddings` decorator that serves repeated texts without running the model.
+
+    Thread-safe: lookups and inserts are serialized, model calls are not.
+    """
+
+    def __init__(
+        self,
+        base: Embeddings,
+        model_name: str,
+        directory: Path,
+        memory_items: int,
+        disk_items: int,
+    ):
+        self.base = base
+        self.model_name = model_name
+        self.memory_items = memory_items
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._disk = _DiskTier(directory / _slug(model_name), disk_items)
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+    def _key(self, kind: str, text: str) -> bytes:
+        digest = hashlib.blake2b(digest_size=_KEY_BYTES)
+        digest.update(self.model_name.encode("utf-8"))
+        digest.update(b"\0" + kind.encode("ascii") + b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.digest()
+
+    def _lookup(self, key: bytes) -> Optional[np.ndarray]:
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            self.hits_memory += 1
+            return vector
+        vector = self._disk.get(key)
+        if vector is not None:
+            self.hits_disk += 1
+            self._remember(key, vector)
+            return vector
+        self.misses += 1
+        return None
+
+    def _remember(self, key: bytes, vector: np.ndarray) -> None:
+        if self.memory_items <= 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _embed(self, kind: str, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(kind, text) for text in texts]
+        found: Dict[bytes, np.ndarray] = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                vector = self._lookup(key)
+                if vector is not None:
+                    found[key] = vector
+
+        # Embed each distinct missing text once
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            miss_texts = list(missing.values())
+            if kind == "query":
+                computed = [self.base.embed_query(miss_texts[0])]
+            else:
+                computed = self.base.embed_documents(miss_texts)
+            with self._lock:
+                for key, vector in zip(missing, computed):
+                    vector = np.asarray(vector, dtype=np.float32)
+                    found[key] = vector
+                    self._remember(key, vector)
+                    self._disk.put(key, vector)
+
+        return [found[key].tolist() for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed("document", texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed("query", [text])[0]
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current tier sizes."""
+        with self._lock:
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "memory_items": len(self._memory),
+                "disk_items": len(self._disk),
+            }
+
+    def flush(self) -> None:
+        """Write dirty disk-tier pages back to the file."""
+        with self._lock:
+            self._disk.flush()
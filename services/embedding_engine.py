@@ -0,0 +1,222 @@
+# backend/services/embedding_engine.py
+
+"""
+Batched, device-aware sentence-transformers engine behind VectorService.
+
+- The model loads on first use, so importing torch is not a start-up cost.
+- `dimension` comes from the model config, not from a probe inference.
+- Texts are sorted by length and grouped into batches sized from free
+  RAM/VRAM, so short chunks share a forward pass and long ones do not
+  exhaust memory. Results are returned in input order.
+- CPU inference can use a fixed number of torch intra-op threads, dynamic
+  int8 quantization ("torch_int8") or ONNX Runtime ("onnx").
+"""
+
+import logging
+import os
+import threading
+from typing import Any, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Cheap token estimate used only for sorting and memory budgeting
+_CHARS_PER_TOKEN = 4
+_FALLBACK_FREE_BYTES = 2 * 1024**3
+
+
+def _free_cpu_bytes() -> int:
+    """MemAvailable from /proc/meminfo, falling back to sysconf."""
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return _FALLBACK_FREE_BYTES
+
+
+class EmbeddingEngine(Embeddings):
+    """
+    LangChain `Embeddings` over a locally loaded SentenceTransformer.
+
+    Args:
+        model_name (str): Hugging Face model id.
+        device (Optional[str]): Torch device; auto-detected when None.
+        backend (str): "torch", "torch_int8" or "onnx" (the last two on CPU).
+        threads (int): Torch intra-op threads for CPU inference (0 = default).
+        batch_size (int): Fixed batch size, or 0 to size batches dynamically.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        device: Optional[str] = None,
+        backend: str = "torch",
+        threads: int = 0,
+        batch_size: int = 0,
+    ):
+        self.model_name = model_name
+        self.device = device
+        self.backend = backend
+        self.threads = threads
+        self.batch_size = batch_size
+        self._model: Any = None
+        self._config: Any = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, model_name: str) -> "EmbeddingEngine":
+        return cls(
+            model_name,
+            device=settings.embedding_device,
+            backend=settings.embedding_backend,
+            threads=settings.embedding_threads,
+            batch_size=settings.embedding_batch_size,
+        )
+
+    @property
+    def cache_namespace(self) -> str:
+        """Quantized backends yield slightly different vectors; cache apart."""
+        if self.backend == "torch":
+            return self.model_name
+        return f"{self.model_name}@{self.backend}"
+
+    # --- Model --------------------------------------------------------------
+
+    def _model_config(self) -> Any:
+        if self._config is None:
+            from transformers import AutoConfig
+
+            self._config = AutoConfig.from_pretrained(self.model_name)
+        return self._config
+
+    @property
+    def dimension(self) -> int:
+        """Embedding size, read from the model config without inference."""
+        if self._model is not None:
+            return self._model.get_sentence_embedding_dimension()
+        return self._model_config().hidden_size
+
+    def _load(self) -> Any:
+        with self._lock:
+            if self._model is None:
+                self._model = self._build()
+        return self._model
+
+    def _build(self) -> Any:
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        device = self.device or ("cuda" if torch.cuda.is_available() else "cpu")
+        backend = self.backend
+        if backend != "torch" and device != "cpu":
+            logger.warning("embedding_backend=%s is CPU-only; using torch", backend)
+            backend = "torch"
+        if device == "cpu" and self.threads > 0:
+            torch.set_num_threads(self.threads)
+
+        if backend == "onnx":
+            model_kwargs = (
+                {"file_name": settings.embedding_onnx_file}
+                if settings.embedding_onnx_file
+                else None
+            )
+            model = SentenceTransformer(
+                self.model_name,
+                device=device,
+                backend="onnx",
+                model_kwargs=model_kwargs,
+            )
+        else:
+            model = SentenceTransformer(self.model_name, device=device)
+            if backend == "torch_int8":
+                model = torch.ao.quantization.quantize_dynamic(
+                    model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+        logger.info(
+            "Loaded embedding model %s on %s (backend=%s)",
+            self.model_name,
+            device,
+            backend,
+        )
+        return model
+
+    # --- Batching -----------------------------------------------------------
+
+    def _free_bytes(self, model: Any) -> int:
+        if str(model.device).startswith("cuda"):
+            import torch
+
+            return torch.cuda.mem_get_info(model.device)[0]
+        return _free_cpu_bytes()
+
+    def _bytes_per_sequence(self, tokens: int) -> int:
+        """
+        Rough peak activation size of one sequence during a no-grad forward
+        pass: hidden states plus the feed-forward block plus attention scores.
+        """
+        config = self._model_config()
+        hidden = config.hidden_size
+        intermediate = getattr(config, "intermediate_size", 4 * hidden)
+        heads = getattr(config, "num_attention_heads", 1)
+        return 4 * (tokens * (4 * hidden + intermediate) + heads * tokens * tokens)
+
+    def _batches(self, model: Any, texts: List[str]) -> List[List[int]]:
+        """Index groups over `texts`, longest first, sized to the memory budget."""
+        max_tokens = getattr(model, "max_seq_length", None) or 512
+        tokens = [min(max_tokens, len(text) // _CHARS_PER_TOKEN + 2) for text in texts]
+        order = sorted(range(len(texts)), key=lambda i: tokens[i], reverse=True)
+        if self.batch_size > 0:
+            return [
+                order[i : i + self.batch_size]
+                for i in range(0, len(order), self.batch_size)
+            ]
+
+        budget = self._free_bytes(model) * settings.embedding_memory_fraction
+        batches: List[List[int]] = []
+        for i in order:
+            batch = batches[-1] if batches else None
+            # Sorted longest first, so batch[0] sets the padded length
+            if (
+                batch is not None
+                and len(batch) < settings.embedding_max_batch_size
+                and (len(batch) + 1) * self._bytes_per_sequence(tokens[batch[0]])
+                <= budget
+            ):
+                batch.append(i)
+            else:
+                batches.append([i])
+        return batches
+
+    # --- Embeddings API -----------------------------------------------------
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed `texts` into a (len(texts), dim) float32 matrix."""
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        model = self._load()
+        out: Optional[np.ndarray] = None
+        for batch in self._batches(model, texts):
+            vectors = model.encode(
+                [texts[i] for i in batch],
+                batch_size=len(batch),
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+            if out is None:
+                out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[batch] = vectors
+        return out
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
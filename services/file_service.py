@@ -1,24 +1,92 @@
+import asyncio
 import os
 from tempfile import NamedTemporaryFile
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Tuple, Type
 from fastapi import UploadFile, HTTPException
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+from config.settings import settings
 from models.chunk import Chunk
+from services import metrics
 from services.loaders import loaders
 from utils import chunk_util
 
 
+def resolve_loader(filename: str) -> Tuple[str, Type[BaseLoader]]:
+    """
+    Pick the LangChain loader for a filename based on its extension.
+
+    Returns:
+        Tuple[str, Type[BaseLoader]]: The lower-cased suffix and loader class.
+
+    Raises:
+        HTTPException: 415 if the extension is not supported.
+    """
+    suffix = Path(filename).suffix.lower()
+    loader_cls = loaders.EXTENSION_LOADER_MAP.get(suffix, None)
+
+    if not loader_cls:
+        raise HTTPException(status_code=415, detail=f"Invalid File Format: {suffix}")
+    return suffix, loader_cls
+
+
+async def spool_upload(file: UploadFile, suffix: str) -> str:
+    """
+    Save an UploadFile to a temporary local path for loader compatibility.
+
+    The body is copied in settings.upload_spool_chunk_bytes pieces and every
+    disk write runs in a worker thread, so neither memory nor the event loop
+    scale with the file size.
+
+    Returns:
+        str: Path of the temporary file. The caller owns its deletion
+        (`iter_documents` removes it once loaded).
+    """
+    with metrics.INGEST_SPOOL.time():
+        tmp = await asyncio.to_thread(NamedTemporaryFile, suffix=suffix, delete=False)
+        try:
+            while piece := await file.read(settings.upload_spool_chunk_bytes):
+                await asyncio.to_thread(tmp.write, piece)
+        except BaseException:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+        await asyncio.to_thread(tmp.close)
+    return tmp.name
+
+
+def iter_documents(path: str, suffix: str) -> Iterator[Document]:
+    """
+    Lazily load a spooled file into LangChain Documents and delete it.
+
+    Uses the loader's `lazy_load()`, so page-, row- or element-wise loaders
+    hold one Document at a time. The file is removed once the iterator is
+    exhausted or closed. Blocking and module-level so it can run in a thread
+    or process pool.
+    """
+    loader_cls = loaders.EXTENSION_LOADER_MAP[suffix]
+    try:
+        yield from loader_cls(path).lazy_load()
+    finally:
+        os.remove(path)
+
+
 async def ingest_file(file: UploadFile) -> List[Chunk]:
     """
     Ingests an uploaded file, loads its content, splits into overlapping chunks,
     and returns a list of Chunk models.
 
     Process:
-    1. Save the UploadFile to a temporary local path.
+    1. Stream the UploadFile to a temporary local path.
     2. Select the appropriate loader based on the file extension.
-    3. Use LangChain loader to read the file into Document objects.
-    4. Split Documents into chunks using RecursiveCharacterTextSplitter.
-    5. Wrap each chunk into a Pydantic Chunk model with metadata.
+    3. Use the LangChain loader's lazy_load() to read Document objects.
+    4. Split Documents into chunk records with the single-pass Chunker.
+    5. Convert each record into a Pydantic Chunk model with metadata.
+
+    Loading and splitting run in a worker thread. The HTTP upload path uses
+    `services.ingest_pipeline` instead, which also streams the chunks in
+    micro-batches; this helper remains for direct callers.
 
     Args:
         file (UploadFile): The incoming file from the HTTP request.
@@ -27,22 +95,18 @@ async def ingest_file(file: UploadFile) -> List[Chunk]:
         List[Chunk]: A list of Chunk instances ready for embedding.
     """
     # Determine file extension and loader
-    suffix = Path(file.filename).suffix.lower()
-    loader_cls = loaders.EXTENSION_LOADER_MAP.get(suffix, None)
-
-    if not loader_cls:
-        raise HTTPException(status_code=415, detail=f"Invalid File Format: {suffix}")
-
-    # Save to a temporary file for loader compatibility
-    with NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-        content = await file.read()
-        tmp.write(content)
-        tmp_path = tmp.name
+    suffix, _ = resolve_loader(file.filename)
+    tmp_path = await spool_upload(file, suffix)
 
-    # Load documents from the temporary file and then delete it
-    loader = loader_cls(tmp_path)
-    docs = loader.load()
-    os.remove(tmp_path)
+    # Load documents from the temporary file (deleted once read) and split
+    def _load_and_split() -> List[Chunk]:
+        with metrics.INGEST_LOAD_SPLIT.time():
+            docs = iter_documents(tmp_path, suffix)
+            chunks = [
+                record.to_chunk()
+                for record in chunk_util.split_document(docs, file.filename, suffix)
+            ]
+        metrics.INGEST_CHUNKS.labels(suffix.lstrip(".")).inc(len(chunks))
+        return chunks
 
-    chunks: List[Chunk] = chunk_util.split_document(docs, file.filename, suffix)
-    return chunks
+    return await asyncio.to_thread(_load_and_split)
@@ -0,0 +1,203 @@
+# backend/services/index_factory.py
+
+"""
+Settings-driven construction, training and query tuning of FAISS indexes.
+
+Supported `settings.faiss_index_type` values:
+  - "flat":     exact IndexFlatL2 (brute force, no training)
+  - "ivf_flat": IndexIVFFlat, inverted lists over full vectors
+  - "ivf_pq":   IndexIVFPQ, inverted lists over product-quantized codes
+  - "hnsw":     IndexHNSWFlat graph index (no training)
+"""
+
+import logging
+from pathlib import Path
+from typing import Literal, Optional
+import faiss
+import numpy as np
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+IndexType = Literal["flat", "ivf_flat", "ivf_pq", "hnsw"]
+
+# FAISS wants roughly this many training points per IVF centroid
+_MIN_POINTS_PER_CENTROID = 39
+
+
+def build_index(kind: IndexType, dim: int, num_vectors: int = 0) -> faiss.Index:
+    """
+    Create an empty index of the requested kind.
+
+    Args:
+        kind (IndexType): One of "flat", "ivf_flat", "ivf_pq", "hnsw".
+        dim (int): Embedding dimension.
+        num_vectors (int): Expected training set size, used to cap `nlist`.
+
+    Returns:
+        faiss.Index: An index that may still need `train()` (IVF kinds).
+    """
+    if kind == "flat":
+        return faiss.IndexFlatL2(dim)
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, settings.faiss_hnsw_m)
+        index.hnsw.efConstruction = settings.faiss_hnsw_ef_construction
+        return index
+
+    nlist = settings.faiss_ivf_nlist
+    if num_vectors:
+        nlist = max(1, min(nlist, num_vectors // _MIN_POINTS_PER_CENTROID))
+    quantizer = faiss.IndexFlatL2(dim)
+    if kind == "ivf_flat":
+        return faiss.IndexIVFFlat(quantizer, dim, nlist)
+    if kind == "ivf_pq":
+        if dim % settings.faiss_pq_m:
+            raise ValueError(
+                f"faiss_pq_m={settings.faiss_pq_m} must divide the dimension {dim}"
+            )
+        return faiss.IndexIVFPQ(
+            quantizer, dim, nlist, settings.faiss_pq_m, settings.faiss_pq_nbits
+        )
+    raise ValueError(f"Unknown FAISS index type: {kind}")
+
+
+def initial_index(dim: int) -> faiss.Index:
+    """
+    Index for a brand-new, empty store.
+
+    Trainable kinds cannot accept vectors before they are trained, so an
+    empty store starts as Flat until `scripts.train_index` is run.
+    """
+    kind = settings.faiss_index_type
+    if kind in ("ivf_flat", "ivf_pq"):
+        logger.warning(
+            "faiss_index_type=%s needs training data; starting with a flat index. "
+            "Run `python -m scripts.train_index` once documents are ingested.",
+            kind,
+        )
+        kind = "flat"
+    return build_index(kind, dim)
+
+
+def train_index(kind: IndexType, vectors: np.ndarray) -> faiss.Index:
+    """
+    Build an index of `kind`, train it on a sample of `vectors` and add them all.
+
+    Args:
+        kind (IndexType): Target index type.
+        vectors (np.ndarray): (n, dim) float32 matrix, in docstore order.
+
+    Returns:
+        faiss.Index: A populated index whose ids are 0..n-1 in input order.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = build_index(kind, vectors.shape[1], num_vectors=len(vectors))
+    if not index.is_trained:
+        sample = vectors
+        if len(vectors) > settings.faiss_train_sample:
+            rng = np.random.default_rng(0)
+            picks = rng.choice(len(vectors), settings.faiss_train_sample, replace=False)
+            sample = vectors[np.sort(picks)]
+        index.train(sample)
+    index.add(vectors)
+    return index
+
+
+def index_kind(index: faiss.Index) -> str:
+    """Best-effort reverse mapping from a FAISS index to an IndexType name."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf = faiss.downcast_index(ivf)
+        return "ivf_pq" if isinstance(ivf, faiss.IndexIVFPQ) else "ivf_flat"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def memory_bytes(index: faiss.Index) -> int:
+    """Approximate bytes of vector codes (and HNSW links) held by `index`."""
+    hnsw = getattr(index, "hnsw", None)
+    if hnsw is not None:
+        links = 2 * settings.faiss_hnsw_m * np.dtype(np.int32).itemsize
+        return index.ntotal * (index.d * np.dtype(np.float32).itemsize + links)
+    try:
+        code_size = index.sa_code_size()
+    except RuntimeError:
+        code_size = index.d * np.dtype(np.float32).itemsize
+    return index.ntotal * code_size
+
+
+def stores_exact_vectors(index: faiss.Index) -> bool:
+    """True if `reconstruct` returns the original vectors (not PQ codes)."""
+    return index_kind(index) != "ivf_pq"
+
+
+def reconstruct(index: faiss.Index, start: int, count: int) -> np.ndarray:
+    """Read back `count` stored vectors starting at id `start`."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    return index.reconstruct_n(start, count)
+
+
+def read_index(path: Path, kind: str, mmap: bool = True) -> faiss.Index:
+    """
+    Load a persisted index, memory-mapping it when possible.
+
+    Flat codes (Flat, HNSW storage) map via IO_FLAG_MMAP_IFC and IVF inverted
+    lists via IO_FLAG_MMAP. Mapped indexes are read-only: adding to them
+    aborts, so callers must treat them as immutable.
+
+    Args:
+        path (Path): Index file written by `faiss.write_index`.
+        kind (str): The IndexType recorded when the file was written.
+        mmap (bool): False loads a private, mutable copy into RAM.
+    """
+    if not mmap:
+        return faiss.read_index(str(path))
+    if kind in ("ivf_flat", "ivf_pq"):
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    else:
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+    return faiss.read_index(str(path), flags)
+
+
+def search_params(
+    index: faiss.Index,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    selector: Optional[faiss.IDSelector] = None,
+    exhaustive: bool = False,
+) -> Optional[faiss.SearchParameters]:
+    """
+    Per-query search parameters for `index`.
+
+    Args:
+        nprobe (Optional[int]): IVF lists to visit (default settings.faiss_nprobe).
+        ef_search (Optional[int]): HNSW candidate list size
+            (default settings.faiss_ef_search).
+        selector (Optional[faiss.IDSelector]): Restrict results to these ids;
+            the caller must keep it alive until the search returns.
+        exhaustive (bool): Visit every IVF list / widen the HNSW beam to the
+            whole index, for filters too selective for the defaults.
+
+    Returns:
+        Optional[faiss.SearchParameters]: None for flat indexes without a
+        selector.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        nprobe = ivf.nlist if exhaustive else nprobe or settings.faiss_nprobe
+        params = faiss.SearchParametersIVF(nprobe=nprobe)
+    elif isinstance(index, faiss.IndexHNSW):
+        ef_search = ef_search or settings.faiss_ef_search
+        if exhaustive:
+            ef_search = max(ef_search, index.ntotal)
+        params = faiss.SearchParametersHNSW(efSearch=ef_search)
+    elif selector is not None:
+        params = faiss.SearchParameters()
+    else:
+        return None
+    if selector is not None:
+        params.sel = selector
+    return params
@@ -0,0 +1,466 @@
+# backend/services/ingest_pipeline.py
+
+"""
+Staged, off-event-loop, streaming ingestion pipeline.
+
+Each uploaded file flows through three stages connected by bounded asyncio
+queues:
+
+    load (+ split)  ->  embed  ->  index
+
+`load` streams the spooled file through the loader's `lazy_load()` and the
+generator-based splitter on a thread or process pool
+(settings.ingest_executor), handing chunks on in micro-batches of
+settings.ingest_batch_size. `embed` runs on its own thread pool, and `index`
+runs on a single thread so WAL appends stay ordered. Every hop is bounded,
+so peak memory depends on the batch and queue sizes, not on the file size.
+The event loop only shuffles batches between queues. Once every batch of a
+file is indexed, chunks of its previous upload that the new version no
+longer contains are deleted, so re-uploading a file replaces it.
+
+One pipeline serves every collection: each file carries the VectorService
+it is indexed into, and the caller holds that collection's lease until
+`submit` returns.
+
+Admission is bounded by settings.ingest_max_pending; once that many files are
+in flight `submit` raises PipelineFullError and the controller answers 429.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from contextlib import aclosing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Collection,
+    List,
+    Optional,
+    Set,
+    Union,
+)
+import numpy as np
+from config.settings import settings
+from models.chunk import ChunkRecord
+from services import file_service, metrics
+from services.loaders import parallel_loader
+from services.vector_service import VectorService
+from utils import chunk_util
+
+# How often a blocked producer or consumer re-checks for cancellation
+_POLL_SECONDS = 0.5
+
+
+class PipelineFullError(Exception):
+    """Raised when the pipeline has no capacity to admit another file."""
+
+
+class StageError(Exception):
+    """Wraps an exception raised inside a pipeline stage."""
+
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f"{stage} stage failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+@dataclass
+class IngestTask:
+    """A single file moving through the pipeline."""
+
+    path: str
+    filename: str
+    suffix: str
+    vector_service: VectorService
+    future: asyncio.Future
+    num_chunks: int = 0
+    added: int = 0
+    first_chunk_id: Optional[str] = None
+    batches_pending: int = 0
+    loaded: bool = False
+    chunk_ids: Set[str] = field(default_factory=set)
+
+
+@dataclass
+class IngestBatch:
+    """One micro-batch of a file's chunks moving through embed and index."""
+
+    task: IngestTask
+    chunks: List[ChunkRecord]
+    vectors: Optional[np.ndarray] = field(default=None, repr=False)
+
+
+@dataclass
+class IngestResult:
+    """What `IngestionPipeline.submit` reports back for one file."""
+
+    num_chunks: int
+    added: int
+    first_chunk_id: Optional[str] = None
+    removed: int = 0
+
+    @property
+    def skipped(self) -> int:
+        return self.num_chunks - self.added
+
+
+def _put(out: Any, item: Any, stop: Any) -> bool:
+    """Blocking put that gives up once `stop` is set."""
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def produce_chunk_batches(
+    path: str, filename: str, suffix: str, batch_size: int, out: Any, stop: Any
+) -> None:
+    """
+    Load, split and push `batch_size`-chunk lists onto `out`, then None.
+
+    Runs on the CPU pool; `out` is bounded, so loading pauses while the
+    consumer is behind. Module-level so it can run in a process pool (with
+    Manager queue/event proxies).
+    """
+    docs = file_service.iter_documents(path, suffix)
+    try:
+        batch: List[ChunkRecord] = []
+        for chunk in chunk_util.split_document(docs, filename, suffix):
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                if not _put(out, batch, stop):
+                    return
+                batch = []
+        if batch and not _put(out, batch, stop):
+            return
+        _put(out, None, stop)
+    finally:
+        docs.close()
+        if os.path.exists(path):
+            os.remove(path)  # Stopped before the loader opened the file
+
+
+class IngestionPipeline:
+    """
+    Bounded load/embed/index pipeline shared by every collection.
+
+    Worker tasks start lazily on the first `submit`, so the pipeline can be
+    created at import time before an event loop exists.
+    """
+
+    def __init__(self):
+        self._pending = 0
+        self._workers: List[asyncio.Task] = []
+        self._cpu_pool: Optional[Executor] = None
+        self._embed_pool: Optional[Executor] = None
+        self._index_pool: Optional[Executor] = None
+        self._manager: Any = None
+        self._load_queue: Optional[asyncio.Queue] = None
+
+    @property
+    def pending(self) -> int:
+        """Number of files currently admitted and not yet finished."""
+        return self._pending
+
+    def _start(self) -> None:
+        if settings.ingest_executor == "process":
+            self._cpu_pool = ProcessPoolExecutor(settings.ingest_load_workers)
+            # Chunk batches cross the process boundary through Manager queues
+            self._manager = multiprocessing.Manager()
+        else:
+            self._cpu_pool = ThreadPoolExecutor(
+                settings.ingest_load_workers, thread_name_prefix="ingest-load"
+            )
+        self._embed_pool = ThreadPoolExecutor(
+            settings.ingest_embed_workers, thread_name_prefix="ingest-embed"
+        )
+        self._index_pool = ThreadPoolExecutor(1, thread_name_prefix="ingest-index")
+
+        # The first queue absorbs every admitted file, so submit never blocks
+        self._load_queue = asyncio.Queue(maxsize=settings.ingest_max_pending)
+        embed_queue = asyncio.Queue(maxsize=settings.ingest_queue_size)
+        index_queue = asyncio.Queue(maxsize=settings.ingest_queue_size)
+
+        stages = [
+            (
+                self._load_queue,
+                "load",
+                lambda task: self._load(task, embed_queue),
+                settings.ingest_load_workers,
+            ),
+            (
+                embed_queue,
+                "embed",
+                lambda batch: self._embed(batch, index_queue),
+                settings.ingest_embed_workers,
+            ),
+            (index_queue, "index", self._index, 1),
+        ]
+        for inbox, name, stage, count in stages:
+            for _ in range(count):
+                self._workers.append(
+                    asyncio.create_task(self._run_stage(inbox, name, stage))
+                )
+
+    async def submit(
+        self, path: str, filename: str, suffix: str, vector_service: VectorService
+    ) -> IngestResult:
+        """
+        Admit a spooled file and wait until it has been indexed.
+
+        The pipeline owns `path` from this call on and removes it once it is
+        loaded, fails or is rejected.
+
+        Args:
+            path (str): Temporary file produced by `file_service.spool_upload`.
+            filename (str): Original upload name, used as the chunk source.
+            suffix (str): Lower-cased file extension.
+            vector_service (VectorService): Store of the target collection.
+
+        Returns:
+            IngestResult: Chunk counts for the file, how many were new and how
+            many chunks of an earlier upload of `filename` were removed.
+
+        Raises:
+            PipelineFullError: If settings.ingest_max_pending files are in flight.
+            StageError: If any stage fails for this file.
+        """
+        if self._pending >= settings.ingest_max_pending:
+            os.remove(path)
+            raise PipelineFullError(
+                f"{self._pending} files already queued for ingestion"
+            )
+        if not self._workers:
+            self._start()
+
+        task = IngestTask(
+            path=path,
+            filename=filename,
+            suffix=suffix,
+            vector_service=vector_service,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self._pending += 1
+        try:
+            with metrics.INGEST_FILE.time():
+                self._load_queue.put_nowait(task)
+                return await task.future
+        finally:
+            self._pending -= 1
+
+    # --- Direct stage access for batch jobs ------------------------------
+
+    async def stream_chunks(
+        self, path: str, filename: str, suffix: str
+    ) -> AsyncIterator[List[ChunkRecord]]:
+        """
+        Load and split a spooled file on the CPU pool, yielding chunk batches.
+
+        At most settings.ingest_stream_batches batches are buffered ahead of
+        the consumer. Closing the iterator early stops the producer and
+        removes the file. Use it with `contextlib.aclosing`.
+        """
+        if not self._workers:
+            self._start()
+        if self._manager is not None:
+            out = self._manager.Queue(settings.ingest_stream_batches)
+            stop = self._manager.Event()
+        else:
+            out = queue.Queue(settings.ingest_stream_batches)
+            stop = threading.Event()
+        producer = asyncio.get_running_loop().run_in_executor(
+            self._cpu_pool,
+            produce_chunk_batches,
+            path,
+            filename,
+            suffix,
+            settings.ingest_batch_size,
+            out,
+            stop,
+        )
+        try:
+            while True:
+                try:
+                    batch = await asyncio.to_thread(out.get, True, _POLL_SECONDS)
+                except queue.Empty:
+                    if producer.done():
+                        producer.result()  # Re-raise the loader's error
+                        return
+                    continue
+                if batch is None:
+                    break
+                yield batch
+            await producer
+        finally:
+            stop.set()
+            if not producer.done():
+                await asyncio.wait([producer])
+
+    async def embed(
+        self, vector_service: VectorService, chunks: List[ChunkRecord]
+    ) -> np.ndarray:
+        """
+        Run the embed stage for `chunks` on the embedding pool.
+
+        Callers should pass `vector_service.filter_new(chunks)` so content
+        that is already indexed is not embedded again.
+        """
+        if not self._workers:
+            self._start()
+        loop = asyncio.get_running_loop()
+        with metrics.INGEST_EMBED.time():
+            return await loop.run_in_executor(
+                self._embed_pool, vector_service.embed_chunks, chunks
+            )
+
+    async def commit(
+        self,
+        vector_service: VectorService,
+        chunks: List[ChunkRecord],
+        vectors: np.ndarray,
+    ) -> int:
+        """
+        Run the index stage on the single index thread.
+
+        Commits from batch jobs and from `submit` share that thread, so WAL
+        appends stay strictly ordered.
+
+        Returns:
+            int: Number of chunks actually added.
+        """
+        if not self._workers:
+            self._start()
+        loop = asyncio.get_running_loop()
+        with metrics.INGEST_INDEX.time():
+            return await loop.run_in_executor(
+                self._index_pool, vector_service.add_embeddings, chunks, vectors
+            )
+
+    async def remove_stale(
+        self, vector_service: VectorService, source: str, keep: Collection[str]
+    ) -> int:
+        """
+        Delete chunks of `source` not in `keep` (its latest version's ids).
+
+        Runs on the index thread, after the file's own commits.
+
+        Returns:
+            int: Number of chunks removed.
+        """
+        if not self._workers:
+            self._start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._index_pool, vector_service.delete_source, source, keep
+        )
+
+    async def _run_stage(
+        self,
+        inbox: asyncio.Queue,
+        name: str,
+        stage: Callable[[Any], Awaitable[None]],
+    ) -> None:
+        while True:
+            item: Union[IngestTask, IngestBatch] = await inbox.get()
+            task = item if isinstance(item, IngestTask) else item.task
+            try:
+                if task.future.done():
+                    self._discard(item)  # Caller went away or file failed
+                    continue
+                try:
+                    await stage(item)
+                except Exception as e:
+                    if not task.future.done():
+                        task.future.set_exception(StageError(name, e))
+            finally:
+                inbox.task_done()
+
+    @staticmethod
+    def _discard(item: Union[IngestTask, IngestBatch]) -> None:
+        if isinstance(item, IngestTask) and os.path.exists(item.path):
+            os.remove(item.path)  # Never reached the load stage
+
+    async def _maybe_finish(self, task: IngestTask) -> None:
+        if task.loaded and not task.batches_pending and not task.future.done():
+            # Only a fully indexed upload may replace the previous version
+            removed = await self.remove_stale(
+                task.vector_service, task.filename, task.chunk_ids
+            )
+            if not task.future.done():
+                task.future.set_result(
+                    IngestResult(
+                        task.num_chunks, task.added, task.first_chunk_id, removed
+                    )
+                )
+
+    # --- Stages -----------------------------------------------------------
+
+    async def _load(self, task: IngestTask, outbox: asyncio.Queue) -> None:
+        async with aclosing(
+            self.stream_chunks(task.path, task.filename, task.suffix)
+        ) as batches:
+            # Time spent waiting on the loader, not on a full embed queue
+            waited = time.perf_counter()
+            async for chunks in batches:
+                metrics.INGEST_LOAD.observe(time.perf_counter() - waited)
+                metrics.INGEST_CHUNKS.labels(task.suffix.lstrip(".")).inc(len(chunks))
+                if task.future.done():
+                    return  # Stops the producer and removes the file
+                if task.first_chunk_id is None:
+                    task.first_chunk_id = chunks[0].chunk_id
+                task.num_chunks += len(chunks)
+                task.chunk_ids.update(chunk.chunk_id for chunk in chunks)
+                task.batches_pending += 1
+                await outbox.put(IngestBatch(task=task, chunks=chunks))
+                waited = time.perf_counter()
+        task.loaded = True
+        await self._maybe_finish(task)
+
+    async def _embed(self, batch: IngestBatch, outbox: asyncio.Queue) -> None:
+        # Skip content that is already indexed before paying for the model
+        vector_service = batch.task.vector_service
+        batch.chunks = vector_service.filter_new(batch.chunks)
+        if batch.chunks:
+            loop = asyncio.get_running_loop()
+            with metrics.INGEST_EMBED.time():
+                batch.vectors = await loop.run_in_executor(
+                    self._embed_pool, vector_service.embed_chunks, batch.chunks
+                )
+        await outbox.put(batch)
+
+    async def _index(self, batch: IngestBatch) -> None:
+        task = batch.task
+        if batch.chunks:
+            loop = asyncio.get_running_loop()
+            with metrics.INGEST_INDEX.time():
+                task.added += await loop.run_in_executor(
+                    self._index_pool,
+                    task.vector_service.add_embeddings,
+                    batch.chunks,
+                    batch.vectors,
+                )
+        task.batches_pending -= 1
+        await self._maybe_finish(task)
+
+    async def shutdown(self) -> None:
+        """Cancel stage workers and release the executor pools."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        for pool in (self._cpu_pool, self._embed_pool, self._index_pool):
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+        if self._manager is not None:
+            self._manager.shutdown()
+        parallel_loader.shutdown()
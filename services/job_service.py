@@ -0,0 +1,232 @@
+# backend/services/job_service.py
+
+"""
+Background scheduler for batch ingestion jobs.
+
+A job is a set of already-spooled files with distinct filenames. Files are
+streamed through loading, splitting and embedding concurrently on the
+ingestion pipeline's pools; the new chunks of all files are pooled and
+written with one `VectorService` commit (one WAL append) whenever
+settings.job_commit_chunks of them are held, which bounds the job's memory
+whatever the batch size. Each indexed file then replaces its previous
+upload: old chunks the new version no longer contains are deleted. A job
+writes to one collection, whose lease it holds while it runs.
+"""
+
+import asyncio
+import os
+from collections import OrderedDict
+from contextlib import aclosing
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import uuid4
+import numpy as np
+from config.settings import settings
+from models.chunk import ChunkRecord
+from models.job import FileProgress, JobStatus
+from services.collection_service import CollectionManager
+from services.ingest_pipeline import IngestionPipeline
+from services.vector_service import VectorService
+
+
+class JobQueueFullError(Exception):
+    """Raised when settings.job_max_queued jobs are already waiting."""
+
+
+class JobScheduler:
+    """
+    Runs batch jobs on `settings.job_workers` background tasks and keeps their
+    status in memory for polling.
+    """
+
+    def __init__(self, pipeline: IngestionPipeline, collections: CollectionManager):
+        self.pipeline = pipeline
+        self.collections = collections
+        self._jobs: "OrderedDict[str, JobStatus]" = OrderedDict()
+        self._inputs: dict[str, List[Tuple[str, str, str]]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    def submit(self, files: List[Tuple[str, str, str]], collection: str) -> JobStatus:
+        """
+        Queue a batch of spooled files and return immediately.
+
+        Args:
+            files (List[Tuple[str, str, str]]): (tmp_path, filename, suffix)
+                for every file in the batch.
+            collection (str): Collection the files are indexed into (created
+                if needed).
+
+        Returns:
+            JobStatus: The newly queued job.
+
+        Raises:
+            ValueError: If two files share a filename (each replaces the
+                previous upload of its name, so they would delete each
+                other's chunks).
+            JobQueueFullError: If too many jobs are waiting.
+        """
+        filenames = [filename for _, filename, _ in files]
+        if len(set(filenames)) < len(filenames):
+            raise ValueError("A batch cannot contain the same filename twice")
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._workers = [
+                asyncio.create_task(self._worker()) for _ in range(settings.job_workers)
+            ]
+        if self._queue.qsize() >= settings.job_max_queued:
+            raise JobQueueFullError(f"{self._queue.qsize()} jobs already queued")
+
+        job = JobStatus(
+            job_id=uuid4().hex,
+            collection=collection,
+            files=[FileProgress(filename=filename) for _, filename, _ in files],
+        )
+        self._jobs[job.job_id] = job
+        self._inputs[job.job_id] = files
+        self._queue.put_nowait(job.job_id)
+        self._trim_history()
+        return job
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        return self._jobs.get(job_id)
+
+    def _trim_history(self) -> None:
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.status in ("completed", "failed")
+        ]
+        for job_id in finished[: max(0, len(finished) - settings.job_history_size)]:
+            del self._jobs[job_id]
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job, files = self._jobs[job_id], self._inputs.pop(job_id)
+                try:
+                    async with self.collections.lease_async(
+                        job.collection, create=True
+                    ) as vector_service:
+                        await self._run(job, files, vector_service)
+                except Exception as e:
+                    if job.status != "completed":
+                        self._fail(job, files, f"Collection unavailable: {e}")
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _fail(job: JobStatus, files: List[Tuple[str, str, str]], error: str) -> None:
+        for progress, (path, _, _) in zip(job.files, files):
+            if progress.status not in ("indexed", "failed"):
+                progress.status = "failed"
+                progress.error = error
+            if os.path.exists(path):
+                os.remove(path)
+        job.status = "failed"
+        job.finished_at = datetime.now(timezone.utc)
+
+    async def _run(
+        self,
+        job: JobStatus,
+        files: List[Tuple[str, str, str]],
+        vector_service: VectorService,
+    ) -> None:
+        job.status = "running"
+
+        # Embedded chunks of every file wait here and are committed together
+        # (one WAL append) once settings.job_commit_chunks of them are held
+        pending: List[Tuple[int, List[ChunkRecord], np.ndarray]] = []
+        pending_chunks = 0
+        commit_lock = asyncio.Lock()
+        commit_errors: Dict[int, str] = {}
+
+        async def flush() -> None:
+            nonlocal pending, pending_chunks
+            async with commit_lock:
+                batch, pending, pending_chunks = pending, [], 0
+                if not batch:
+                    return
+                chunks = [chunk for _, file_chunks, _ in batch for chunk in file_chunks]
+                vectors = np.concatenate([file_vectors for _, _, file_vectors in batch])
+                try:
+                    added = await self.pipeline.commit(vector_service, chunks, vectors)
+                except Exception as e:
+                    for i, _, _ in batch:
+                        commit_errors.setdefault(i, f"Indexing failed: {e}")
+                else:
+                    job.num_chunks_indexed += added
+
+        async def prepare(
+            i: int, progress: FileProgress, path: str, filename: str, suffix: str
+        ) -> Optional[Set[str]]:
+            nonlocal pending, pending_chunks
+            try:
+                progress.status = "loading"
+                chunk_ids: Set[str] = set()
+                async with aclosing(
+                    self.pipeline.stream_chunks(path, filename, suffix)
+                ) as batches:
+                    async for chunks in batches:
+                        progress.chunks_produced += len(chunks)
+                        chunk_ids.update(chunk.chunk_id for chunk in chunks)
+                        fresh = vector_service.filter_new(chunks)
+                        progress.chunks_skipped += len(chunks) - len(fresh)
+                        if not fresh:
+                            continue
+                        progress.status = "embedding"
+                        vectors = await self.pipeline.embed(vector_service, fresh)
+                        pending.append((i, fresh, vectors))
+                        pending_chunks += len(fresh)
+                        progress.chunks_embedded += len(fresh)
+                        if pending_chunks >= settings.job_commit_chunks:
+                            await flush()
+                progress.status = "embedded"
+                return chunk_ids
+            except Exception as e:
+                progress.status = "failed"
+                progress.error = str(e)
+                # Chunks of the file already committed stay, the rest is dropped
+                pending = [entry for entry in pending if entry[0] != i]
+                pending_chunks = sum(len(entry[1]) for entry in pending)
+                return None
+
+        results = await asyncio.gather(
+            *(
+                prepare(i, progress, *spec)
+                for i, (progress, spec) in enumerate(zip(job.files, files))
+            )
+        )
+        await flush()
+        for i, (progress, result) in enumerate(zip(job.files, results)):
+            if result is None:
+                continue
+            if i in commit_errors:
+                progress.status = "failed"
+                progress.error = commit_errors[i]
+            else:
+                progress.status = "indexed"
+
+        # Indexed files replace whatever an earlier upload left behind
+        for progress, result in zip(job.files, results):
+            if progress.status != "indexed":
+                continue
+            try:
+                progress.chunks_removed = await self.pipeline.remove_stale(
+                    vector_service, progress.filename, result
+                )
+            except Exception as e:
+                progress.status = "failed"
+                progress.error = f"Removing the previous version failed: {e}"
+
+        failed = all(progress.status == "failed" for progress in job.files)
+        job.status = "failed" if failed else "completed"
+        job.finished_at = datetime.now(timezone.utc)
+
+    async def shutdown(self) -> None:
+        """Cancel job workers; queued jobs are abandoned."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
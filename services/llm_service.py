@@ -1,12 +1,127 @@
 # backend/services/llm_service.py
 
 import asyncio
-from typing import AsyncGenerator, List, Tuple
+from contextlib import aclosing
+from typing import AsyncGenerator, Dict, List, Optional, Sequence, Tuple
 from config.settings import settings
+from models.chunk import Chunk
+from services import metrics
+from services.chat_scheduler import ChatScheduler
+from services.model_pool import ModelPool
+
+# Created on first use so importing this module loads nothing
+_pool: Optional[ModelPool] = None
+_scheduler: Optional[ChatScheduler] = None
+
+
+def get_model_pool() -> ModelPool:
+    global _pool
+    if _pool is None:
+        _pool = ModelPool(settings.model_dir, settings.llm_max_resident_models)
+    return _pool
+
+
+def get_scheduler() -> ChatScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = scheduler = ChatScheduler(get_model_pool())
+        metrics.CHAT_QUEUE_DEPTH.set_function(lambda: scheduler.queue_depth)
+        metrics.CHAT_ACTIVE_SEQUENCES.set_function(
+            lambda: scheduler.stats()["active_sequences"]
+        )
+        metrics.observe_cache(
+            "prefix",
+            lambda: (scheduler.prefix_cache.hits, scheduler.prefix_cache.misses),
+        )
+    return _scheduler
+
+
+async def warmup(model_name: str) -> None:
+    """
+    Prepare `model_name` for generation (load weights, allocate context).
+
+    Runs concurrently with retrieval so neither sits on the critical path
+    alone. A model that is already resident returns immediately.
+
+    Args:
+        model_name (str): Identifier of the model that will be invoked.
+
+    Raises:
+        ModelNotFoundError: If no GGUF file matches `model_name`.
+        BackendUnavailableError: If llama-cpp-python is not installed.
+    """
+    if settings.llm_backend == "echo":
+        return
+    await asyncio.to_thread(get_model_pool().preload, model_name)
+
+
+def build_messages(
+    prompt: str, history: List[str], context: Sequence[Chunk]
+) -> List[Dict[str, str]]:
+    """
+    Assemble chat messages from retrieved chunks, prior turns and the prompt.
+
+    Args:
+        prompt (str): The user’s current question or instruction.
+        history (List[str]): Prior turns, oldest first, alternating user and
+            assistant.
+        context (Sequence[Chunk]): Retrieved chunks, best match first.
+
+    Returns:
+        List[Dict[str, str]]: OpenAI-style messages for the model's chat template.
+    """
+    messages = []
+    if context:
+        sources = "\n\n".join(
+            f"[{i}] ({chunk.source}) {chunk.text}"
+            for i, chunk in enumerate(context, start=1)
+        )
+        messages.append(
+            {
+                "role": "system",
+                "content": "Answer using the numbered sources below when they "
+                f"are relevant.\n\n{sources}",
+            }
+        )
+    for i, turn in enumerate(history):
+        messages.append(
+            {"role": "user" if i % 2 == 0 else "assistant", "content": turn}
+        )
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+async def _stream_local(
+    model_name: str, messages: List[Dict[str, str]]
+) -> AsyncGenerator[Tuple[str, str], None]:
+    """Decode as one sequence of the model's shared continuous batch."""
+    pieces = []
+    stream = get_scheduler().generate(model_name, messages)
+    async with aclosing(stream):
+        async for piece in stream:
+            pieces.append(piece)
+            yield (piece, "")
+    yield ("", "".join(pieces))
+
+
+async def _stream_echo(prompt: str) -> AsyncGenerator[Tuple[str, str], None]:
+    # Construct a dummy response
+    dummy_response = f"Echo: {prompt}"
+
+    # Stream out one character at a time
+    for char in dummy_response:
+        await asyncio.sleep(0.01)  # simulate async token generation delay
+        yield (char, "")  # streaming token
+
+    # Finally, send the complete response
+    yield ("", dummy_response)
 
 
 async def stream_chat(
-    prompt: str, history: List[str], model_name: str
+    prompt: str,
+    history: List[str],
+    model_name: str,
+    context: Sequence[Chunk] = (),
 ) -> AsyncGenerator[Tuple[str, str], None]:
     """
     Async generator that yields chat output as (token, final_text) tuples.
@@ -14,26 +129,42 @@ async def stream_chat(
     - Streams individual tokens first (with empty final_text).
     - At the end, emits a tuple with final_text set to the entire response.
 
-    This stub simply echoes the prompt character-by-character, then returns
-    the full echo. Replace the stub logic with a llama.cpp or cloud API call.
+    With settings.llm_backend == "llama_cpp" the model is a GGUF file from
+    settings.model_dir, served from a pool of resident models. Concurrent
+    chats on the same model are decoded together by
+    services.chat_scheduler, one shared forward pass per token step. The "echo"
+    backend echoes the prompt character-by-character for development.
 
     Args:
         prompt (str): The user’s current question or instruction.
-        history (List[str]): Prior conversation turns (unused in stub).
-        model_name (str): Identifier of the model to invoke (unused in stub).
+        history (List[str]): Prior conversation turns.
+        model_name (str): Identifier of the model to invoke.
+        context (Sequence[Chunk]): Retrieved chunks to ground the answer in.
 
     Yields:
         AsyncGenerator[Tuple[str, str], None]:
             - (token, "") for each streamed token.
             - ("", final_text) once, when the full response is ready.
+
+    Raises:
+        ModelNotFoundError: If no GGUF file matches `model_name`.
+        BackendUnavailableError: If llama-cpp-python is not installed.
+        SchedulerFullError: If too many chats are already waiting to decode.
     """
-    # Construct a dummy response
-    dummy_response = f"Echo: {prompt}"
+    if settings.llm_backend == "echo":
+        stream = _stream_echo(prompt)
+    else:
+        stream = _stream_local(model_name, build_messages(prompt, history, context))
+    async with aclosing(stream):
+        async for item in stream:
+            if item[0]:
+                metrics.CHAT_TOKENS.inc()
+            yield item
 
-    # Stream out one character at a time
-    for char in dummy_response:
-        await asyncio.sleep(0.01)  # simulate async token generation delay
-        yield (char, "")  # streaming token
 
-    # Finally, send the complete response
-    yield ("", dummy_response)
+def shutdown() -> None:
+    """Stop the decode workers and unload every resident model."""
+    if _scheduler is not None:
+        _scheduler.shutdown()
+    if _pool is not None:
+        _pool.close()
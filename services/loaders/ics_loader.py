@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import List
+from typing import Iterator, List
 from langchain_core.document_loaders import BaseLoader
 import icalendar
 from langchain.schema import Document
@@ -10,10 +10,12 @@ class ICSLoader(BaseLoader):
         self.file_path = Path(file_path)
 
     def load(self) -> List[Document]:
+        return list(self.lazy_load())
+
+    def lazy_load(self) -> Iterator[Document]:
         with self.file_path.open("rb") as f:
             calendar = icalendar.Calendar.from_ical(f.read())
 
-        documents = []
         for i, component in enumerate(calendar.walk()):
             if component.name == "VEVENT":
                 summary = str(component.get("summary", ""))
@@ -44,6 +46,4 @@ class ICSLoader(BaseLoader):
                     "source": self.file_path.name,
                 }
 
-                documents.append(Document(page_content=text, metadata=metadata))
-
-        return documents
+                yield Document(page_content=text, metadata=metadata)
@@ -1,25 +1,28 @@
 from services.loaders.ics_loader import ICSLoader
+from services.loaders.parallel_loader import (
+    ParallelExcelLoader,
+    ParallelPDFLoader,
+    ParallelPowerPointLoader,
+)
 from langchain_community.document_loaders import (
     TextLoader,
-    PyPDFLoader,
     UnstructuredWordDocumentLoader,
     CSVLoader,
     JSONLoader,
-    UnstructuredPowerPointLoader,
-    UnstructuredExcelLoader,
     UnstructuredEmailLoader,
 )
 
-# Map file extensions to LangChain loader classes
+# Map file extensions to LangChain loader classes (paged formats are parsed
+# page by page, in parallel when settings.ingest_page_workers allows)
 EXTENSION_LOADER_MAP = {
     ".txt": TextLoader,
     ".md": TextLoader,
-    ".pdf": PyPDFLoader,
+    ".pdf": ParallelPDFLoader,
     ".docx": UnstructuredWordDocumentLoader,
     ".csv": CSVLoader,
     ".json": JSONLoader,
-    ".pptx": UnstructuredPowerPointLoader,
-    ".xlsx": UnstructuredExcelLoader,
+    ".pptx": ParallelPowerPointLoader,
+    ".xlsx": ParallelExcelLoader,
     ".eml": UnstructuredEmailLoader,
     ".ics": ICSLoader,
     # Extend this mapping for other formats (e.g., .pptx, .ipynb).
@@ -0,0 +1,272 @@
+# backend/services/loaders/parallel_loader.py
+
+"""
+Paged loaders that parse PDF pages, XLSX sheets and PPTX slides in parallel.
+
+A document is cut into ranges of settings.ingest_pages_per_task pages
+(sheets, slides), each range is parsed by a module-level worker in a shared
+process pool, and the Documents are yielded in page order. At most two
+tasks per worker are in flight, so a long PDF is not held in memory all at
+once. Every Document carries its 0-based "page" and "total_pages".
+
+The same parser (pypdf, openpyxl, python-pptx) reads every range whatever
+the worker count, so a file yields the same Documents, and chunk ids, on
+every host. With settings.ingest_page_workers resolved to 1 (the default
+on a single CPU) the ranges are simply parsed one after another in this
+process. PDFs match PyPDFLoader's Documents; sheets and slides become one
+Document each.
+
+Workers are spawned rather than forked: the API process runs event loops,
+gRPC and FAISS threads, whose locks a forked child could inherit held.
+"""
+
+import abc
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from langchain.schema import Document
+from langchain_core.document_loaders import BaseLoader
+from config.settings import settings
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def page_workers() -> int:
+    """Processes used for paged loading (settings.ingest_page_workers, 0 = CPUs)."""
+    return settings.ingest_page_workers or os.cpu_count() or 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Create the shared page-parsing pool on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                page_workers(), mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown() -> None:
+    """Stop the page-parsing pool (a later load starts a new one)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+# --- PDF ---------------------------------------------------------------------
+
+
+def _pdf_metadata(reader: Any, path: str) -> Dict[str, Any]:
+    """Document-level metadata, normalised the way PyPDFLoader does."""
+    metadata: Dict[str, Any] = {
+        "producer": "PyPDF",
+        "creator": "PyPDF",
+        "creationdate": "",
+    }
+    for key, value in (reader.metadata or {}).items():
+        key = key.lstrip("/").lower()
+        if key in ("creationdate", "moddate"):
+            try:
+                value = datetime.strptime(
+                    str(value).replace("'", ""), "D:%Y%m%d%H%M%S%z"
+                ).isoformat("T")
+            except ValueError:
+                pass
+        elif isinstance(value, str):
+            value = value.strip()
+        elif not isinstance(value, int):
+            value = str(value).strip()
+        metadata[key] = value
+    metadata["source"] = path
+    metadata["total_pages"] = len(reader.pages)
+    return metadata
+
+
+def _count_pdf(path: str) -> int:
+    import pypdf
+
+    return len(pypdf.PdfReader(path).pages)
+
+
+def _parse_pdf(path: str, start: int, stop: int) -> List[Document]:
+    """Pages [start, stop) of a PDF as PyPDFLoader would return them."""
+    import pypdf
+
+    reader = pypdf.PdfReader(path)
+    metadata = _pdf_metadata(reader, path)
+    labels = reader.page_labels
+    return [
+        Document(
+            page_content=reader.pages[i].extract_text().strip(),
+            metadata={**metadata, "page": i, "page_label": labels[i]},
+        )
+        for i in range(start, stop)
+    ]
+
+
+# --- XLSX --------------------------------------------------------------------
+
+
+def _count_xlsx(path: str) -> int:
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        return len(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def _parse_xlsx(path: str, start: int, stop: int) -> List[Document]:
+    """Sheets [start, stop) as one Document each, cells tab-separated."""
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        names = workbook.sheetnames
+        documents = []
+        for i in range(start, stop):
+            rows = (
+                "\t".join("" if cell is None else str(cell) for cell in row)
+                for row in workbook[names[i]].iter_rows(values_only=True)
+            )
+            documents.append(
+                Document(
+                    page_content="\n".join(row for row in rows if row.strip()),
+                    metadata={
+                        "source": path,
+                        "page": i,
+                        "page_name": names[i],
+                        "total_pages": len(names),
+                    },
+                )
+            )
+        return documents
+    finally:
+        workbook.close()
+
+
+# --- PPTX --------------------------------------------------------------------
+
+
+def _count_pptx(path: str) -> int:
+    import pptx
+
+    return len(pptx.Presentation(path).slides)
+
+
+def _shape_text(shape: Any) -> Iterator[str]:
+    """Text of a shape, including table cells and grouped shapes."""
+    if getattr(shape, "has_text_frame", False) and shape.text_frame.text.strip():
+        yield shape.text_frame.text
+    if getattr(shape, "has_table", False):
+        for row in shape.table.rows:
+            yield "\t".join(cell.text for cell in row.cells)
+    for child in getattr(shape, "shapes", ()):
+        yield from _shape_text(child)
+
+
+def _parse_pptx(path: str, start: int, stop: int) -> List[Document]:
+    """Slides [start, stop) as one Document each, shape texts in order."""
+    import pptx
+
+    slides = pptx.Presentation(path).slides
+    return [
+        Document(
+            page_content="\n\n".join(
+                text for shape in slides[i].shapes for text in _shape_text(shape)
+            ),
+            metadata={"source": path, "page": i, "total_pages": len(slides)},
+        )
+        for i in range(start, stop)
+    ]
+
+
+# --- Loaders -----------------------------------------------------------------
+
+
+class PagedLoader(BaseLoader, abc.ABC):
+    """
+    Parses page ranges of a document, in the shared process pool when more
+    than one worker is configured.
+
+    Subclasses set `count` and `parse` to module-level functions, which must
+    be picklable so the pool can run them.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = str(file_path)
+
+    @staticmethod
+    @abc.abstractmethod
+    def count(path: str) -> int:
+        """Pages (sheets, slides) in the document at `path`."""
+
+    @staticmethod
+    @abc.abstractmethod
+    def parse(path: str, start: int, stop: int) -> List[Document]:
+        """Documents for pages [start, stop) of the document at `path`."""
+
+    def load(self) -> List[Document]:
+        return list(self.lazy_load())
+
+    def lazy_load(self) -> Iterator[Document]:
+        workers = page_workers()
+        total = self.count(self.file_path)
+        step = max(1, settings.ingest_pages_per_task)
+        if workers <= 1 or total <= step:
+            # Same parser in this process: one worker, or a single task that
+            # is cheaper here than a round trip to the pool
+            for start in range(0, total, step):
+                yield from self.parse(self.file_path, start, min(start + step, total))
+            return
+
+        ranges = iter(range(0, total, step))
+        pool = _get_pool()
+        pending: Deque[Future] = deque()
+
+        def submit() -> None:
+            start = next(ranges, None)
+            if start is not None:
+                stop = min(start + step, total)
+                pending.append(pool.submit(self.parse, self.file_path, start, stop))
+
+        for _ in range(2 * workers):
+            submit()
+        try:
+            while pending:
+                documents = pending.popleft().result()
+                submit()
+                yield from documents
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+class ParallelPDFLoader(PagedLoader):
+    """PyPDFLoader-compatible pages, parsed in parallel."""
+
+    count = staticmethod(_count_pdf)
+    parse = staticmethod(_parse_pdf)
+
+
+class ParallelExcelLoader(PagedLoader):
+    """One Document per worksheet, parsed in parallel."""
+
+    count = staticmethod(_count_xlsx)
+    parse = staticmethod(_parse_xlsx)
+
+
+class ParallelPowerPointLoader(PagedLoader):
+    """One Document per slide, parsed in parallel."""
+
+    count = staticmethod(_count_pptx)
+    parse = staticmethod(_parse_pptx)
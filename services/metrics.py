@@ -0,0 +1,422 @@
+# backend/services/metrics.py
+
+"""
+In-process counters, gauges and latency histograms for the hot paths, with
+Prometheus text exposition (served on `/metrics`).
+
+Every metric the backend records is declared at the bottom of this module,
+so the full list lives in one place. Hot paths keep pre-bound label
+children (`SEARCH_ANN = SEARCH_STAGE_SECONDS.labels("ann")`) and record with
+`with SEARCH_ANN.time(): ...` or `.observe(seconds)`.
+
+Sizes that already live elsewhere (index rows, WAL bytes, cache hit
+counters, queue depths) are not mirrored on every change. Their gauges hold
+a callback that is read only when `/metrics` is scraped.
+
+With settings.metrics_enabled off, every record call returns after one
+attribute check and `time()` returns a shared no-op context manager.
+"""
+
+import bisect
+import contextlib
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans a cached lookup (sub-ms) to a large file's load (a minute)
+# fmt: off
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+# fmt: on
+SLOW_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+_NOOP = contextlib.nullcontext()
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+class _Registry:
+    """Metrics in declaration order."""
+
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+
+    def register(self, metric: "_Metric") -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            samples = list(metric.samples())
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in samples:
+                lines.append(
+                    f"{metric.name}{suffix}{_format_labels(labels)} "
+                    f"{_format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = _Registry()
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, _escape(value).replace('"', '\\"'))
+        for name, value in labels.items()
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Value:
+    """A number set directly or read from a callback at scrape time."""
+
+    def __init__(self):
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Report `function()` instead of the stored value (read on scrape)."""
+        self._function = function
+
+    def inc(self, amount: float = 1.0) -> None:
+        if not settings.metrics_enabled:
+            return
+        with self._lock:
+            self._value += amount
+
+    def get(self) -> Optional[float]:
+        if self._function is None:
+            return self._value
+        try:
+            return float(self._function())
+        except Exception:
+            logger.debug("Metric callback failed", exc_info=True)
+            return None
+
+
+class _GaugeValue(_Value):
+    def set(self, value: float) -> None:
+        if settings.metrics_enabled:
+            self._value = value
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_started")
+
+    def __init__(self, histogram: "_HistogramValue"):
+        self._histogram = histogram
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._histogram.observe(time.perf_counter() - self._started)
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Sequence[float]):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        if not settings.metrics_enabled:
+            return
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def time(self) -> contextlib.AbstractContextManager:
+        """Context manager observing its wall-clock duration in seconds."""
+        return _Timer(self) if settings.metrics_enabled else _NOOP
+
+    def call(self, function: Callable[..., Any], *args: Any) -> Any:
+        """`function(*args)`, observing how long it took."""
+        with self.time():
+            return function(*args)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class _Metric:
+    """A named metric; one child per combination of label values."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: Any) -> Any:
+        """The child for these label values (created on first use)."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _items(self) -> Iterator[Tuple[Dict[str, str], Any]]:
+        for key, child in list(self._children.items()):
+            yield dict(zip(self.labelnames, key)), child
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, child in self._items():
+            value = child.get()
+            if value is not None:
+                yield "", labels, value
+
+
+class Counter(_Metric):
+    """Monotonically increasing total (`inc`, or a callback total)."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down (`set`/`inc`/`dec`, or a callback)."""
+
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeValue:
+        return _GaugeValue()
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self.labels().set_function(function)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative `le` buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self) -> contextlib.AbstractContextManager:
+        return self.labels().time()
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, child in self._items():
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield "_sum", labels, total
+            yield "_count", labels, cumulative
+
+
+def observe_cache(name: str, counts: Callable[[], Tuple[int, int]]) -> None:
+    """
+    Publish a cache's (hits, misses) counters and hit ratio under `name`.
+
+    Args:
+        name (str): Value of the `cache` label.
+        counts (Callable[[], Tuple[int, int]]): Returns (hits, misses) since
+            start; called on every scrape.
+    """
+
+    def ratio() -> float:
+        hits, misses = counts()
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    CACHE_REQUESTS.labels(name, "hit").set_function(lambda: counts()[0])
+    CACHE_REQUESTS.labels(name, "miss").set_function(lambda: counts()[1])
+    CACHE_HIT_RATIO.labels(name).set_function(ratio)
+
+
+# --- Ingestion ----------------------------------------------------------------
+
+INGEST_STAGE_SECONDS = Histogram(
+    "secugenie_ingest_stage_seconds",
+    "Ingestion time by stage: spool and load_split per direct upload; load, "
+    "embed and index per pipeline batch; file per pipeline upload",
+    ["stage"],
+)
+INGEST_SPOOL = INGEST_STAGE_SECONDS.labels("spool")
+INGEST_LOAD_SPLIT = INGEST_STAGE_SECONDS.labels("load_split")
+INGEST_LOAD = INGEST_STAGE_SECONDS.labels("load")
+INGEST_EMBED = INGEST_STAGE_SECONDS.labels("embed")
+INGEST_INDEX = INGEST_STAGE_SECONDS.labels("index")
+INGEST_FILE = INGEST_STAGE_SECONDS.labels("file")
+INGEST_CHUNKS = Counter(
+    "secugenie_ingest_chunks_total", "Chunks produced by loaders", ["type"]
+)
+INGEST_PENDING_FILES = Gauge(
+    "secugenie_ingest_pending_files", "Uploads admitted to the pipeline, unfinished"
+)
+
+# --- Vector store -------------------------------------------------------------
+
+UPSERT_STAGE_SECONDS = Histogram(
+    "secugenie_upsert_stage_seconds",
+    "Vector store write time by stage: filter (dedup), embed, wal (append "
+    "and fsync) and apply (FAISS and row indexes)",
+    ["stage"],
+)
+UPSERT_FILTER = UPSERT_STAGE_SECONDS.labels("filter")
+UPSERT_EMBED = UPSERT_STAGE_SECONDS.labels("embed")
+UPSERT_WAL = UPSERT_STAGE_SECONDS.labels("wal")
+UPSERT_APPLY = UPSERT_STAGE_SECONDS.labels("apply")
+UPSERT_ROWS = Counter("secugenie_upsert_rows_total", "Chunks added to the index")
+SEARCH_SECONDS = Histogram(
+    "secugenie_search_seconds", "VectorService.search latency", ["mode"]
+)
+SEARCH_STAGE_SECONDS = Histogram(
+    "secugenie_search_stage_seconds",
+    "Search time by stage: embed (query), ann (FAISS segments), lexical "
+    "(BM25, concurrent with the other two in hybrid mode) and fetch (chunks)",
+    ["stage"],
+)
+SEARCH_EMBED = SEARCH_STAGE_SECONDS.labels("embed")
+SEARCH_ANN = SEARCH_STAGE_SECONDS.labels("ann")
+SEARCH_LEXICAL = SEARCH_STAGE_SECONDS.labels("lexical")
+SEARCH_FETCH = SEARCH_STAGE_SECONDS.labels("fetch")
+MAINTENANCE_SECONDS = Histogram(
+    "secugenie_index_maintenance_seconds",
+    "Background index work: compact (fold deltas), reclaim (drop deleted "
+    "rows) and snapshot (write the index to disk)",
+    ["operation"],
+    buckets=SLOW_BUCKETS,
+)
+INDEX_ROWS = Gauge(
+    "secugenie_index_rows", "Rows in the open collections, incl. deleted"
+)
+INDEX_DELETED_ROWS = Gauge(
+    "secugenie_index_deleted_rows",
+    "Deleted rows awaiting compaction in the open collections",
+)
+INDEX_SEGMENTS = Gauge(
+    "secugenie_index_segments",
+    "FAISS segments (base + deltas) across the open collections",
+)
+WAL_BYTES = Gauge(
+    "secugenie_wal_bytes", "Write-ahead log size on disk of the open collections"
+)
+
+# --- Collections --------------------------------------------------------------
+
+COLLECTIONS_OPEN = Gauge("secugenie_collections_open", "Collections loaded in memory")
+COLLECTIONS_MEMORY_BYTES = Gauge(
+    "secugenie_collections_memory_bytes", "Estimated memory of the open collections"
+)
+COLLECTION_OPEN_SECONDS = Histogram(
+    "secugenie_collection_open_seconds",
+    "Time to load a collection on first use",
+    buckets=SLOW_BUCKETS,
+)
+COLLECTION_EVICTIONS = Counter(
+    "secugenie_collection_evictions_total",
+    "Idle collections closed to stay within the memory budget",
+)
+
+# --- Chat ---------------------------------------------------------------------
+
+CHAT_STAGE_SECONDS = Histogram(
+    "secugenie_chat_stage_seconds",
+    "StreamChat latency by stage: queue_wait (for a decode slot), retrieval, "
+    "first_token and total (both from the start of the call)",
+    ["stage"],
+)
+CHAT_QUEUE_WAIT = CHAT_STAGE_SECONDS.labels("queue_wait")
+CHAT_RETRIEVAL = CHAT_STAGE_SECONDS.labels("retrieval")
+CHAT_FIRST_TOKEN = CHAT_STAGE_SECONDS.labels("first_token")
+CHAT_TOTAL = CHAT_STAGE_SECONDS.labels("total")
+CHAT_TOKENS = Counter("secugenie_chat_tokens_total", "Token pieces generated")
+CHAT_QUEUE_DEPTH = Gauge(
+    "secugenie_chat_queue_depth", "Chats waiting for a decode slot"
+)
+CHAT_ACTIVE_SEQUENCES = Gauge(
+    "secugenie_chat_active_sequences", "Chats currently being decoded"
+)
+
+# --- Caches -------------------------------------------------------------------
+
+CACHE_REQUESTS = Counter(
+    "secugenie_cache_requests_total", "Cache lookups by result", ["cache", "result"]
+)
+CACHE_HIT_RATIO = Gauge(
+    "secugenie_cache_hit_ratio", "Share of lookups served from cache", ["cache"]
+)
+
+# --- gRPC ---------------------------------------------------------------------
+
+GRPC_REQUESTS = Counter(
+    "secugenie_grpc_requests_total", "Finished RPCs by status", ["method", "code"]
+)
+GRPC_REQUEST_SECONDS = Histogram(
+    "secugenie_grpc_request_seconds", "RPC duration, streams included", ["method"]
+)
+GRPC_IN_FLIGHT = Gauge(
+    "secugenie_grpc_in_flight_requests", "RPCs currently running", ["method"]
+)
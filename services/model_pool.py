@@ -0,0 +1,167 @@
+# backend/services/model_pool.py
+
+"""
+Pool of local GGUF models served through llama.cpp.
+
+Models (weights and vocabulary, no KV cache) are loaded from
+`settings.model_dir` on first request and the
+`settings.llm_max_resident_models` most recently used stay resident, so
+switching between loaded models costs nothing. Eviction never unloads a
+model that is still leased, e.g. by a decode worker in
+`services.chat_scheduler`, which owns the batched inference contexts.
+
+`llama_cpp` is an optional dependency, imported only when a model is
+loaded.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+GGUF_SUFFIX = ".gguf"
+
+
+class ModelNotFoundError(Exception):
+    """Raised when no GGUF file in model_dir matches the requested model."""
+
+
+class BackendUnavailableError(Exception):
+    """Raised when llama-cpp-python is not installed."""
+
+
+@dataclass
+class ResidentModel:
+    """A loaded model plus the bookkeeping the pool needs to evict it safely."""
+
+    path: Path
+    model: Any  # llama_cpp._internals.LlamaModel
+    leases: int = 0
+
+
+class ModelPool:
+    """
+    LRU cache of loaded llama.cpp models, keyed by GGUF path.
+
+    Args:
+        model_dir (Path): Directory scanned for *.gguf files.
+        max_resident (int): Models kept loaded at once (at least 1).
+    """
+
+    def __init__(self, model_dir: Path, max_resident: int):
+        self.model_dir = model_dir
+        self.max_resident = max(1, max_resident)
+        self._models: "OrderedDict[Path, ResidentModel]" = OrderedDict()
+        self._load_locks: Dict[Path, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def available(self) -> List[str]:
+        """Model names (file stems) that can be requested."""
+        return sorted(path.stem for path in self.model_dir.glob(f"*{GGUF_SUFFIX}"))
+
+    def resolve(self, model_name: str) -> Path:
+        """
+        Map a request's model name to a GGUF file inside model_dir.
+
+        Accepts the file name with or without ".gguf"; otherwise the first
+        file (alphabetically) whose stem starts with `model_name`.
+
+        Raises:
+            ModelNotFoundError: If nothing matches, or the name escapes model_dir.
+        """
+        name = model_name.strip()
+        if not name or os.sep in name or (os.altsep and os.altsep in name):
+            raise ModelNotFoundError(f"Invalid model name: {model_name!r}")
+        if not name.endswith(GGUF_SUFFIX):
+            exact = self.model_dir / f"{name}{GGUF_SUFFIX}"
+        else:
+            exact = self.model_dir / name
+        if exact.is_file():
+            return exact
+        stem = name.removesuffix(GGUF_SUFFIX)
+        matches = sorted(self.model_dir.glob(f"{stem}*{GGUF_SUFFIX}"))
+        if not matches:
+            raise ModelNotFoundError(
+                f"No GGUF model named {model_name!r} in {self.model_dir}"
+            )
+        return matches[0]
+
+    def _load(self, path: Path) -> Any:
+        try:
+            import llama_cpp
+            from llama_cpp._internals import LlamaModel
+        except ImportError as e:
+            raise BackendUnavailableError(
+                "Local inference needs llama-cpp-python: pip install llama-cpp-python"
+            ) from e
+
+        logger.info("Loading GGUF model %s", path.name)
+        params = llama_cpp.llama_model_default_params()
+        params.n_gpu_layers = settings.llm_gpu_layers
+        return LlamaModel(path_model=str(path), params=params, verbose=False)
+
+    def _evict(self) -> None:
+        """Unload least recently used, unleased models beyond capacity."""
+        for path in list(self._models):
+            if len(self._models) <= self.max_resident:
+                return
+            resident = self._models[path]
+            if resident.leases:
+                continue
+            del self._models[path]
+            logger.info("Evicting GGUF model %s", path.name)
+            resident.model.close()
+
+    def _checkout(self, path: Path) -> ResidentModel:
+        with self._lock:
+            resident = self._models.get(path)
+            if resident is not None:
+                self._models.move_to_end(path)
+                resident.leases += 1
+                return resident
+            load_lock = self._load_locks.setdefault(path, threading.Lock())
+
+        # Load outside the pool lock; concurrent requests for the same
+        # model wait for the first load instead of loading it twice
+        with load_lock:
+            with self._lock:
+                resident = self._models.get(path)
+                if resident is not None:
+                    self._models.move_to_end(path)
+                    resident.leases += 1
+                    return resident
+            model = self._load(path)
+            with self._lock:
+                resident = self._models[path] = ResidentModel(path, model, leases=1)
+                self._evict()
+                return resident
+
+    @contextmanager
+    def lease(self, model_name: str) -> Iterator[ResidentModel]:
+        """Load (or reuse) `model_name` and keep it resident while leased."""
+        resident = self._checkout(self.resolve(model_name))
+        try:
+            yield resident
+        finally:
+            with self._lock:
+                resident.leases -= 1
+                self._evict()
+
+    def preload(self, model_name: str) -> None:
+        """Make `model_name` resident without generating anything."""
+        with self.lease(model_name):
+            pass
+
+    def close(self) -> None:
+        """Unload every model."""
+        with self._lock:
+            for resident in self._models.values():
+                resident.model.close()
+            self._models.clear()
@@ -0,0 +1,154 @@
+# backend/services/prefix_cache.py
+
+"""
+Memory-bounded LRU of llama.cpp KV states for recent conversations.
+
+Every chat turn resends the whole history, so turn N+1's prompt starts with
+turn N's prompt (and, usually, its answer). When a sequence retires, its KV
+state is saved together with the tokens it covers. The next prompt that
+starts with the same tokens restores that state and only prefills the rest.
+
+Entries are indexed by blake2b digests of (model, token prefix) at every
+`block_tokens` boundary, so a lookup hashes the new prompt once and probes
+its boundaries longest first. Prefixes shorter than one block are not worth
+the copy and are never cached.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+
+_KEY_BYTES = 16
+
+
+@dataclass(eq=False)
+class PrefixEntry:
+    """Saved KV state of one sequence and the tokens it was computed over."""
+
+    tokens: np.ndarray  # int32
+    state: bytes
+    keys: List[bytes]
+
+
+def common_prefix(a: np.ndarray, b: np.ndarray) -> int:
+    """Length of the longest shared prefix of two token arrays."""
+    n = min(len(a), len(b))
+    mismatch = np.flatnonzero(a[:n] != b[:n])
+    return int(mismatch[0]) if len(mismatch) else n
+
+
+class PrefixCache:
+    """
+    Thread-safe, byte-bounded LRU of KV states shared by all decode workers.
+
+    Args:
+        max_bytes (int): Total size of saved states to keep (0 disables).
+        block_tokens (int): Prefix hashing granularity and minimum prefix length.
+    """
+
+    def __init__(self, max_bytes: int, block_tokens: int):
+        self.max_bytes = max_bytes
+        self.block_tokens = max(1, block_tokens)
+        self._entries: "OrderedDict[int, PrefixEntry]" = OrderedDict()
+        self._index: Dict[bytes, PrefixEntry] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.tokens_reused = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _block_keys(self, model: Path, tokens: np.ndarray) -> Iterator[bytes]:
+        """Digest of tokens[:k * block_tokens] for k = 1, 2, ..."""
+        digest = hashlib.blake2b(digest_size=_KEY_BYTES)
+        digest.update(str(model).encode("utf-8") + b"\0")
+        for end in range(self.block_tokens, len(tokens) + 1, self.block_tokens):
+            digest.update(tokens[end - self.block_tokens : end].tobytes())
+            yield digest.copy().digest()
+
+    def lookup(self, model: Path, tokens: Sequence[int]) -> Optional[Tuple[int, bytes]]:
+        """
+        Find the saved state sharing the longest prefix with `tokens`.
+
+        Returns:
+            Optional[Tuple[int, bytes]]: (reusable token count, KV state). The
+            caller must discard the state's positions past that count.
+        """
+        if not self.enabled:
+            return None
+        tokens = np.asarray(tokens, dtype=np.int32)
+        keys = list(self._block_keys(model, tokens))
+        with self._lock:
+            for key in reversed(keys):
+                entry = self._index.get(key)
+                if entry is not None:
+                    break
+            else:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(id(entry))
+            reused = common_prefix(entry.tokens, tokens)
+            self.hits += 1
+            self.tokens_reused += reused
+            return reused, entry.state
+
+    def store(self, model: Path, tokens: Sequence[int], state: bytes) -> None:
+        """Save `state` (the KV for `tokens`), evicting older entries to fit."""
+        if (
+            not self.enabled
+            or len(tokens) < self.block_tokens
+            or len(state) > self.max_bytes
+        ):
+            return
+        tokens = np.asarray(tokens, dtype=np.int32)
+        entry = PrefixEntry(tokens, state, list(self._block_keys(model, tokens)))
+        with self._lock:
+            # Newer turns take over the shared prefix keys of older ones;
+            # an older turn left with no keys is unreachable and dropped
+            shadowed = {}
+            for key in entry.keys:
+                old = self._index.get(key)
+                if old is not None:
+                    shadowed[id(old)] = old
+                self._index[key] = entry
+            for old in shadowed.values():
+                if all(self._index.get(key) is not old for key in old.keys):
+                    self._drop(old)
+            self._entries[id(entry)] = entry
+            self._bytes += len(state)
+            while self._bytes > self.max_bytes:
+                _, old = next(iter(self._entries.items()))
+                self._drop(old)
+
+    def _drop(self, entry: PrefixEntry) -> None:
+        del self._entries[id(entry)]
+        self._bytes -= len(entry.state)
+        for key in entry.keys:
+            if self._index.get(key) is entry:
+                del self._index[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Hit rate, reuse and memory counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "tokens_reused": self.tokens_reused,
+            }
@@ -0,0 +1,171 @@
+# backend/services/response_cache.py
+
+"""
+Semantic cache of finished StreamChat answers.
+
+Answers are stored with the embedding of their prompt in a small
+inner-product FAISS index over unit vectors (cosine similarity). A lookup
+only considers entries with the same model and the same history, so a
+follow-up question never gets an answer written for another conversation,
+and returns the closest one at or above `settings.response_cache_threshold`
+that is younger than `settings.response_cache_ttl_seconds`.
+
+Cached answers are grounded in their collection as it was when they were
+generated, so the collection is part of the key and an answer is ignored
+(and removed) once `CollectionManager.version` of its collection moves.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import faiss
+import numpy as np
+from config.settings import settings
+from models.chunk import Chunk
+from services.collection_service import CollectionManager
+
+# Nearest neighbours checked per lookup; others may belong to other keys
+_CANDIDATES = 8
+
+
+@dataclass
+class CachedResponse:
+    """A finished answer and the retrieval hits it was grounded in."""
+
+    key: bytes
+    final_text: str
+    hits: List[Tuple[Chunk, float]]
+    created: float
+    version: Tuple[int, int]
+
+
+class ResponseCache:
+    """
+    Bounded, TTL-limited map from (collection, model, history, similar
+    prompt) to answer.
+
+    Thread-safe. Embedding goes through the collections' shared embedder,
+    whose cache makes the second embedding of a prompt (for retrieval) free.
+    """
+
+    def __init__(self, collections: CollectionManager):
+        self.collections = collections
+        self._index: Optional[faiss.IndexIDMap2] = None
+        self._entries: "OrderedDict[int, CachedResponse]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def corpus_version(self, collection: str) -> Tuple[int, int]:
+        """Pass to `put` after generating, to avoid caching stale answers."""
+        return self.collections.version(collection)
+
+    @staticmethod
+    def _key(collection: str, model_name: str, history: List[str]) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(collection.encode("utf-8") + b"\0")
+        digest.update(model_name.encode("utf-8"))
+        for turn in history:
+            digest.update(b"\0" + turn.encode("utf-8"))
+        return digest.digest()
+
+    def _embed(self, prompt: str) -> np.ndarray:
+        vector = np.asarray(
+            [self.collections.embedder.embed_query(prompt)], dtype=np.float32
+        )
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _remove(self, entry_id: int) -> None:
+        del self._entries[entry_id]
+        self._index.remove_ids(np.asarray([entry_id], dtype=np.int64))
+
+    def get(
+        self, prompt: str, history: List[str], model_name: str, collection: str
+    ) -> Optional[CachedResponse]:
+        """
+        Closest cached answer for this collection, model, history and a
+        similar prompt.
+
+        Blocking (embeds `prompt`); call it off the event loop.
+        """
+        if not settings.response_cache_enabled:
+            return None
+        vector = self._embed(prompt)
+        key = self._key(collection, model_name, history)
+        version = self.collections.version(collection)
+        now = time.time()
+        with self._lock:
+            if self._index is None or not self._index.ntotal:
+                self.misses += 1
+                return None
+            scores, ids = self._index.search(vector, _CANDIDATES)
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id == -1 or score < settings.response_cache_threshold:
+                    break
+                entry = self._entries[int(entry_id)]
+                expired = now - entry.created > settings.response_cache_ttl_seconds
+                if expired or (entry.key == key and entry.version != version):
+                    self._remove(int(entry_id))
+                    continue
+                if entry.key == key:
+                    self._entries.move_to_end(int(entry_id))
+                    self.hits += 1
+                    return entry
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        prompt: str,
+        history: List[str],
+        model_name: str,
+        collection: str,
+        final_text: str,
+        hits: List[Tuple[Chunk, float]],
+        corpus_version: Tuple[int, int],
+    ) -> None:
+        """
+        Remember a finished answer.
+
+        Args:
+            corpus_version (Tuple[int, int]): `corpus_version(collection)`
+                read before retrieval; answers grounded in an older version
+                of the collection are not stored.
+        """
+        if not settings.response_cache_enabled or not final_text:
+            return
+        if corpus_version != self.collections.version(collection):
+            return
+        vector = self._embed(prompt)
+        entry = CachedResponse(
+            self._key(collection, model_name, history),
+            final_text,
+            list(hits),
+            time.time(),
+            corpus_version,
+        )
+        with self._lock:
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.asarray([entry_id], dtype=np.int64))
+            self._entries[entry_id] = entry
+            while len(self._entries) > settings.response_cache_max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
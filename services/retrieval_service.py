@@ -0,0 +1,73 @@
+# backend/services/retrieval_service.py
+
+"""
+Off-event-loop retrieval for chat.
+
+Embedding the prompt and searching FAISS are blocking, so they run on a
+small dedicated thread pool. Callers start `retrieve` as a task and overlap
+it with model warm-up instead of paying for the two one after the other.
+Each search leases its collection, so only that collection's vectors are
+searched and it cannot be evicted mid-query.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from config.settings import settings
+from models.chunk import Chunk
+from services import metrics
+from services.collection_service import CollectionManager
+from services.vector_service import similarity
+
+logger = logging.getLogger(__name__)
+
+
+class Retriever:
+    """Bounded-time semantic search over one collection per query."""
+
+    def __init__(self, collections: CollectionManager):
+        self.collections = collections
+        self._pool = ThreadPoolExecutor(
+            settings.rag_workers, thread_name_prefix="rag-retrieval"
+        )
+
+    def _search(
+        self, query: str, collection: Optional[str]
+    ) -> List[Tuple[Chunk, float]]:
+        mode = settings.search_mode
+        with self.collections.lease(collection) as vector_service:
+            hits = vector_service.search(query, settings.rag_top_k, mode=mode)
+        return [(chunk, similarity(score, mode)) for chunk, score in hits]
+
+    async def retrieve(
+        self, query: str, collection: Optional[str] = None
+    ) -> List[Tuple[Chunk, float]]:
+        """
+        Top settings.rag_top_k chunks of `collection` (the default one when
+        None) for `query`, as (Chunk, similarity): higher is closer,
+        whatever settings.search_mode is (see vector_service.similarity).
+
+        Retrieval is best-effort: on timeout or error the chat proceeds
+        without context, so an empty list is returned and the cause logged.
+        """
+        if not settings.rag_enabled or not query.strip():
+            return []
+        loop = asyncio.get_running_loop()
+        try:
+            with metrics.CHAT_RETRIEVAL.time():
+                return await asyncio.wait_for(
+                    loop.run_in_executor(self._pool, self._search, query, collection),
+                    timeout=settings.rag_timeout_seconds,
+                )
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Retrieval exceeded %.1fs; answering without context",
+                settings.rag_timeout_seconds,
+            )
+        except Exception:
+            logger.exception("Retrieval failed; answering without context")
+        return []
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
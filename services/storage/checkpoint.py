@@ -0,0 +1,54 @@
+# backend/services/storage/checkpoint.py
+
+"""
+Checkpoint file that ties a persisted snapshot to the WAL.
+
+`CHECKPOINT` records which snapshot directory is current and the last WAL
+segment folded into it. It is replaced atomically, so a crash during
+compaction leaves either the old or the new snapshot in effect, never a mix.
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+CHECKPOINT_FILE = "CHECKPOINT"
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    """
+    Attributes:
+        snapshot: Name of the snapshot directory under the index root.
+        last_segment: Highest WAL segment sequence included in the snapshot.
+        index_kind: FAISS index type stored in the snapshot (decides how it
+            can be memory-mapped).
+        num_rows: Number of vectors in the snapshot.
+        chunk_store: Chunk store directory whose first `num_rows` rows the
+            snapshot indexes (replaced when compaction drops deleted rows).
+    """
+
+    snapshot: str
+    last_segment: int
+    index_kind: str = "flat"
+    num_rows: int = 0
+    chunk_store: str = "chunks"
+
+
+def read_checkpoint(root: Path) -> Optional[Checkpoint]:
+    path = root / CHECKPOINT_FILE
+    if not path.exists():
+        return None
+    return Checkpoint(**json.loads(path.read_text(encoding="utf-8")))
+
+
+def write_checkpoint(root: Path, checkpoint: Checkpoint) -> None:
+    """Atomically replace the checkpoint file (write temp, fsync, rename)."""
+    tmp = root / f"{CHECKPOINT_FILE}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(asdict(checkpoint), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, root / CHECKPOINT_FILE)
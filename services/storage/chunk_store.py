@@ -0,0 +1,348 @@
+# backend/services/storage/chunk_store.py
+
+"""
+Compact, columnar, append-only chunk store addressed by FAISS row number.
+
+Directory layout (every file starts with an 8-byte header: magic "SGCS",
+u16 format version, u16 file kind):
+
+    columns.bin   fixed-width row records (see _ROW): chunk id digest,
+                  interned source/type ids, chunk index and the offset/length
+                  of the row's text and metadata
+    text.bin      concatenated UTF-8 chunk texts
+    meta.bin      concatenated JSON objects of loader metadata (often empty)
+    strings.bin   interned strings (u32 length + UTF-8), referenced by id
+
+Files are memory-mapped for reading, so start-up is O(1) in corpus size and
+text is sliced straight out of the page cache on a hit. Rows appended since
+the last `remap()` keep only their row record in an in-memory tail; their
+text and metadata are read back from the files. Nothing is pickled.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+from uuid import UUID
+import numpy as np
+from models.chunk import Chunk, ChunkLike
+
+FORMAT_VERSION = 1
+_MAGIC = b"SGCS"
+_HEADER = struct.Struct("<4sHH")
+_STRING_LEN = struct.Struct("<I")
+
+_ROW = np.dtype(
+    [
+        ("id", "V16"),
+        ("source", "<u4"),
+        ("type", "<u4"),
+        ("index", "<u4"),
+        ("text_off", "<u8"),
+        ("text_len", "<u4"),
+        ("meta_off", "<u8"),
+        ("meta_len", "<u4"),
+    ]
+)
+
+_FILES = {"columns": 1, "text": 2, "meta": 3, "strings": 4}
+_CORE_FIELDS = ("chunk_id", "source", "type", "index")
+
+
+class ChunkStoreFormatError(Exception):
+    """Raised when a chunk store file has a foreign magic or unknown version."""
+
+
+class _View(NamedTuple):
+    """Immutable read view: mapped rows plus rows appended since mapping."""
+
+    rows: int
+    columns: np.ndarray
+    text: Optional[mmap.mmap]
+    meta: Optional[mmap.mmap]
+    tail: List[tuple]  # _ROW records (as tuples) of rows appended since mapping
+
+
+def record_metadata(chunk: ChunkLike) -> Dict[str, Any]:
+    """
+    Metadata of `chunk` in WAL record form: loader metadata plus core fields.
+
+    Core fields win: loaders report the spooled temp file as "source",
+    while the chunk's source is the uploaded filename.
+    """
+    return {
+        **chunk.metadata,
+        "chunk_id": chunk.chunk_id,
+        "source": chunk.source,
+        "type": chunk.type,
+        "index": chunk.index,
+    }
+
+
+def _id_bytes(chunk_id: str) -> bytes:
+    """Content-hash (or legacy uuid4) chunk ids are 16 bytes written as hex."""
+    try:
+        return UUID(hex=chunk_id).bytes
+    except ValueError:
+        raise ValueError(f"Chunk id must be a 32-char hex digest: {chunk_id!r}")
+
+
+class ChunkStore:
+    """
+    Row-addressed store of chunk text, source, type, index and metadata.
+
+    Appends are expected from one thread at a time (VectorService holds its
+    write lock); reads are lock-free against an immutable `_View`.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._paths = {name: directory / f"{name}.bin" for name in _FILES}
+        for name, kind in _FILES.items():
+            self._check_header(self._paths[name], kind)
+
+        self._strings: List[str] = self._read_strings()
+        self._string_ids: Dict[str, int] = {s: i for i, s in enumerate(self._strings)}
+        self._handles: Dict[str, Any] = {}
+        # Tail rows are read through these descriptors; they stay open until
+        # the store is garbage collected, so searches still holding an older
+        # generation can finish after close() (or after compaction deleted
+        # the directory)
+        self._readers: Dict[str, int] = {
+            name: os.open(self._paths[name], os.O_RDONLY | getattr(os, "O_BINARY", 0))
+            for name in ("text", "meta")
+        }
+        self._read_lock = threading.Lock()  # Where os.pread is unavailable
+        self._view = self._map()
+
+    # --- Format -------------------------------------------------------------
+
+    @staticmethod
+    def _check_header(path: Path, kind: int) -> None:
+        if not path.exists() or path.stat().st_size < _HEADER.size:
+            with open(path, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, FORMAT_VERSION, kind))
+            return
+        with open(path, "rb") as f:
+            magic, version, found = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC or found != kind:
+            raise ChunkStoreFormatError(f"{path} is not a chunk store file")
+        if version != FORMAT_VERSION:
+            raise ChunkStoreFormatError(
+                f"{path} has format version {version}, expected {FORMAT_VERSION}"
+            )
+
+    def _read_strings(self) -> List[str]:
+        data = self._paths["strings"].read_bytes()[_HEADER.size :]
+        strings, pos = [], 0
+        while pos + _STRING_LEN.size <= len(data):
+            (length,) = _STRING_LEN.unpack_from(data, pos)
+            pos += _STRING_LEN.size
+            if pos + length > len(data):
+                break  # torn tail
+            strings.append(data[pos : pos + length].decode("utf-8"))
+            pos += length
+        return strings
+
+    def _map(self) -> _View:
+        rows = (self._paths["columns"].stat().st_size - _HEADER.size) // _ROW.itemsize
+        columns = (
+            np.memmap(
+                self._paths["columns"],
+                dtype=_ROW,
+                mode="r",
+                offset=_HEADER.size,
+                shape=(rows,),
+            )
+            if rows
+            else np.empty(0, dtype=_ROW)
+        )
+        return _View(
+            rows=rows,
+            columns=columns,
+            text=self._mmap(self._paths["text"]),
+            meta=self._mmap(self._paths["meta"]),
+            tail=[],
+        )
+
+    @staticmethod
+    def _mmap(path: Path) -> Optional[mmap.mmap]:
+        if path.stat().st_size <= _HEADER.size:
+            return None
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _handle(self, name: str):
+        handle = self._handles.get(name)
+        if handle is None:
+            handle = self._handles[name] = open(self._paths[name], "ab")
+        return handle
+
+    def _intern(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            raw = value.encode("utf-8")
+            self._handle("strings").write(_STRING_LEN.pack(len(raw)) + raw)
+            string_id = self._string_ids[value] = len(self._strings)
+            self._strings.append(value)
+        return string_id
+
+    # --- Writes -------------------------------------------------------------
+
+    def __len__(self) -> int:
+        view = self._view
+        return view.rows + len(view.tail)
+
+    def append(
+        self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Append rows in WAL record form (metadata carries the core fields).
+
+        Data is written to the OS but not fsynced; the WAL stays the source
+        of durability until `flush(fsync=True)` runs at snapshot time.
+        """
+        text_handle, meta_handle = self._handle("text"), self._handle("meta")
+        records = np.zeros(len(ids), dtype=_ROW)
+        for i, (chunk_id, text, meta) in enumerate(zip(ids, texts, metadatas)):
+            extra = {k: v for k, v in meta.items() if k not in _CORE_FIELDS}
+            text_raw = text.encode("utf-8")
+            meta_raw = json.dumps(extra, default=str).encode("utf-8") if extra else b""
+
+            records[i] = (
+                _id_bytes(chunk_id),
+                self._intern(str(meta["source"])),
+                self._intern(str(meta["type"])),
+                int(meta["index"]),
+                text_handle.tell() - _HEADER.size,
+                len(text_raw),
+                meta_handle.tell() - _HEADER.size,
+                len(meta_raw),
+            )
+            text_handle.write(text_raw)
+            meta_handle.write(meta_raw)
+        self._handle("columns").write(records.tobytes())
+        # Tail rows are read back from the files, so hand them to the OS first
+        text_handle.flush()
+        meta_handle.flush()
+        self._view.tail.extend(records.tolist())
+
+    def flush(self, fsync: bool = False) -> None:
+        for handle in self._handles.values():
+            handle.flush()
+            if fsync:
+                os.fsync(handle.fileno())
+
+    def remap(self) -> None:
+        """Map everything written so far and drop the in-memory tail."""
+        self.flush()
+        self._view = self._map()
+
+    def truncate(self, num_rows: int) -> None:
+        """Drop rows >= num_rows (appended after the last durable snapshot)."""
+        if num_rows >= len(self):
+            return
+        self.flush()
+        view = self._map()
+        if num_rows:
+            last = view.columns[num_rows - 1]
+            text_end = int(last["text_off"]) + int(last["text_len"])
+            meta_end = int(last["meta_off"]) + int(last["meta_len"])
+        else:
+            text_end = meta_end = 0
+        self._close_handles()
+        del view
+        for name, size in (
+            ("columns", num_rows * _ROW.itemsize),
+            ("text", text_end),
+            ("meta", meta_end),
+        ):
+            os.truncate(self._paths[name], _HEADER.size + size)
+        self._view = self._map()
+
+    # --- Reads --------------------------------------------------------------
+
+    def _record(self, view: _View, row: int) -> tuple:
+        if row >= view.rows:
+            return view.tail[row - view.rows]
+        return view.columns[row].item()
+
+    def _bytes(self, view: _View, name: str, row: int, off: int, length: int) -> bytes:
+        """`length` bytes at `off` of file `name` ("text" or "meta") for `row`."""
+        if not length:
+            return b""
+        off += _HEADER.size
+        if row < view.rows:
+            mapped = view.text if name == "text" else view.meta
+            return mapped[off : off + length]
+        fd = self._readers[name]
+        if hasattr(os, "pread"):
+            return os.pread(fd, length, off)
+        with self._read_lock:
+            os.lseek(fd, off, os.SEEK_SET)
+            return os.read(fd, length)
+
+    def _read(self, view: _View, row: int) -> Chunk:
+        raw_id, source, type_, index, text_off, text_len, meta_off, meta_len = (
+            self._record(view, row)
+        )
+        text = self._bytes(view, "text", row, text_off, text_len)
+        meta = self._bytes(view, "meta", row, meta_off, meta_len)
+        return Chunk(
+            chunk_id=bytes(raw_id).hex(),
+            text=text.decode("utf-8"),
+            source=self._strings[source],
+            type=self._strings[type_],
+            index=index,
+            metadata=json.loads(meta) if meta else {},
+        )
+
+    def get(self, row: int) -> Chunk:
+        return self._read(self._view, row)
+
+    def get_many(self, rows: Iterable[int]) -> Dict[int, Chunk]:
+        view = self._view
+        total = view.rows + len(view.tail)
+        return {row: self._read(view, row) for row in rows if 0 <= row < total}
+
+    def texts(self, start: int, end: int) -> List[str]:
+        """Texts for rows [start, end) in row order, without building Chunks."""
+        view = self._view
+        texts = []
+        for row in range(start, end):
+            _, _, _, _, off, length, _, _ = self._record(view, row)
+            texts.append(self._bytes(view, "text", row, off, length).decode("utf-8"))
+        return texts
+
+    def chunk_ids(self, rows: Optional[Iterable[int]] = None) -> List[str]:
+        """Chunk ids of `rows` (every row when None), without reading text."""
+        view = self._view
+        if rows is None:
+            ids = [bytes(raw).hex() for raw in view.columns["id"]]
+            ids.extend(bytes(rec[0]).hex() for rec in view.tail)
+            return ids
+        return [
+            (
+                bytes(view.columns[row]["id"]).hex()
+                if row < view.rows
+                else bytes(view.tail[row - view.rows][0]).hex()
+            )
+            for row in map(int, rows)
+        ]
+
+    def _close_handles(self) -> None:
+        for handle in self._handles.values():
+            handle.close()
+        self._handles.clear()
+
+    def close(self) -> None:
+        self.flush(fsync=True)
+        self._close_handles()
+
+    def __del__(self) -> None:
+        for fd in getattr(self, "_readers", {}).values():
+            os.close(fd)
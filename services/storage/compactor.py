@@ -0,0 +1,43 @@
+# backend/services/storage/compactor.py
+
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundCompactor:
+    """
+    Runs a maintenance callable on a dedicated daemon thread.
+
+    Callers `trigger()` it from the hot path; repeated triggers while a run is
+    in progress collapse into a single follow-up run.
+    """
+
+    def __init__(self, fn: Callable[[], None], name: str = "compactor"):
+        self._fn = fn
+        self._event = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def trigger(self) -> None:
+        self._event.set()
+
+    def _run(self) -> None:
+        while True:
+            self._event.wait()
+            self._event.clear()
+            if self._stopped:
+                return
+            try:
+                self._fn()
+            except Exception:
+                logger.exception("Background compaction failed")
+
+    def close(self) -> None:
+        """Stop the worker thread, letting an in-flight run finish."""
+        self._stopped = True
+        self._event.set()
+        self._thread.join()
@@ -0,0 +1,90 @@
+# backend/services/storage/hash_index.py
+
+import os
+from pathlib import Path
+from typing import Iterable, List
+
+_DIGEST_BYTES = 16
+
+
+class HashIndex:
+    """
+    Persistent set of content-addressed chunk ids.
+
+    Ids are 32-character hex digests (see `chunk_util.content_hash`) stored as
+    fixed 16-byte records in an append-only file beside the FAISS store, and
+    mirrored in an in-memory set for O(1) membership checks.
+    """
+
+    def __init__(self, path: Path, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        self._ids: set[str] = set()
+        if path.exists():
+            data = path.read_bytes()
+            usable = len(data) - len(data) % _DIGEST_BYTES  # drop a torn tail
+            self._ids = {
+                data[i : i + _DIGEST_BYTES].hex()
+                for i in range(0, usable, _DIGEST_BYTES)
+            }
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add_many(self, chunk_ids: Iterable[str]) -> List[str]:
+        """
+        Record ids not yet present and append them to disk.
+
+        Ids that are not 16-byte hex digests (legacy uuid4 ids are) are kept
+        in memory only.
+
+        Returns:
+            List[str]: The ids that were newly added.
+        """
+        added = [cid for cid in dict.fromkeys(chunk_ids) if cid not in self._ids]
+        if not added:
+            return added
+        self._ids.update(added)
+
+        payload = b"".join(
+            bytes.fromhex(cid) for cid in added if len(cid) == 2 * _DIGEST_BYTES
+        )
+        with open(self.path, "ab") as f:
+            f.write(payload)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        return added
+
+    def discard_many(self, chunk_ids: Iterable[str]) -> List[str]:
+        """
+        Forget ids of deleted chunks so their content can be indexed again.
+
+        The file is rewritten (temp file, then rename), so this costs
+        O(len(self)); deletions are rare next to additions.
+
+        Returns:
+            List[str]: The ids that were present and are now removed.
+        """
+        removed = [cid for cid in dict.fromkeys(chunk_ids) if cid in self._ids]
+        if not removed:
+            return removed
+        self._ids.difference_update(removed)
+
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(
+                b"".join(
+                    bytes.fromhex(cid)
+                    for cid in self._ids
+                    if len(cid) == 2 * _DIGEST_BYTES
+                )
+            )
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        return removed
@@ -0,0 +1,216 @@
+# backend/services/storage/lexical_index.py
+
+"""
+Incremental BM25 inverted index over chunk-store rows.
+
+Tokens are lower-cased runs of letters and digits, optionally joined by
+".", "-", "_", ":" or "/", so identifiers such as "CVE-2021-44228",
+"srv01.corp.local" or a SHA-256 digest stay whole. Compound tokens are
+also indexed by their parts, so "log4j" still matches "log4j-core".
+
+Postings are append-only arrays of (row, term frequency) in row order; a
+lookup of a rare identifier touches a handful of entries. The index is
+saved with each snapshot (rows below the checkpoint) and rows added since
+are re-indexed during WAL replay, exactly like the FAISS deltas.
+"""
+
+import math
+import re
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+_TOKEN = re.compile(r"[^\W_]+(?:[._:/-][^\W_]+)*")
+_PART = re.compile(r"[^\W_]+")
+FORMAT_VERSION = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """Whole tokens plus the parts of compound ones, in text order."""
+    tokens = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(_PART.findall(token))
+    return tokens
+
+
+class LexicalIndex:
+    """
+    Thread-safe BM25 index keyed by chunk-store row.
+
+    Args:
+        k1 (float): BM25 term-frequency saturation.
+        b (float): BM25 length normalization.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._doc_len = array("I")
+        self._total_len = 0
+        self._lock = threading.Lock()
+
+    @property
+    def num_rows(self) -> int:
+        return len(self._doc_len)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Upper bound of the posting arrays (a 4-byte row and a 2-byte tf per
+        token, fewer for repeated tokens) plus the document lengths.
+        """
+        return self._total_len * 6 + len(self._doc_len) * self._doc_len.itemsize
+
+    def add(self, start_row: int, texts: Iterable[str]) -> None:
+        """
+        Index `texts` as rows start_row, start_row + 1, ...
+
+        Rows must be added in order; rows already indexed are skipped so
+        replaying a record twice is harmless.
+        """
+        with self._lock:
+            for row, text in enumerate(texts, start=start_row):
+                if row < len(self._doc_len):
+                    continue
+                if row > len(self._doc_len):
+                    raise ValueError(f"Row {row} added before row {len(self._doc_len)}")
+                counts: Dict[str, int] = {}
+                tokens = tokenize(text)
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for token, tf in counts.items():
+                    postings = self._postings.get(token)
+                    if postings is None:
+                        postings = self._postings[token] = (array("I"), array("H"))
+                    postings[0].append(row)
+                    postings[1].append(min(tf, 0xFFFF))
+                self._doc_len.append(len(tokens))
+                self._total_len += len(tokens)
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        allowed: Optional[np.ndarray] = None,
+        excluded: Optional[np.ndarray] = None,
+        num_rows: Optional[int] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Best `top_k` rows for `query` by BM25, as (row, score), best first.
+
+        The lock is held only while postings are gathered; scoring runs
+        outside it, so concurrent searches overlap.
+
+        Args:
+            allowed (Optional[np.ndarray]): Sorted rows to restrict results to.
+            excluded (Optional[np.ndarray]): Sorted rows never to return
+                (deleted chunks awaiting compaction).
+            num_rows (Optional[int]): Only return rows below this (the rows
+                a reader's snapshot covers).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or top_k <= 0:
+            return []
+        gathered = []
+        with self._lock:
+            n = len(self._doc_len)
+            if not n:
+                return []
+            avg_len = self._total_len / n
+            doc_len = np.frombuffer(self._doc_len, dtype=np.uint32)
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                rows = np.frombuffer(postings[0], dtype=np.uint32).copy()
+                tf = np.frombuffer(postings[1], dtype=np.uint16).astype(np.float32)
+                gathered.append((rows, tf, doc_len[rows]))
+            # Views pin the arrays; release them before add() may resize one
+            del doc_len
+        if not gathered:
+            return []
+
+        rows_parts, score_parts = [], []
+        for rows, tf, lengths in gathered:
+            idf = math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths / avg_len)
+            rows_parts.append(rows)
+            score_parts.append(idf * tf * (self.k1 + 1) / (tf + norm))
+        rows = np.concatenate(rows_parts)
+        scores = np.concatenate(score_parts)
+        if num_rows is not None:
+            keep = rows < num_rows
+            rows, scores = rows[keep], scores[keep]
+        if allowed is not None:
+            keep = np.isin(rows, allowed)
+            rows, scores = rows[keep], scores[keep]
+        if excluded is not None and len(excluded):
+            keep = ~np.isin(rows, excluded)
+            rows, scores = rows[keep], scores[keep]
+        if len(rows_parts) > 1:
+            rows, inverse = np.unique(rows, return_inverse=True)
+            scores = np.bincount(inverse, weights=scores)
+        if len(rows) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            rows, scores = rows[best], scores[best]
+        order = np.argsort(-scores, kind="stable")
+        return [(int(rows[i]), float(scores[i])) for i in order]
+
+    # --- Persistence ----------------------------------------------------------
+
+    def save(self, path: Path, num_rows: int) -> None:
+        """Write the postings of rows below `num_rows` to `path` (.npz)."""
+        with self._lock:
+            num_rows = min(num_rows, len(self._doc_len))
+            terms, offsets, rows, tfs = [], [0], [], []
+            for term, (term_rows, term_tfs) in self._postings.items():
+                keep = np.frombuffer(term_rows, dtype=np.uint32)
+                count = int(np.searchsorted(keep, num_rows))
+                if not count:
+                    continue
+                terms.append(term)
+                rows.append(keep[:count].copy())
+                tfs.append(np.frombuffer(term_tfs, dtype=np.uint16)[:count].copy())
+                offsets.append(offsets[-1] + count)
+            keep = None  # Release the last view before add() may resize
+            doc_len = np.frombuffer(self._doc_len, dtype=np.uint32)[:num_rows].copy()
+
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                version=np.asarray(FORMAT_VERSION),
+                params=np.asarray([self.k1, self.b]),
+                terms=np.asarray("\n".join(terms).encode("utf-8")),
+                offsets=np.asarray(offsets, dtype=np.uint64),
+                rows=np.concatenate(rows) if rows else np.empty(0, np.uint32),
+                tfs=np.concatenate(tfs) if tfs else np.empty(0, np.uint16),
+                doc_len=doc_len,
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> "LexicalIndex":
+        """Read an index written by `save`."""
+        with np.load(path) as data:
+            if int(data["version"]) != FORMAT_VERSION:
+                raise ValueError(f"Unsupported lexical index version in {path}")
+            k1, b = (float(x) for x in data["params"])
+            index = cls(k1=k1, b=b)
+            raw_terms = bytes(data["terms"].item())
+            terms = raw_terms.decode("utf-8").split("\n") if raw_terms else []
+            offsets = data["offsets"]
+            rows, tfs = data["rows"], data["tfs"]
+            for i, term in enumerate(terms):
+                lo, hi = int(offsets[i]), int(offsets[i + 1])
+                index._postings[term] = (
+                    array("I", rows[lo:hi].tobytes()),
+                    array("H", tfs[lo:hi].tobytes()),
+                )
+            index._doc_len = array("I", data["doc_len"].tobytes())
+            index._total_len = int(data["doc_len"].sum())
+        return index
@@ -0,0 +1,147 @@
+# backend/services/storage/metadata_index.py
+
+"""
+Per-field posting lists over chunk-store rows, for filtered search.
+
+Every scalar metadata value (source, type, ICS organizer, PDF page, ...)
+maps to the ascending array of rows carrying it, e.g.
+("source", "/docs/calendar.ics") -> [12, 13, 14]. A filter resolves to one
+sorted row array by union within a field and intersection across fields,
+which VectorService turns into a FAISS ID selector.
+
+Like the BM25 index, it is saved with each snapshot and rows past the
+snapshot are re-added during WAL replay.
+"""
+
+import json
+import threading
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+import numpy as np
+
+FORMAT_VERSION = 1
+
+# Unique per row or part of the text itself; useless as filters
+UNINDEXED_FIELDS = frozenset({"chunk_id", "index"})
+MAX_VALUE_CHARS = 256
+
+Filters = Mapping[str, Any]
+
+
+def _indexable(field: str, value: Any) -> bool:
+    if field in UNINDEXED_FIELDS or value is None:
+        return False
+    if isinstance(value, str):
+        # Deletion finds a document's rows through its source, however long
+        return field == "source" or len(value) <= MAX_VALUE_CHARS
+    return isinstance(value, (bool, int, float))
+
+
+class MetadataIndex:
+    """Thread-safe (field, value) -> rows index."""
+
+    def __init__(self):
+        self._postings: Dict[Tuple[str, Any], array] = {}
+        self._num_rows = 0
+        self._lock = threading.Lock()
+
+    @property
+    def num_rows(self) -> int:
+        return self._num_rows
+
+    def add(self, start_row: int, metadatas: Iterable[Mapping[str, Any]]) -> None:
+        """
+        Index `metadatas` as rows start_row, start_row + 1, ...
+
+        Rows must be added in order; rows already indexed are skipped.
+        """
+        with self._lock:
+            for row, metadata in enumerate(metadatas, start=start_row):
+                if row < self._num_rows:
+                    continue
+                if row > self._num_rows:
+                    raise ValueError(f"Row {row} added before row {self._num_rows}")
+                for field, value in metadata.items():
+                    if _indexable(field, value):
+                        rows = self._postings.get((field, value))
+                        if rows is None:
+                            rows = self._postings[(field, value)] = array("I")
+                        rows.append(row)
+                self._num_rows += 1
+
+    def rows(self, filters: Filters) -> np.ndarray:
+        """
+        Sorted rows matching every field of `filters`.
+
+        Args:
+            filters (Mapping[str, Any]): field -> value, or field -> list of
+                accepted values. Fields are ANDed, listed values ORed.
+
+        Returns:
+            np.ndarray: Ascending uint32 row ids (empty if nothing matches).
+        """
+        result: Optional[np.ndarray] = None
+        with self._lock:
+            for field, wanted in filters.items():
+                values = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+                parts = [
+                    np.array(self._postings[(field, value)], dtype=np.uint32)
+                    for value in values
+                    if (field, value) in self._postings
+                ]
+                if not parts:
+                    return np.empty(0, dtype=np.uint32)
+                matched = (
+                    parts[0] if len(parts) == 1 else np.unique(np.concatenate(parts))
+                )
+                result = (
+                    matched
+                    if result is None
+                    else np.intersect1d(result, matched, assume_unique=True)
+                )
+                if not len(result):
+                    break
+        if result is None:
+            return np.arange(self._num_rows, dtype=np.uint32)
+        return result
+
+    # --- Persistence ----------------------------------------------------------
+
+    def save(self, path: Path, num_rows: int) -> None:
+        """Write the postings of rows below `num_rows` to `path` (.npz)."""
+        with self._lock:
+            num_rows = min(num_rows, self._num_rows)
+            keys, offsets, parts = [], [0], []
+            for key, rows in self._postings.items():
+                view = np.array(rows, dtype=np.uint32)
+                count = int(np.searchsorted(view, num_rows))
+                if count:
+                    keys.append(list(key))
+                    parts.append(view[:count])
+                    offsets.append(offsets[-1] + count)
+
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                version=np.asarray(FORMAT_VERSION),
+                num_rows=np.asarray(num_rows),
+                keys=np.asarray(json.dumps(keys).encode("utf-8")),
+                offsets=np.asarray(offsets, dtype=np.uint64),
+                rows=np.concatenate(parts) if parts else np.empty(0, np.uint32),
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> "MetadataIndex":
+        """Read an index written by `save`."""
+        with np.load(path) as data:
+            if int(data["version"]) != FORMAT_VERSION:
+                raise ValueError(f"Unsupported metadata index version in {path}")
+            index = cls()
+            keys = json.loads(bytes(data["keys"].item()).decode("utf-8"))
+            offsets, rows = data["offsets"], data["rows"]
+            for i, (field, value) in enumerate(keys):
+                lo, hi = int(offsets[i]), int(offsets[i + 1])
+                index._postings[(field, value)] = array("I", rows[lo:hi].tobytes())
+            index._num_rows = int(data["num_rows"])
+        return index
@@ -0,0 +1,221 @@
+# backend/services/storage/segment_log.py
+
+"""
+Append-only write-ahead segment log for the vector store.
+
+Every upsert is written as one framed record containing the new chunk ids,
+texts, metadata and their float32 embeddings; a deletion is a record with
+op "delete", the source and the chunk ids it removes, and no rows. Records
+are appended to the active segment file (`seg-000001.log`,
+`seg-000002.log`, ...) which is rotated once it grows past
+`max_segment_bytes`.
+
+Record layout (little endian):
+    magic (4s) | crc32 (I) | header_len (I) | body_len (Q) | header | body
+
+`header` is UTF-8 JSON with op/source/ids/texts/metadatas/dim, `body` is the
+raw row-major float32 vector matrix. A torn tail (crash mid-append) is detected
+by a short read or CRC mismatch and ignored on replay.
+"""
+
+import json
+import os
+import struct
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Literal, Optional
+
+import numpy as np
+
+_MAGIC = b"SGWL"
+_FRAME = struct.Struct("<4sIIQ")
+_SEGMENT_GLOB = "seg-*.log"
+
+
+@dataclass
+class LogRecord:
+    """
+    One batch of vectors and their document records, or one deletion.
+
+    Attributes:
+        ids: Chunk ids, one per row of `vectors` (for "delete", the chunk
+            ids removed).
+        texts: Chunk texts, one per row of `vectors`.
+        metadatas: Document metadata dicts, one per row of `vectors`.
+        vectors: (n, dim) float32 embedding matrix.
+        op: "add" appends rows; "delete" tombstones the live rows of
+            `source` whose chunk id is in `ids`.
+        source: Document the deleted chunks belong to.
+    """
+
+    ids: List[str]
+    texts: List[str]
+    metadatas: List[Dict[str, Any]]
+    vectors: np.ndarray = field(repr=False)
+    op: Literal["add", "delete"] = "add"
+    source: Optional[str] = None
+
+    @classmethod
+    def deletion(cls, source: str, ids: List[str]) -> "LogRecord":
+        """A record removing chunks `ids` of `source`."""
+        return cls(
+            ids=ids,
+            texts=[],
+            metadatas=[],
+            vectors=np.empty((0, 0), dtype=np.float32),
+            op="delete",
+            source=source,
+        )
+
+    def encode(self) -> bytes:
+        vectors = np.ascontiguousarray(self.vectors, dtype=np.float32)
+        header = json.dumps(
+            {
+                "op": self.op,
+                "source": self.source,
+                "ids": self.ids,
+                "texts": self.texts,
+                "metadatas": self.metadatas,
+                "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+            },
+            default=str,
+        ).encode("utf-8")
+        body = vectors.tobytes()
+        crc = zlib.crc32(body, zlib.crc32(header))
+        return _FRAME.pack(_MAGIC, crc, len(header), len(body)) + header + body
+
+    @classmethod
+    def decode(cls, header: bytes, body: bytes) -> "LogRecord":
+        meta = json.loads(header.decode("utf-8"))
+        vectors = np.frombuffer(body, dtype=np.float32)
+        if meta["dim"]:
+            vectors = vectors.reshape(-1, meta["dim"])
+        return cls(
+            ids=meta["ids"],
+            texts=meta["texts"],
+            metadatas=meta["metadatas"],
+            vectors=vectors,
+            op=meta.get("op", "add"),
+            source=meta.get("source"),
+        )
+
+
+def _segment_path(directory: Path, seq: int) -> Path:
+    return directory / f"seg-{seq:06d}.log"
+
+
+def _segment_seq(path: Path) -> int:
+    return int(path.stem.split("-", 1)[1])
+
+
+class SegmentLog:
+    """
+    Directory of numbered, append-only WAL segments.
+
+    A fresh segment is opened lazily on the first append after start-up or
+    rotation, so replaying never has to append after a possibly torn tail.
+
+    Args:
+        after (int): Last sequence number covered by a snapshot; new segments
+            are numbered above it even if compaction removed every segment
+            file, so `replay(after)` never skips them.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_segment_bytes: int,
+        fsync: bool = True,
+        after: int = 0,
+    ):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync = fsync
+
+        existing = self.segments()
+        self._active_seq = max(existing[-1] if existing else 0, after) + 1
+        self._active = None
+
+    def segments(self) -> List[int]:
+        """Sequence numbers of all segment files on disk, oldest first."""
+        return sorted(_segment_seq(p) for p in self.directory.glob(_SEGMENT_GLOB))
+
+    def total_bytes(self) -> int:
+        """Combined on-disk size of every segment, including the active one."""
+        return sum(p.stat().st_size for p in self.directory.glob(_SEGMENT_GLOB))
+
+    def append(self, record: LogRecord) -> int:
+        """
+        Durably append a record to the active segment.
+
+        Args:
+            record (LogRecord): The batch to persist.
+
+        Returns:
+            int: Sequence number of the segment the record landed in.
+        """
+        if self._active is None:
+            self._active = open(_segment_path(self.directory, self._active_seq), "ab")
+
+        self._active.write(record.encode())
+        self._active.flush()
+        if self.fsync:
+            os.fsync(self._active.fileno())
+
+        seq = self._active_seq
+        if self._active.tell() >= self.max_segment_bytes:
+            self.rotate()
+        return seq
+
+    def rotate(self) -> int:
+        """
+        Seal the active segment so that subsequent appends go to a new one.
+
+        Returns:
+            int: The highest sealed sequence number (everything at or below it
+            is immutable and safe to fold into a snapshot).
+        """
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+            self._active_seq += 1
+        return self._active_seq - 1
+
+    def replay(self, after: int = 0) -> Iterator[LogRecord]:
+        """
+        Yield every intact record from segments with sequence > `after`.
+
+        Args:
+            after (int): Last sequence number already covered by a snapshot.
+        """
+        for seq in self.segments():
+            if seq <= after:
+                continue
+            with open(_segment_path(self.directory, seq), "rb") as f:
+                while True:
+                    frame = f.read(_FRAME.size)
+                    if len(frame) < _FRAME.size:
+                        break
+                    magic, crc, header_len, body_len = _FRAME.unpack(frame)
+                    if magic != _MAGIC:
+                        break
+                    header = f.read(header_len)
+                    body = f.read(body_len)
+                    if len(header) < header_len or len(body) < body_len:
+                        break  # torn tail
+                    if zlib.crc32(body, zlib.crc32(header)) != crc:
+                        break
+                    yield LogRecord.decode(header, body)
+
+    def remove_through(self, seq: int) -> None:
+        """Delete sealed segments with sequence number <= `seq`."""
+        for existing in self.segments():
+            if existing <= seq and existing < self._active_seq:
+                _segment_path(self.directory, existing).unlink(missing_ok=True)
+
+    def close(self) -> None:
+        if self._active is not None:
+            self._active.close()
+            self._active = None
@@ -0,0 +1,93 @@
+# backend/services/storage/tombstones.py
+
+"""
+Bitmap of deleted chunk-store rows.
+
+Deleting a document only sets bits here (plus a WAL record), so its vectors
+disappear from search at once without touching FAISS. Compaction later
+rebuilds the index and chunk store without those rows and starts a fresh
+bitmap. The bitmap is saved with each snapshot.
+"""
+
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+import numpy as np
+
+
+class Tombstones:
+    """Thread-safe, growable deleted-row bitmap."""
+
+    def __init__(self):
+        self._bits = np.zeros(0, dtype=np.uint8)
+        self._count = 0
+        self._rows: Optional[np.ndarray] = None  # Cached dead_rows()
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        """Rows currently marked deleted."""
+        return self._count
+
+    def add(self, rows: Iterable[int]) -> int:
+        """
+        Mark `rows` deleted.
+
+        Returns:
+            int: How many of them were not deleted already.
+        """
+        rows = np.unique(np.fromiter(rows, dtype=np.int64))
+        if not len(rows):
+            return 0
+        with self._lock:
+            needed = int(rows[-1]) // 8 + 1
+            if needed > len(self._bits):
+                grown = np.zeros(max(needed, 2 * len(self._bits)), dtype=np.uint8)
+                grown[: len(self._bits)] = self._bits
+                self._bits = grown
+            masks = (1 << (rows & 7)).astype(np.uint8)
+            fresh = (self._bits[rows >> 3] & masks) == 0
+            # Rows are unique, but several may share a byte: OR them one by one
+            np.bitwise_or.at(self._bits, rows >> 3, masks)
+            added = int(fresh.sum())
+            self._count += added
+            if added:
+                self._rows = None
+            return added
+
+    def dead_rows(self) -> np.ndarray:
+        """Ascending int64 array of deleted rows (cached until the next add)."""
+        with self._lock:
+            if self._rows is None:
+                bits = np.unpackbits(self._bits, bitorder="little")
+                self._rows = np.flatnonzero(bits).astype(np.int64)
+            return self._rows
+
+    def is_dead(self, rows: np.ndarray) -> np.ndarray:
+        """Boolean mask over `rows`: True where the row is deleted."""
+        rows = np.asarray(rows, dtype=np.int64)
+        with self._lock:
+            inside = (rows >> 3) < len(self._bits)
+            mask = np.zeros(len(rows), dtype=bool)
+            picked = rows[inside]
+            mask[inside] = (self._bits[picked >> 3] >> (picked & 7)) & 1 == 1
+            return mask
+
+    # --- Persistence ----------------------------------------------------------
+
+    def save(self, path: Path, num_rows: int) -> None:
+        """Write the bits of rows below `num_rows` to `path` (.npy)."""
+        with self._lock:
+            bits = np.unpackbits(self._bits, bitorder="little")[:num_rows]
+        with open(path, "wb") as f:
+            np.save(f, np.packbits(bits, bitorder="little"), allow_pickle=False)
+
+    @classmethod
+    def load(cls, path: Path) -> "Tombstones":
+        """Read a bitmap written by `save`."""
+        tombstones = cls()
+        tombstones._bits = np.load(path, allow_pickle=False).astype(np.uint8)
+        tombstones._count = int(
+            np.unpackbits(tombstones._bits, bitorder="little").sum()
+        )
+        return tombstones
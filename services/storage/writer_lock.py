@@ -0,0 +1,89 @@
+# backend/services/storage/writer_lock.py
+
+"""
+Exclusive lock that makes one process the only writer of an index directory.
+
+The WAL, snapshots and chunk store assume a single writer. Every
+VectorService tries to take this lock on open; a process that cannot (e.g.
+another API worker, or scripts.train_index while the API server runs)
+opens the store read-only and its writes fail with StoreLockedError instead
+of corrupting the store. The lock is an OS file lock on `LOCK`, released
+when the holder closes it or its process exits.
+"""
+
+import os
+from pathlib import Path
+from typing import Optional, TextIO
+
+LOCK_FILE = "LOCK"
+
+if os.name == "nt":
+    import msvcrt
+
+    def _try_lock(handle: TextIO) -> bool:
+        try:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(handle: TextIO) -> None:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _try_lock(handle: TextIO) -> bool:
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(handle: TextIO) -> None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+class StoreLockedError(RuntimeError):
+    """Raised when another VectorService already holds the directory."""
+
+
+class WriterLock:
+    """
+    Non-blocking exclusive lock on `directory / LOCK`.
+
+    Args:
+        directory (Path): Index directory to guard.
+
+    Raises:
+        StoreLockedError: If another holder (in any process) has the lock.
+    """
+
+    def __init__(self, directory: Path):
+        self.path = directory / LOCK_FILE
+        handle = open(self.path, "a+", encoding="utf-8")
+        if not _try_lock(handle):
+            try:
+                handle.seek(0)
+                holder = handle.read().strip() or "unknown"
+            except OSError:  # Windows denies reads of the locked byte
+                holder = "unknown"
+            handle.close()
+            raise StoreLockedError(
+                f"{directory} is locked by another writer (pid {holder}); "
+                "stop the API server before running maintenance scripts"
+            )
+        handle.seek(0)
+        handle.truncate()
+        handle.write(str(os.getpid()))
+        handle.flush()
+        self._handle: Optional[TextIO] = handle
+
+    def release(self) -> None:
+        """Give up the lock; safe to call more than once."""
+        handle, self._handle = self._handle, None
+        if handle is not None:
+            _unlock(handle)
+            handle.close()
@@ -1,103 +1,1187 @@
 # backend/services/vector_service.py
 
-import torch
-from typing import List, Tuple
-from faiss import IndexFlatL2
-from langchain_community.docstore import InMemoryDocstore
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
-from langchain.schema import Document
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import faiss
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import (
+    Collection,
+    Dict,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from uuid import uuid4
+from langchain_core.embeddings import Embeddings
 from config.settings import settings
-from models.chunk import Chunk
+from models.chunk import Chunk, ChunkLike
+from services import index_factory, metrics
+from services.embedding_cache import CachedEmbeddings
+from services.embedding_engine import EmbeddingEngine
+from services.storage.chunk_store import ChunkStore, record_metadata
+from services.storage.checkpoint import Checkpoint, read_checkpoint, write_checkpoint
+from services.storage.compactor import BackgroundCompactor
+from services.storage.hash_index import HashIndex
+from services.storage.lexical_index import LexicalIndex
+from services.storage.metadata_index import Filters, MetadataIndex
+from services.storage.segment_log import LogRecord, SegmentLog
+from services.storage.tombstones import Tombstones
+from services.storage.writer_lock import StoreLockedError, WriterLock
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = settings.embedding_model
+SNAPSHOT_PREFIX = "snapshot-"
+HASH_INDEX_FILE = "chunk_hashes.bin"
+CHUNK_STORE_DIR = "chunks"
+LEXICAL_INDEX_FILE = "lexical.npz"
+METADATA_INDEX_FILE = "metadata.npz"
+TOMBSTONES_FILE = "tombstones.npy"
+LEGACY_DOCSTORE_FILE = "index.pkl"
+LEGACY_SQLITE_FILE = "chunks.sqlite"
+# Hash-set entry plus metadata postings per row, for `memory_bytes`
+_ROW_OVERHEAD_BYTES = 160
+
+
+class UpsertResult(NamedTuple):
+    """Outcome of an upsert: chunks newly indexed vs. already present."""
+
+    added: int
+    skipped: int
+
+
+SearchMode = Literal["dense", "lexical", "hybrid"]
+
+
+def build_embedding_cache(engine: Embeddings, directory: Path) -> Embeddings:
+    """
+    Wrap `engine` in a two-tier CachedEmbeddings stored under `directory`.
+
+    Returns `engine` itself when settings.embedding_cache_enabled is off.
+    """
+    if not settings.embedding_cache_enabled:
+        return engine
+    return CachedEmbeddings(
+        engine,
+        model_name=getattr(
+            engine,
+            "cache_namespace",
+            getattr(engine, "model_name", type(engine).__name__),
+        ),
+        directory=directory,
+        memory_items=settings.embedding_cache_memory_items,
+        disk_items=settings.embedding_cache_disk_items,
+    )
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[int]], k: int
+) -> List[Tuple[int, float]]:
+    """
+    Fuse ranked row lists: each row scores sum(1 / (k + rank)), rank from 1.
+
+    Returns:
+        List[Tuple[int, float]]: (row, fused score), best first.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def similarity(score: float, mode: SearchMode) -> float:
+    """
+    Map a `VectorService.search` score to a higher-is-closer similarity.
+
+    Dense scores are L2 distances, mapped to 1 / (1 + distance). Lexical
+    and hybrid scores are 1 - the normalized fused rank score, so the fused
+    score itself (in (0, 1], 1 = first in every ranking) is returned.
+    """
+    if mode == "dense":
+        return 1.0 / (1.0 + max(score, 0.0))
+    return 1.0 - score
+
+
+class _Segment(NamedTuple):
+    """
+    A FAISS index holding rows [start, start + index.ntotal).
+
+    `path` is set for the memory-mapped, read-only snapshot base and None
+    for in-memory deltas. Published indexes are never modified: new rows
+    go into a copy of the last delta (while it is `mutable` and below
+    settings.faiss_delta_rows) or into a new delta.
+    """
+
+    index: faiss.Index
+    start: int
+    mutable: bool
+    path: Optional[Path] = None
+
+
+class _Rows(NamedTuple):
+    """
+    Everything addressed by chunk-store row number.
+
+    Compaction that drops deleted rows renumbers the survivors, so it
+    builds a new set of these and swaps it in together with the segments.
+    """
+
+    chunk_store: ChunkStore
+    lexical: LexicalIndex
+    metadata_index: MetadataIndex
+    tombstones: Tombstones
+
+
+class _Generation(NamedTuple):
+    """
+    One immutable, searchable state of the store.
+
+    Writers never change a published generation; they build the next one
+    and publish it with a single attribute assignment. Searches take a
+    reference and run without locks against exactly the rows published
+    when they started, in parallel with each other and with writers.
+    """
+
+    segments: Tuple[_Segment, ...]
+    rows: _Rows
+    dead: np.ndarray  # Sorted deleted rows, as of this generation
+    corpus_version: int
+    masks: Dict[Tuple[int, int], np.ndarray]  # Dead-row bitmaps, built lazily
+
+    @property
+    def num_rows(self) -> int:
+        if not self.segments:
+            return 0
+        last = self.segments[-1]
+        return last.start + last.index.ntotal
+
+    def mask(self, seg: _Segment) -> np.ndarray:
+        """Packed bitmap of `seg`'s deleted rows, by local id."""
+        key = (seg.start, seg.index.ntotal)
+        bits = self.masks.get(key)
+        if bits is None:
+            lo, hi = np.searchsorted(self.dead, [key[0], key[0] + key[1]])
+            dead = np.zeros(key[1], dtype=bool)
+            dead[self.dead[lo:hi] - key[0]] = True
+            bits = self.masks[key] = np.packbits(dead, bitorder="little")
+        return bits
 
 
 class VectorService:
     """
-    Wrapper around LangChain's FAISS vectorstore for chunk embeddings.
+    FAISS-backed store for chunk embeddings with near-instant start-up.
 
-    - Stores embeddings + metadata (via the Document.metadata field).
-    - Persists index to disk automatically.
-    - Supports similarity_search_with_score for citations.
+    - Rows live in a memory-mapped, read-only base index (the latest
+      snapshot) plus small in-memory delta indexes for rows added since.
+      Searches fan out over all of them and merge by distance.
+    - Chunk text and metadata live in a memory-mapped columnar ChunkStore
+      and are read only for hits.
+    - Persists every upsert to an append-only WAL under `index_path/wal`;
+      a background compactor periodically folds deltas into a new snapshot.
+    - Skips chunks whose content-addressed id is already in the persistent
+      hash index, so re-uploading an unchanged file costs no embedding.
+    - Embeds through a batched, device-aware EmbeddingEngine (loaded on
+      first use) wrapped in a two-tier CachedEmbeddings cache.
+    - Index type (Flat / IVF-Flat / IVF-PQ / HNSW) comes from settings and
+      can be retrained in place with `migrate_index`.
+    - Supports per-query nprobe / efSearch tuning for citations.
+    - Keeps an incremental BM25 LexicalIndex over the same rows, saved with
+      each snapshot, for exact identifiers (CVE ids, hostnames, hashes);
+      hybrid search fuses it with the ANN results by reciprocal rank.
+    - Keeps (field, value) -> rows posting lists of chunk metadata, so
+      filtered searches run inside FAISS through an ID selector.
+    - Deletes documents by source through a WAL record and a tombstone
+      bitmap that masks their rows from search at once; compaction drops
+      them physically once they pass settings.tombstone_compact_ratio.
+    - Searches read an immutable `_Generation` without locking; upserts,
+      deletions and compaction publish new generations atomically.
+    - One process per directory is the writer (`WriterLock`); others open
+      it read-only, search the writer's latest snapshot and raise
+      StoreLockedError on writes.
     """
 
-    def __init__(self, embedder=None):
-        # Prepare index directory
-        self.index_path = settings.faiss_index_dir
+    def __init__(self, embedder=None, index_path: Optional[Path] = None):
+        # Prepare index directory (settings.faiss_index_dir unless this is
+        # one of several collections, see services.collection_service)
+        self.index_path = Path(index_path or settings.faiss_index_dir)
         self.index_path.mkdir(parents=True, exist_ok=True)
+        # One writer per directory; while another process holds it, this one
+        # serves searches from the latest snapshot (see `_follow_checkpoint`)
+        try:
+            self._writer_lock: Optional[WriterLock] = WriterLock(self.index_path)
+        except StoreLockedError:
+            self._writer_lock = None
+        self.read_only = self._writer_lock is None
+
+        # A CachedEmbeddings is shared with other stores and flushed by its
+        # owner; anything else is wrapped in a cache of our own
+        self._owns_embedder = not isinstance(embedder, CachedEmbeddings)
+        if not self._owns_embedder:
+            self.engine = embedder.base
+            self.embedder = embedder
+        else:
+            # Use the provided embedder, or default to local all-MiniLM-L6-v2
+            # (loaded on first use, not at import time)
+            self.engine = embedder or EmbeddingEngine.from_settings(EMBEDDING_MODEL)
+            self.embedder = build_embedding_cache(
+                self.engine, self.index_path / "embedding_cache"
+            )
+
+        # _lock serializes writers (WAL appends and publishing generations);
+        # searches never take it. _maintenance_lock serializes compaction and
+        # index migration against each other
+        self._lock = threading.Lock()
+        self._maintenance_lock = threading.Lock()
+
+        checkpoint = read_checkpoint(self.index_path)
+        store_dir = checkpoint.chunk_store if checkpoint else CHUNK_STORE_DIR
+        self._generation = _Generation(
+            segments=(),
+            rows=_Rows(
+                chunk_store=ChunkStore(self.index_path / store_dir),
+                lexical=LexicalIndex(),
+                metadata_index=MetadataIndex(),
+                tombstones=Tombstones(),
+            ),
+            dead=np.empty(0, dtype=np.int64),
+            corpus_version=0,
+            masks={},
+        )
+        self._lexical_pool = ThreadPoolExecutor(thread_name_prefix="lexical-search")
+        # Read-only stores: the writer's snapshot currently served
+        self._checkpoint: Optional[Checkpoint] = None
+        self._next_refresh = 0.0
+        self.hashes: Optional[HashIndex] = None
+        self.wal: Optional[SegmentLog] = None
+        self._compactor: Optional[BackgroundCompactor] = None
+        if self.read_only:
+            self._follow_checkpoint()
+            return
 
-        # Use the provided embedder, or default to local all-MiniLM-L6-v2
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.embedder = embedder or HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={"device": device},
+        # Left behind by a compaction that crashed before or after its switch
+        for path in self.index_path.glob(f"{CHUNK_STORE_DIR}-*"):
+            if path.is_dir() and path.name != store_dir:
+                shutil.rmtree(path, ignore_errors=True)
+
+        # Map the latest snapshot, upgrading a pickled LangChain store once
+        if checkpoint is not None:
+            snapshot_dir = self.index_path / checkpoint.snapshot
+            if (snapshot_dir / LEGACY_DOCSTORE_FILE).exists():
+                checkpoint = self._upgrade_legacy(snapshot_dir, checkpoint.last_segment)
+        elif (self.index_path / LEGACY_DOCSTORE_FILE).exists():
+            checkpoint = self._upgrade_legacy(self.index_path, 0)
+        if (self.index_path / LEGACY_SQLITE_FILE).exists():
+            self._upgrade_sqlite(self.index_path / LEGACY_SQLITE_FILE)
+
+        self._snapshot_segment = 0
+        if checkpoint is not None:
+            self._snapshot_segment = checkpoint.last_segment
+            self._publish(segments=(self._open_snapshot(checkpoint),))
+
+        # Rows past the snapshot are rebuilt from the WAL below
+        self.chunk_store.truncate(self.num_rows)
+        self._open_row_indexes(checkpoint)
+
+        # Content-hash index of every chunk id already stored; seed it from
+        # the chunk store when upgrading from a store that predates it
+        hash_path = self.index_path / HASH_INDEX_FILE
+        seed = not hash_path.exists()
+        self.hashes = HashIndex(hash_path, fsync=settings.wal_fsync)
+        if seed:
+            self.hashes.add_many(self.chunk_store.chunk_ids())
+
+        # Replay WAL records written after the snapshot into a delta
+        self.wal = SegmentLog(
+            self.index_path / "wal",
+            max_segment_bytes=settings.wal_segment_max_bytes,
+            fsync=settings.wal_fsync,
+            after=self._snapshot_segment,
+        )
+        for record in self.wal.replay(after=self._snapshot_segment):
+            self._apply(record)
+
+        self._compactor = BackgroundCompactor(self._compact, name="faiss-compactor")
+        if (
+            self.wal.total_bytes() >= settings.wal_compact_bytes
+            or self._needs_reclaim()
+        ):
+            self._compactor.trigger()
+
+    @property
+    def num_rows(self) -> int:
+        """Total vectors across the base snapshot and all deltas."""
+        return self._generation.num_rows
+
+    @property
+    def num_segments(self) -> int:
+        """FAISS indexes (base snapshot + deltas) every search visits."""
+        return len(self._generation.segments)
+
+    @property
+    def memory_bytes(self) -> int:
+        """
+        Estimated resident size: vector codes of every segment (mapped
+        snapshots included, since searches page them in), BM25 postings and
+        a per-row allowance for the id set and metadata postings.
+        """
+        gen = self._generation
+        return (
+            sum(index_factory.memory_bytes(seg.index) for seg in gen.segments)
+            + gen.rows.lexical.nbytes
+            + gen.num_rows * _ROW_OVERHEAD_BYTES
+        )
+
+    @property
+    def chunk_store(self) -> ChunkStore:
+        return self._generation.rows.chunk_store
+
+    @property
+    def lexical(self) -> LexicalIndex:
+        return self._generation.rows.lexical
+
+    @property
+    def metadata_index(self) -> MetadataIndex:
+        return self._generation.rows.metadata_index
+
+    @property
+    def tombstones(self) -> Tombstones:
+        return self._generation.rows.tombstones
+
+    @property
+    def dimension(self) -> int:
+        """Embedding size, from the index or the model config (no inference)."""
+        segments = self._generation.segments
+        if segments:
+            return segments[0].index.d
+        if hasattr(self.engine, "dimension"):
+            return self.engine.dimension
+        return len(self.embedder.embed_query("dimension probe"))
+
+    @property
+    def corpus_version(self) -> int:
+        """Counter bumped whenever the set of searchable chunks changes."""
+        self._follow_checkpoint()
+        return self._generation.corpus_version
+
+    @property
+    def wal_bytes(self) -> int:
+        """Bytes of WAL not yet folded into a snapshot (0 when read-only)."""
+        return self.wal.total_bytes() if self.wal is not None else 0
+
+    @property
+    def index_kind(self) -> str:
+        """IndexType of the base snapshot ("flat" before the first one)."""
+        segments = self._generation.segments
+        if not segments or segments[0].path is None:
+            return "flat"
+        return index_factory.index_kind(segments[0].index)
+
+    def _publish(self, **changes) -> None:
+        """
+        Make a copy of the current generation with `changes` current.
+
+        Caller holds the lock (or is still in __init__).
+        """
+        if "dead" in changes:
+            changes["masks"] = {}
+        self._generation = self._generation._replace(**changes)
+
+    # --- Snapshots ----------------------------------------------------------
+
+    def _open_snapshot(self, checkpoint: Checkpoint) -> _Segment:
+        path = self.index_path / checkpoint.snapshot / settings.faiss_index_file
+        index = index_factory.read_index(path, checkpoint.index_kind, mmap=True)
+        return _Segment(index=index, start=0, mutable=False, path=path)
+
+    def _open_row_indexes(self, checkpoint: Optional[Checkpoint]) -> None:
+        """
+        Load the snapshot's BM25 index, metadata index and tombstones, and
+        index any snapshot rows they lack (stores written before they
+        existed, legacy upgrades).
+        """
+        rows = self._load_row_indexes(checkpoint, self._generation.rows, self.num_rows)
+        self._publish(rows=rows, dead=rows.tombstones.dead_rows())
+
+    def _load_row_indexes(
+        self, checkpoint: Optional[Checkpoint], rows: _Rows, num_rows: int
+    ) -> _Rows:
+        """`_open_row_indexes` for `rows` holding `num_rows`, without publishing."""
+        lexical, metadata_index, tombstones = rows.lexical, rows.metadata_index, None
+        if checkpoint is not None:
+            snapshot_dir = self.index_path / checkpoint.snapshot
+            if (snapshot_dir / LEXICAL_INDEX_FILE).exists():
+                lexical = LexicalIndex.load(snapshot_dir / LEXICAL_INDEX_FILE)
+            if (snapshot_dir / METADATA_INDEX_FILE).exists():
+                metadata_index = MetadataIndex.load(snapshot_dir / METADATA_INDEX_FILE)
+            if (snapshot_dir / TOMBSTONES_FILE).exists():
+                tombstones = Tombstones.load(snapshot_dir / TOMBSTONES_FILE)
+        batch = settings.ingest_batch_size
+        for start in range(lexical.num_rows, num_rows, batch):
+            end = min(start + batch, num_rows)
+            lexical.add(start, rows.chunk_store.texts(start, end))
+        for start in range(metadata_index.num_rows, num_rows, batch):
+            end = min(start + batch, num_rows)
+            stored = rows.chunk_store.get_many(range(start, end))
+            metadata_index.add(
+                start, (record_metadata(stored[row]) for row in range(start, end))
+            )
+        return rows._replace(
+            lexical=lexical,
+            metadata_index=metadata_index,
+            tombstones=tombstones or rows.tombstones,
         )
 
-        # Load existing index or start fresh
-        if (self.index_path / "index.faiss").exists():
-            self.store = FAISS.load_local(
-                str(self.index_path),
-                self.embedder,
-                allow_dangerous_deserialization=True,
+    def _follow_checkpoint(self) -> None:
+        """
+        Read-only stores: switch to the writer's latest snapshot, checked at
+        most every settings.reader_refresh_seconds.
+
+        Readers never see the writer's WAL, so its uploads and deletions
+        show up here after its next compaction.
+        """
+        if not self.read_only or time.monotonic() < self._next_refresh:
+            return
+        with self._lock:
+            if time.monotonic() < self._next_refresh:
+                return
+            self._next_refresh = time.monotonic() + settings.reader_refresh_seconds
+            checkpoint = read_checkpoint(self.index_path)
+            if checkpoint is None or checkpoint == self._checkpoint:
+                return
+            store_dir = self.index_path / checkpoint.chunk_store
+            try:
+                if not store_dir.is_dir():
+                    raise FileNotFoundError(store_dir)
+                segment = self._open_snapshot(checkpoint)
+                rows = self._load_row_indexes(
+                    checkpoint,
+                    _Rows(
+                        chunk_store=ChunkStore(store_dir),
+                        lexical=LexicalIndex(),
+                        metadata_index=MetadataIndex(),
+                        tombstones=Tombstones(),
+                    ),
+                    segment.index.ntotal,
+                )
+                # The writer only deletes a snapshot after replacing CHECKPOINT
+                if read_checkpoint(self.index_path) != checkpoint:
+                    raise FileNotFoundError(f"{checkpoint.snapshot} was replaced")
+            except OSError as e:
+                logger.warning("Could not open snapshot of %s: %s", self.index_path, e)
+                return
+            self._checkpoint = checkpoint
+            self._publish(
+                segments=(segment,),
+                rows=rows,
+                dead=rows.tombstones.dead_rows(),
+                corpus_version=self._generation.corpus_version + 1,
             )
-        else:
-            sample_vector = self.embedder.embed_query("test")
-            dim = len(sample_vector)
-            self.store = FAISS(
-                embedding_function=self.embedder,
-                index=IndexFlatL2(dim),
-                docstore=InMemoryDocstore(),
-                index_to_docstore_id={},
+
+    def require_writer(self) -> None:
+        """
+        Raises:
+            StoreLockedError: If the store is open read-only.
+        """
+        if self.read_only:
+            raise StoreLockedError(
+                f"{self.index_path} is open read-only because another process "
+                "(e.g. the API server) is its writer"
             )
 
-    def upsert(self, chunks: List[Chunk]) -> None:
+    def _write_snapshot(
+        self, index: faiss.Index, last_segment: int, rows: Optional[_Rows] = None
+    ) -> Checkpoint:
+        """
+        Write `index` to a new snapshot directory and switch the checkpoint.
+
+        Args:
+            rows (Optional[_Rows]): Row structures the index is numbered
+                against (default: the current ones).
+        """
+        rows = rows or self._generation.rows
+        name = f"{SNAPSHOT_PREFIX}{last_segment:06d}-{uuid4().hex[:8]}"
+        tmp = self.index_path / f"{name}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        with metrics.MAINTENANCE_SECONDS.labels("snapshot").time():
+            faiss.write_index(index, str(tmp / settings.faiss_index_file))
+            rows.lexical.save(tmp / LEXICAL_INDEX_FILE, index.ntotal)
+            rows.metadata_index.save(tmp / METADATA_INDEX_FILE, index.ntotal)
+            rows.tombstones.save(tmp / TOMBSTONES_FILE, index.ntotal)
+            os.replace(tmp, self.index_path / name)
+            # The checkpoint vouches for the first index.ntotal chunk rows
+            rows.chunk_store.flush(fsync=True)
+        checkpoint = Checkpoint(
+            snapshot=name,
+            last_segment=last_segment,
+            index_kind=index_factory.index_kind(index),
+            num_rows=index.ntotal,
+            chunk_store=rows.chunk_store.directory.name,
+        )
+        write_checkpoint(self.index_path, checkpoint)
+        return checkpoint
+
+    def _upgrade_legacy(self, path: Path, last_segment: int) -> Checkpoint:
+        """
+        Convert a LangChain `save_local` store (index.faiss + pickled
+        InMemoryDocstore) into a snapshot plus the chunk store.
         """
-        Embed and add a list of Chunk objects to the FAISS index.
+        from langchain_community.vectorstores import FAISS
+
+        store = FAISS.load_local(
+            str(path), self.embedder, allow_dangerous_deserialization=True
+        )
+        docs = [
+            store.docstore.search(store.index_to_docstore_id[row])
+            for row in range(store.index.ntotal)
+        ]
+        self.chunk_store.truncate(0)
+        self.chunk_store.append(
+            [doc.metadata.get("chunk_id", doc.id or "") for doc in docs],
+            [doc.page_content for doc in docs],
+            [doc.metadata for doc in docs],
+        )
+        checkpoint = self._write_snapshot(store.index, last_segment)
+        if path != self.index_path:
+            shutil.rmtree(path, ignore_errors=True)
+        for legacy in (settings.faiss_index_file, LEGACY_DOCSTORE_FILE):
+            (self.index_path / legacy).unlink(missing_ok=True)
+        return checkpoint
 
-        Each Chunk’s metadata is stored in the Document.metadata,
+    def _upgrade_sqlite(self, path: Path, batch_size: int = 1024) -> None:
+        """Copy the rows of the SQLite docstore into the chunk store, then drop it."""
+        self.chunk_store.truncate(0)
+        conn = sqlite3.connect(path)
+        try:
+            cursor = conn.execute(
+                "SELECT chunk_id, text, metadata FROM chunks ORDER BY row"
+            )
+            while rows := cursor.fetchmany(batch_size):
+                self.chunk_store.append(
+                    [chunk_id for chunk_id, _, _ in rows],
+                    [text for _, text, _ in rows],
+                    [json.loads(meta) for _, _, meta in rows],
+                )
+        finally:
+            conn.close()
+        self.chunk_store.flush(fsync=True)
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{path}{suffix}").unlink(missing_ok=True)
+
+    # --- Writes ---------------------------------------------------------------
+
+    def _apply(self, record: LogRecord) -> None:
+        """
+        Add a WAL record's rows to the chunk store, row indexes and a delta,
+        then publish them as a new generation.
+        """
+        if record.op == "delete":
+            self._apply_delete(record)
+            return
+        gen = self._generation
+        start = gen.num_rows
+        vectors = np.ascontiguousarray(record.vectors)
+        segments = list(gen.segments)
+        last = segments[-1] if segments else None
+        if (
+            last is not None
+            and last.mutable
+            and last.index.ntotal + len(vectors) <= settings.faiss_delta_rows
+        ):
+            # Searches may be reading the delta; extend a copy instead
+            delta = faiss.clone_index(last.index)
+            delta.add(vectors)
+            segments[-1] = last._replace(index=delta)
+        else:
+            delta = faiss.IndexFlatL2(vectors.shape[1])
+            delta.add(vectors)
+            segments.append(_Segment(index=delta, start=start, mutable=True))
+        # Readers of the current generation never look past its rows
+        self.chunk_store.append(record.ids, record.texts, record.metadatas)
+        self.hashes.add_many(record.ids)
+        self.lexical.add(start, record.texts)
+        self.metadata_index.add(start, record.metadatas)
+        self._publish(segments=tuple(segments), corpus_version=gen.corpus_version + 1)
+
+    def _live_rows(self, source: str) -> np.ndarray:
+        """Rows of `source` that are not deleted, ascending."""
+        rows = self.metadata_index.rows({"source": source}).astype(np.int64)
+        return rows[~self.tombstones.is_dead(rows)]
+
+    def _apply_delete(self, record: LogRecord) -> None:
+        """
+        Tombstone the live rows of `record.source` whose id is in `record.ids`.
+
+        Rows are resolved by id rather than logged by number, so the record
+        replays correctly after compaction renumbers rows.
+        """
+        doomed = set(record.ids)
+        rows = self._live_rows(record.source)
+        self.tombstones.add(
+            row
+            for row, chunk_id in zip(rows, self.chunk_store.chunk_ids(rows))
+            if chunk_id in doomed
+        )
+        # Their content may be uploaded (and must be embedded) again
+        self.hashes.discard_many(record.ids)
+        self._publish(
+            dead=self.tombstones.dead_rows(),
+            corpus_version=self._generation.corpus_version + 1,
+        )
+
+    def upsert(self, chunks: List[ChunkLike]) -> UpsertResult:
+        """
+        Embed and add Chunk models or ChunkRecords to the FAISS index.
+
+        Each Chunk’s fields and metadata are stored in the chunk store,
         so we can retrieve source/index later for citation.
+        Persistence cost is one WAL append proportional to the new chunks;
+        chunks already indexed are neither embedded nor written.
+        """
+        new_chunks = self.filter_new(chunks)
+        if not new_chunks:
+            return UpsertResult(added=0, skipped=len(chunks))
+        added = self.add_embeddings(new_chunks, self.embed_chunks(new_chunks))
+        return UpsertResult(added=added, skipped=len(chunks) - added)
+
+    def filter_new(self, chunks: List[ChunkLike]) -> List[ChunkLike]:
+        """
+        Drop chunks whose id is already indexed or repeated earlier in `chunks`.
+
+        Call this before `embed_chunks` to avoid embedding known content.
+        """
+        self.require_writer()
+        seen = set()
+        new_chunks = []
+        with metrics.UPSERT_FILTER.time():
+            for chunk in chunks:
+                if chunk.chunk_id in self.hashes or chunk.chunk_id in seen:
+                    continue
+                seen.add(chunk.chunk_id)
+                new_chunks.append(chunk)
+        return new_chunks
+
+    def embed_chunks(self, chunks: List[ChunkLike]) -> np.ndarray:
+        """
+        Embed chunk texts without touching the index.
+
+        Safe to call from any thread; the ingestion pipeline runs this on its
+        embedding pool while the index stage commits earlier batches.
+
+        Returns:
+            np.ndarray: (len(chunks), dim) float32 matrix.
+        """
+        texts = [chunk.text for chunk in chunks]
+        with metrics.UPSERT_EMBED.time():
+            return np.asarray(self.embedder.embed_documents(texts), dtype=np.float32)
+
+    def add_embeddings(self, chunks: List[ChunkLike], vectors: np.ndarray) -> int:
+        """
+        Persist and index precomputed embeddings for `chunks`.
+
+        Chunks that became known since `filter_new` ran (e.g. a concurrent
+        upload of the same file) or repeat within `chunks` are dropped
+        under the lock.
+
+        Args:
+            chunks (List[ChunkLike]): Chunks in the same order as `vectors`.
+            vectors (np.ndarray): Output of `embed_chunks` for these chunks.
+
+        Returns:
+            int: Number of chunks actually added.
+        """
+        self.require_writer()
+        if not chunks:
+            return 0
+
+        with self._lock:
+            seen = set()
+            keep = []
+            for i, chunk in enumerate(chunks):
+                if chunk.chunk_id not in self.hashes and chunk.chunk_id not in seen:
+                    seen.add(chunk.chunk_id)
+                    keep.append(i)
+            if len(keep) < len(chunks):
+                chunks = [chunks[i] for i in keep]
+                vectors = vectors[keep]
+            if not chunks:
+                return 0
+            self._commit(chunks, vectors)
+        metrics.UPSERT_ROWS.inc(len(chunks))
+
+        if self.wal.total_bytes() >= settings.wal_compact_bytes:
+            self._compactor.trigger()
+        return len(chunks)
+
+    def _commit(self, chunks: List[ChunkLike], vectors: np.ndarray) -> None:
+        """Append one WAL record for `chunks` and apply it. Caller holds the lock."""
+        record = LogRecord(
+            ids=[chunk.chunk_id for chunk in chunks],
+            texts=[chunk.text for chunk in chunks],
+            metadatas=[record_metadata(chunk) for chunk in chunks],
+            vectors=vectors,
+        )
+
+        # Log first, then apply, so an acknowledged upsert survives a crash
+        with metrics.UPSERT_WAL.time():
+            self.wal.append(record)
+        with metrics.UPSERT_APPLY.time():
+            self._apply(record)
+
+    def delete_source(self, source: str, keep: Collection[str] = ()) -> int:
+        """
+        Delete every chunk of the document `source`, except ids in `keep`.
+
+        The rows vanish from search immediately (tombstones); their space is
+        reclaimed by a background compaction once deleted rows make up
+        settings.tombstone_compact_ratio of the store.
+
+        Args:
+            source (str): Chunk source, i.e. the uploaded filename.
+            keep (Collection[str]): Chunk ids to spare; re-uploading a file
+                passes the ids of its new version so unchanged chunks stay.
+
+        Returns:
+            int: Number of chunks deleted.
         """
-        # Convert Chunk → LangChain Document
-        docs = []
-        for chunk in chunks:
-            doc = Document(
-                page_content=chunk.text,
-                metadata={
-                    "chunk_id": chunk.chunk_id,
-                    "source": chunk.source,
-                    "type": chunk.type,
-                    "index": chunk.index,
-                    **chunk.metadata,
-                },
+        self.require_writer()
+        keep = set(keep)
+        with self._lock:
+            rows = self._live_rows(source)
+            ids = [
+                chunk_id
+                for chunk_id in self.chunk_store.chunk_ids(rows)
+                if chunk_id not in keep
+            ]
+            if not ids:
+                return 0
+            record = LogRecord.deletion(source, ids)
+            self.wal.append(record)
+            self._apply(record)
+            reclaim = self._needs_reclaim()
+
+        if reclaim or self.wal.total_bytes() >= settings.wal_compact_bytes:
+            self._compactor.trigger()
+        return len(ids)
+
+    def _needs_reclaim(self) -> bool:
+        dead = self.tombstones.count
+        return dead > 0 and dead >= settings.tombstone_compact_ratio * self.num_rows
+
+    # --- Compaction and migration --------------------------------------------
+
+    def _compact(
+        self, force: bool = False, kind: Optional[index_factory.IndexType] = None
+    ) -> None:
+        """
+        Fold the base snapshot and all current deltas into a new snapshot.
+
+        Under the lock we only seal the WAL and freeze the current segments;
+        merging, writing and re-mapping happen while upserts and searches
+        continue against the frozen segments plus a fresh delta. Once
+        deleted rows pass settings.tombstone_compact_ratio (or when
+        retraining), they are dropped instead of folded (see `_reclaim`).
+
+        Args:
+            force (bool): Snapshot even if no WAL was written since the last
+                one (deleted rows past the threshold are reclaimed anyway).
+            kind (Optional[IndexType]): Retrain every row into a new index of
+                this type instead of adding the deltas to the existing base.
+        """
+        with self._maintenance_lock:
+            with self._lock:
+                sealed = self.wal.rotate()
+                if (
+                    sealed <= self._snapshot_segment
+                    and not force
+                    and not self._needs_reclaim()
+                ):
+                    return  # Nothing new since the last snapshot, nothing to drop
+                frozen = [
+                    seg._replace(mutable=False) for seg in self._generation.segments
+                ]
+                self._publish(segments=tuple(frozen))
+                rows, end = self._generation.rows, self.num_rows
+                dead = self._generation.dead
+                reclaim = len(dead) > 0 and (kind is not None or self._needs_reclaim())
+            if not frozen:
+                return
+
+            if reclaim:
+                with metrics.MAINTENANCE_SECONDS.labels("reclaim").time():
+                    checkpoint = self._reclaim(frozen, rows, end, dead, sealed, kind)
+            else:
+                with metrics.MAINTENANCE_SECONDS.labels("compact").time():
+                    merged = self._merge(frozen, kind)
+                    checkpoint = self._write_snapshot(merged, sealed)
+                    base = self._open_snapshot(checkpoint)
+                    del merged
+
+                    with self._lock:
+                        segments = self._generation.segments[len(frozen) :]
+                        self._publish(segments=(base,) + segments)
+                        self._snapshot_segment = sealed
+                        self.chunk_store.remap()
+
+            # Everything below the checkpoint is now redundant
+            self.wal.remove_through(sealed)
+            for path in self.index_path.glob(f"{SNAPSHOT_PREFIX}*"):
+                if path.name != checkpoint.snapshot:
+                    shutil.rmtree(path, ignore_errors=True)
+
+    def _merge(
+        self, frozen: List[_Segment], kind: Optional[index_factory.IndexType]
+    ) -> faiss.Index:
+        """Build a private, in-RAM index holding every row of `frozen`."""
+        if kind is not None:
+            return index_factory.train_index(kind, self._export_vectors(frozen))
+
+        base = frozen[0] if frozen[0].path is not None else None
+        if base is not None:
+            merged = index_factory.read_index(
+                base.path, index_factory.index_kind(base.index), mmap=False
             )
-            docs.append(doc)
+            deltas = frozen[1:]
+        else:
+            merged = index_factory.initial_index(frozen[0].index.d)
+            deltas = frozen
+        for seg in deltas:
+            if seg.index.ntotal:
+                merged.add(seg.index.reconstruct_n(0, seg.index.ntotal))
+        return merged
 
-        # Add to index and persist
-        self.store.add_documents(docs)
-        self.store.save_local(str(self.index_path))
+    def _reclaim(
+        self,
+        frozen: List[_Segment],
+        rows: _Rows,
+        end: int,
+        dead: np.ndarray,
+        sealed: int,
+        kind: Optional[index_factory.IndexType],
+    ) -> Checkpoint:
+        """
+        Rebuild the frozen rows [0, end) without the `dead` ones.
 
-    def search(self, query: str, top_k: int) -> List[Tuple[Chunk, float]]:
+        Survivors are renumbered densely into a new index, chunk store
+        directory and row indexes, built without the lock. Under the lock,
+        rows added and deleted meanwhile are carried over and everything is
+        published as one generation; searches still running on the previous
+        one keep their references to its indexes and mapped files.
         """
-        Perform a similarity search on the query text.
+        keep = np.setdiff1d(np.arange(end, dtype=np.int64), dead)
+        merged = self._merge_survivors(frozen, keep, kind)
+
+        new = _Rows(
+            chunk_store=ChunkStore(
+                self.index_path / f"{CHUNK_STORE_DIR}-{uuid4().hex[:8]}"
+            ),
+            lexical=LexicalIndex(k1=rows.lexical.k1, b=rows.lexical.b),
+            metadata_index=MetadataIndex(),
+            tombstones=Tombstones(),
+        )
+        self._copy_rows(rows.chunk_store, new, keep)
+        checkpoint = self._write_snapshot(merged, sealed, new)
+        base = self._open_snapshot(checkpoint)
+        del merged
 
-        Returns a list of (Chunk, score) tuples for the top_k hits.
-        """
-        # similarity_search_with_score returns List[(Document, score)]
-        results = self.store.similarity_search_with_score(query, top_k)
-        hits = []
-        for doc, score in results:
-            meta = doc.metadata
-            # Reconstruct our Chunk object (or a lightweight Citation)
-            chunk = Chunk(
-                chunk_id=meta["chunk_id"],
-                text=doc.page_content,
-                source=meta["source"],
-                type=meta["type"],
-                index=meta["index"],
-                metadata={
-                    k: v
-                    for k, v in meta.items()
-                    if k not in {"chunk_id", "source", "type", "index"}
-                },
+        # Rows appended since the freeze: most of them without the lock...
+        caught_up = len(rows.chunk_store)
+        self._copy_rows(rows.chunk_store, new, range(end, caught_up))
+        with self._lock:
+            # ...the rest with it, together with deletions made meanwhile
+            self._copy_rows(rows.chunk_store, new, range(caught_up, self.num_rows))
+            late = np.setdiff1d(rows.tombstones.dead_rows(), dead)
+            below = late < end
+            new.tombstones.add(
+                np.concatenate(
+                    [
+                        np.searchsorted(keep, late[below]),
+                        len(keep) + late[~below] - end,
+                    ]
+                )
             )
-            hits.append((chunk, score))
-        return hits
+            removed = end - len(keep)
+            new.chunk_store.remap()
+            self._publish(
+                segments=(base,)
+                + tuple(
+                    seg._replace(start=seg.start - removed)
+                    for seg in self._generation.segments[len(frozen) :]
+                ),
+                rows=new,
+                dead=new.tombstones.dead_rows(),
+            )
+            self._snapshot_segment = sealed
+
+        # Searches on the old generation keep their mappings of these files
+        rows.chunk_store.close()
+        shutil.rmtree(rows.chunk_store.directory, ignore_errors=True)
+        return checkpoint
+
+    def _merge_survivors(
+        self,
+        frozen: List[_Segment],
+        keep: np.ndarray,
+        kind: Optional[index_factory.IndexType],
+    ) -> faiss.Index:
+        """
+        Build a private, in-RAM index of the `keep` rows of `frozen`, in order.
+
+        Without `kind`, the base index is emptied and refilled, so IVF
+        kinds keep their trained centroids; PQ rows are re-added from their
+        decoded codes, which encode back to the same codes.
+        """
+        if kind is not None:
+            return index_factory.train_index(kind, self._export_vectors(frozen)[keep])
+
+        base = frozen[0] if frozen[0].path is not None else None
+        parts = []
+        if base is not None:
+            merged = index_factory.read_index(
+                base.path, index_factory.index_kind(base.index), mmap=False
+            )
+            if merged.ntotal:
+                parts.append(index_factory.reconstruct(merged, 0, merged.ntotal))
+                ivf = faiss.try_extract_index_ivf(merged)
+                if ivf is not None:
+                    ivf.make_direct_map(False)
+            merged.reset()
+            deltas = frozen[1:]
+        else:
+            merged = index_factory.initial_index(frozen[0].index.d)
+            deltas = frozen
+        for seg in deltas:
+            if seg.index.ntotal:
+                parts.append(seg.index.reconstruct_n(0, seg.index.ntotal))
+        if len(keep):
+            merged.add(np.ascontiguousarray(np.concatenate(parts)[keep]))
+        return merged
+
+    @staticmethod
+    def _copy_rows(source: ChunkStore, target: _Rows, rows: Sequence[int]) -> None:
+        """Append `rows` of `source` to `target`'s chunk store and row indexes."""
+        batch = settings.ingest_batch_size
+        for i in range(0, len(rows), batch):
+            picked = [int(row) for row in rows[i : i + batch]]
+            stored = source.get_many(picked)
+            chunks = [stored[row] for row in picked]
+            start = len(target.chunk_store)
+            metadatas = [record_metadata(chunk) for chunk in chunks]
+            texts = [chunk.text for chunk in chunks]
+            target.chunk_store.append(
+                [chunk.chunk_id for chunk in chunks], texts, metadatas
+            )
+            target.lexical.add(start, texts)
+            target.metadata_index.add(start, metadatas)
+
+    def _export_vectors(self, segments: List[_Segment]) -> np.ndarray:
+        """
+        Every vector of `segments`, in row order.
+
+        Exact indexes are read back directly; PQ codes are lossy, so those
+        rows are re-embedded from the stored text (mostly cache hits).
+        """
+        parts = []
+        for seg in segments:
+            if not seg.index.ntotal:
+                continue
+            if seg.path is None:
+                parts.append(seg.index.reconstruct_n(0, seg.index.ntotal))
+                continue
+            kind = index_factory.index_kind(seg.index)
+            if index_factory.stores_exact_vectors(seg.index):
+                full = index_factory.read_index(seg.path, kind, mmap=False)
+                parts.append(index_factory.reconstruct(full, 0, full.ntotal))
+            else:
+                texts = self.chunk_store.texts(seg.start, seg.start + seg.index.ntotal)
+                parts.append(
+                    np.asarray(self.embedder.embed_documents(texts), dtype=np.float32)
+                )
+        return np.concatenate(parts)
+
+    def migrate_index(self, kind: index_factory.IndexType) -> None:
+        """
+        Train a new index of `kind` from the stored vectors and swap it in.
+
+        Training runs without the write lock, so uploads continue meanwhile
+        into a fresh delta; the new snapshot is then mapped in atomically.
+
+        Raises:
+            StoreLockedError: If another process is the writer of the store.
+            ValueError: If the store has no live vectors to train on.
+        """
+        self.require_writer()
+        if self.num_rows - len(self._generation.dead) <= 0:
+            raise ValueError("The store has no vectors to train an index on")
+        self._compact(force=True, kind=kind)
+
+    def close(self) -> None:
+        """Stop background compaction, close the WAL and flush the cache."""
+        if self._compactor is not None:
+            self._compactor.close()
+        with self._lock:
+            if self.wal is not None:
+                self.wal.close()
+        self.chunk_store.close()
+        self._lexical_pool.shutdown(wait=False, cancel_futures=True)
+        if self._owns_embedder and isinstance(self.embedder, CachedEmbeddings):
+            self.embedder.flush()
+        if self._writer_lock is not None:
+            self._writer_lock.release()
+
+    # --- Reads ----------------------------------------------------------------
+
+    def _dense_search(
+        self,
+        gen: _Generation,
+        query: str,
+        top_k: int,
+        nprobe: Optional[int],
+        ef_search: Optional[int],
+        allowed: Optional[np.ndarray] = None,
+    ) -> List[Tuple[float, int]]:
+        """
+        Global top_k (L2 distance, row) over the base and every delta of `gen`.
+
+        With `allowed` (sorted live rows), each segment is searched through
+        an ID selector over its share of those rows; otherwise deleted rows
+        are masked by a negated bitmap selector. A segment that returns
+        fewer hits than it has eligible rows (IVF lists or the HNSW beam
+        missed them) is searched again exhaustively, so filters never cost
+        recall.
+        """
+        with metrics.SEARCH_EMBED.time():
+            vector = np.asarray([self.embedder.embed_query(query)], dtype=np.float32)
+
+        candidates: List[Tuple[float, int]] = []
+        with metrics.SEARCH_ANN.time():
+            for seg in gen.segments:
+                n = seg.index.ntotal
+                if not n:
+                    continue
+                selector, k = None, top_k
+                if allowed is not None:
+                    lo, hi = np.searchsorted(allowed, [seg.start, seg.start + n])
+                    if lo == hi:
+                        continue
+                    local = allowed[lo:hi].astype(np.int64) - seg.start
+                    selector = faiss.IDSelectorBatch(local)
+                    k = min(top_k, len(local))
+                else:
+                    lo, hi = np.searchsorted(gen.dead, [seg.start, seg.start + n])
+                    if hi - lo == n:
+                        continue
+                    if lo < hi:
+                        # The selectors only point at `bits`; keep both alive
+                        bits = gen.mask(seg)
+                        masked = faiss.IDSelectorBitmap(len(bits), faiss.swig_ptr(bits))
+                        selector = faiss.IDSelectorNot(masked)
+                        k = int(min(top_k, n - int(hi - lo)))
+                params = index_factory.search_params(
+                    seg.index, nprobe, ef_search, selector=selector
+                )
+                scores, ids = seg.index.search(vector, k, params=params)
+                if selector is not None and (ids[0] == -1).any() and params is not None:
+                    params = index_factory.search_params(
+                        seg.index, selector=selector, exhaustive=True
+                    )
+                    scores, ids = seg.index.search(vector, k, params=params)
+                candidates.extend(
+                    (float(score), seg.start + int(i))
+                    for score, i in zip(scores[0], ids[0])
+                    if i != -1
+                )
+        candidates.sort()
+        return candidates[:top_k]
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        mode: Optional[SearchMode] = None,
+        filters: Optional[Filters] = None,
+    ) -> List[Tuple[Chunk, float]]:
+        """
+        Perform a similarity search on the query text.
+
+        Lock-free: runs against the generation current at the call, so any
+        number of searches proceed in parallel with uploads and compaction.
+
+        Args:
+            query (str): Free-text query.
+            top_k (int): Number of hits to return.
+            nprobe (Optional[int]): IVF lists to visit for this query.
+            ef_search (Optional[int]): HNSW candidate list size for this query.
+            mode (Optional[SearchMode]): "dense" (ANN only), "lexical" (BM25
+                only) or "hybrid" (both, run in parallel and fused by
+                reciprocal rank); settings.search_mode when None.
+            filters (Optional[Filters]): Only return chunks whose metadata
+                matches, e.g. {"source": path, "type": "ics"}; a list value
+                accepts any of its entries. Source and type are always
+                indexed, as are scalar loader metadata values.
+
+        Returns a list of (Chunk, score) tuples for the top_k hits, where
+        score is lower-is-closer: the L2 distance in dense mode, otherwise
+        1 - the fused rank score normalized to [0, 1) (0 = first in every
+        ranking). Deleted chunks are never returned.
+        """
+        self._follow_checkpoint()
+        gen = self._generation
+        mode = mode or settings.search_mode
+        with metrics.SEARCH_SECONDS.labels(mode).time():
+            allowed = None
+            if filters:
+                # Posting lists may already hold rows of an unpublished upsert
+                allowed = gen.rows.metadata_index.rows(filters)
+                allowed = allowed[: np.searchsorted(allowed, gen.num_rows)]
+                if len(gen.dead):
+                    allowed = allowed[~np.isin(allowed, gen.dead)]
+                if not len(allowed):
+                    return []
+            if mode == "dense":
+                candidates = self._dense_search(
+                    gen, query, top_k, nprobe, ef_search, allowed
+                )
+            else:
+                depth = max(top_k, settings.hybrid_candidates)
+                # BM25 runs on its own thread while the query is embedded and
+                # the ANN indexes are searched
+                lexical = self._lexical_pool.submit(
+                    metrics.SEARCH_LEXICAL.call,
+                    gen.rows.lexical.search,
+                    query,
+                    depth,
+                    allowed,
+                    gen.dead if allowed is None else None,
+                    gen.num_rows,
+                )
+                rankings = []
+                if mode == "hybrid":
+                    dense = self._dense_search(
+                        gen, query, depth, nprobe, ef_search, allowed
+                    )
+                    rankings.append([row for _, row in dense])
+                rankings.append([row for row, _ in lexical.result()])
+                k = settings.hybrid_rrf_k
+                best = (k + 1) / len(rankings)
+                candidates = [
+                    (1.0 - score * best, row)
+                    for row, score in reciprocal_rank_fusion(rankings, k)[:top_k]
+                ]
+
+            with metrics.SEARCH_FETCH.time():
+                stored = gen.rows.chunk_store.get_many(row for _, row in candidates)
+            return [(stored[row], score) for score, row in candidates if row in stored]
@@ -0,0 +1,51 @@
+# backend/tests/test_chat_scheduler.py
+
+"""
+ChatScheduler must surface a decode worker failure to the chats it was
+serving instead of ending them as if they had completed.
+"""
+
+import asyncio
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+import pytest
+from services.chat_scheduler import ChatScheduler, _DecodeWorker
+
+
+class _Pool:
+    def resolve(self, model_name):
+        return Path(f"{model_name}.gguf")
+
+    @contextmanager
+    def lease(self, name):
+        yield SimpleNamespace(model=SimpleNamespace(n_vocab=lambda: 32))
+
+
+def test_worker_failure_fails_active_chats(monkeypatch):
+    def admit(self, model, ctx, free_slots):
+        with self.scheduler._cond:
+            while self.waiting:
+                self.active.append(self.waiting.popleft())
+
+    def step(self, model, ctx, batch, n_vocab):
+        for seq in self.active:
+            seq.emit("partial ")
+        raise RuntimeError("decode failed")
+
+    monkeypatch.setattr(
+        _DecodeWorker,
+        "_context",
+        lambda self, model: SimpleNamespace(close=lambda: None),
+    )
+    monkeypatch.setattr(_DecodeWorker, "_admit", admit)
+    monkeypatch.setattr(_DecodeWorker, "_step", step)
+
+    async def chat():
+        pieces = []
+        async for piece in ChatScheduler(_Pool()).generate("m", []):
+            pieces.append(piece)
+        return pieces
+
+    with pytest.raises(RuntimeError, match="decode failed"):
+        asyncio.run(chat())
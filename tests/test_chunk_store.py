@@ -0,0 +1,31 @@
+# backend/tests/test_chunk_store.py
+
+"""
+ChunkStore rows read back the same from the unmapped tail as once mapped.
+"""
+
+import datetime
+from services.storage.chunk_store import ChunkStore
+from utils.chunk_util import content_hash
+
+
+def test_tail_rows_read_like_mapped_rows(tmp_path):
+    store = ChunkStore(tmp_path)
+    texts = [f"row {i} héllo" for i in range(10)]
+    metadatas = [
+        {"source": "a.pdf", "type": "pdf", "index": i, "page": i, "day": day}
+        for i, day in enumerate([datetime.date(2024, 1, 1)] * 5 + [None] * 5)
+    ]
+    metadatas[0] = {"source": "a.pdf", "type": "pdf", "index": 0}
+    ids = [content_hash(text, "a.pdf") for text in texts]
+    store.append(ids[:5], texts[:5], metadatas[:5])
+    store.remap()
+    store.append(ids[5:], texts[5:], metadatas[5:])
+
+    tail = store.get_many(range(10))
+    assert store.texts(0, 10) == texts
+    assert store.chunk_ids() == ids
+    store.remap()
+    assert store.get_many(range(10)) == tail
+    assert tail[1].metadata == {"page": 1, "day": "2024-01-01"}
+    store.close()
@@ -0,0 +1,95 @@
+# backend/tests/test_chunker.py
+
+"""
+Chunker must cut exactly like RecursiveCharacterTextSplitter: chunk ids
+are content hashes, so any difference re-ids chunks of existing corpora.
+"""
+
+import random
+import pytest
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from utils.chunker import Chunker
+
+_SPECIAL_WORDS = [
+    "CVE-2024-1234",
+    "héllo",
+    "日本語",
+    "tab\there",
+    "a" * 1500,
+    "b" * 300,
+]
+
+
+def _word(rng: random.Random) -> str:
+    if rng.random() < 0.05:
+        return rng.choice(_SPECIAL_WORDS)
+    return "".join(rng.choice("abcdefghij") for _ in range(rng.randint(1, 12)))
+
+
+def _paragraph(rng: random.Random) -> str:
+    words = rng.choice([1, 3, 20, 150, 400])
+    lines = [
+        rng.choice([" ", "  ", " \t"]).join(_word(rng) for _ in range(words))
+        for _ in range(rng.randint(1, 4))
+    ]
+    return rng.choice(["\n", "\n \n"]).join(lines)
+
+
+def _document(rng: random.Random) -> str:
+    """Short and over-long paragraphs, lines and words, odd whitespace."""
+    return rng.choice(["\n\n", "\n\n\n", "\n\n\n\n", " \n\n "]).join(
+        _paragraph(rng) for _ in range(rng.randint(0, 60))
+    )
+
+
+def _langchain(text: str, size: int, overlap: int):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=overlap)
+    return splitter.split_text(text)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_matches_langchain_on_random_documents(seed):
+    rng = random.Random(seed)
+    size = rng.choice([50, 100, 333, 1000])
+    overlap = rng.choice([0, 1, size // 5, size - 1])
+    text = _document(rng)
+    assert list(Chunker(size, overlap).split_text(text)) == _langchain(
+        text, size, overlap
+    )
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        " ",
+        "\n" * 50,
+        "x" * 5000,
+        "a b" * 2000,
+        "\n\n".join("word " * n for n in [10, 40, 300] * 60),
+    ],
+    ids=["empty", "space", "newlines", "no-separators", "words", "mixed-paragraphs"],
+)
+def test_matches_langchain_on_edge_cases(text):
+    assert list(Chunker(1000, 200).split_text(text)) == _langchain(text, 1000, 200)
+
+
+class _WordTokenizer:
+    """One token per whitespace-separated word."""
+
+    def __call__(self, texts, add_special_tokens=False):
+        return {"input_ids": [text.split() for text in texts]}
+
+
+def test_token_budget_only_resplits_chunks_that_do_not_fit():
+    rng = random.Random(7)
+    text = _document(rng)
+    chunker = Chunker(1000, 200, tokenizer=_WordTokenizer(), max_tokens=60)
+
+    chunks = list(chunker.split_text(text))
+
+    assert chunks and all(len(chunk.split()) <= 60 for chunk in chunks)
+    # Chunks LangChain made within budget come through unchanged, in order
+    fitting = [c for c in _langchain(text, 1000, 200) if len(c.split()) <= 60]
+    remaining = iter(chunks)
+    assert fitting and all(chunk in remaining for chunk in fitting)
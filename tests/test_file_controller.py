@@ -0,0 +1,78 @@
+# backend/tests/test_file_controller.py
+
+"""
+Upload endpoints must remove every spooled temp file that no pipeline or
+job took over, whichever step fails.
+"""
+
+import os
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from controllers import file_controller as controller
+from services import file_service
+
+
+@pytest.fixture
+def spooled(monkeypatch):
+    """Paths spooled during the test; the spool fails on a 'fail' filename."""
+    paths = []
+    spool_upload = file_service.spool_upload
+
+    async def spool(file, suffix):
+        if file.filename.startswith("fail"):
+            raise OSError("disk full")
+        paths.append(await spool_upload(file, suffix))
+        return paths[-1]
+
+    monkeypatch.setattr(file_service, "spool_upload", spool)
+    yield paths
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(controller.settings, "faiss_index_dir", str(tmp_path))
+    monkeypatch.setattr(controller.settings, "embedding_cache_enabled", False)
+    app = FastAPI()
+    app.include_router(controller.file_controller)
+    with TestClient(app) as client:
+        yield client
+    controller.collections.close()
+
+
+def _files(*names):
+    return [("files", (name, b"some text", "text/plain")) for name in names]
+
+
+def test_upload_removes_spool_when_pipeline_is_full(client, spooled, monkeypatch):
+    # Let the pre-spool check pass, then find the pipeline full at submit
+    pipeline = controller.ingest_pipeline
+    monkeypatch.setattr(type(pipeline), "pending", property(lambda self: 0))
+    monkeypatch.setattr(pipeline, "_pending", controller.settings.ingest_max_pending)
+
+    response = client.post("/upload", files=[("file", ("a.txt", b"x", "text/plain"))])
+
+    assert response.status_code == 429
+    assert spooled and not any(os.path.exists(path) for path in spooled)
+
+
+def test_upload_removes_spool_when_lease_fails(client, spooled, monkeypatch):
+    def lease_async(name, create=False):
+        raise OSError("cannot open collection")
+
+    monkeypatch.setattr(controller.collections, "lease_async", lease_async)
+    with pytest.raises(OSError):
+        client.post("/upload", files=[("file", ("a.txt", b"x", "text/plain"))])
+
+    assert spooled and not any(os.path.exists(path) for path in spooled)
+
+
+def test_batch_removes_earlier_spools_when_one_fails(client, spooled):
+    response = client.post("/upload/batch", files=_files("a.txt", "b.txt", "fail.txt"))
+
+    assert response.status_code == 500
+    assert len(spooled) == 2
+    assert not any(os.path.exists(path) for path in spooled)
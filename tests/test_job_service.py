@@ -0,0 +1,66 @@
+# backend/tests/test_job_service.py
+
+"""
+Batch jobs commit in bounded groups and refuse repeated filenames.
+"""
+
+import asyncio
+import pytest
+from config.settings import settings
+from scripts.synthetic_corpus import HashingEmbedder
+from services.collection_service import CollectionManager
+from services.ingest_pipeline import IngestionPipeline
+from services.job_service import JobScheduler
+
+
+@pytest.fixture
+def scheduler(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "faiss_index_dir", tmp_path / "index")
+    monkeypatch.setattr(settings, "embedding_cache_enabled", False)
+    collections = CollectionManager(HashingEmbedder(64))
+    yield JobScheduler(IngestionPipeline(), collections)
+    collections.close()
+
+
+def _spool(tmp_path, name: str, paragraphs: int):
+    path = tmp_path / f"spooled-{name}"
+    path.write_text(
+        "\n\n".join(f"{name} paragraph {i} " * 40 for i in range(paragraphs))
+    )
+    return str(path), name, ".txt"
+
+
+async def _finish(scheduler, files):
+    job = scheduler.submit(files, "default")
+    while job.status in ("queued", "running"):
+        await asyncio.sleep(0.01)
+    await scheduler.shutdown()
+    return job
+
+
+def test_job_commits_in_groups_of_job_commit_chunks(scheduler, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "job_commit_chunks", 4)
+    commits = []
+    commit = scheduler.pipeline.commit
+
+    async def counting_commit(vector_service, chunks, vectors):
+        commits.append(len(chunks))
+        return await commit(vector_service, chunks, vectors)
+
+    monkeypatch.setattr(scheduler.pipeline, "commit", counting_commit)
+    files = [_spool(tmp_path, f"doc{i}.txt", 6) for i in range(3)]
+
+    job = asyncio.run(_finish(scheduler, files))
+
+    assert job.status == "completed"
+    assert all(progress.status == "indexed" for progress in job.files)
+    assert len(commits) > 1
+    assert job.num_chunks_indexed == sum(commits)
+    assert job.num_chunks_indexed == sum(p.chunks_produced for p in job.files)
+
+
+def test_submit_rejects_repeated_filenames(scheduler, tmp_path):
+    files = [_spool(tmp_path, "a.txt", 1), _spool(tmp_path, "b.txt", 1)]
+    files.append((files[0][0], "a.txt", ".txt"))
+    with pytest.raises(ValueError):
+        scheduler.submit(files, "default")
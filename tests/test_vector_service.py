@@ -0,0 +1,82 @@
+# backend/tests/test_vector_service.py
+
+"""
+VectorService searches over deleted rows (tombstones masked by selectors)
+and read-only opens of a directory another VectorService writes.
+"""
+
+import pytest
+from config.settings import settings
+from models.chunk import Chunk
+from scripts.synthetic_corpus import HashingEmbedder
+from services.storage.writer_lock import StoreLockedError
+from services.vector_service import VectorService
+from utils.chunk_util import content_hash
+
+
+def _chunks(source: str, count: int):
+    texts = [f"{source} report {i} patch host{i % 3}" for i in range(count)]
+    return [
+        Chunk(
+            chunk_id=content_hash(text, source),
+            text=text,
+            source=source,
+            type="txt",
+            index=i,
+            metadata={},
+        )
+        for i, text in enumerate(texts)
+    ]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "embedding_cache_enabled", False)
+    service = VectorService(HashingEmbedder(64), index_path=tmp_path)
+    yield service
+    service.close()
+
+
+@pytest.mark.parametrize("mode", ["dense", "hybrid"])
+def test_search_after_delete_returns_only_live_rows(store, mode):
+    store.upsert(_chunks("a.txt", 20) + _chunks("b.txt", 20))
+    assert store.delete_source("a.txt") == 20
+
+    # top_k above the live count makes the search ask each segment for
+    # fewer hits than top_k
+    hits = store.search("report patch host1", top_k=50, mode=mode)
+
+    assert len(hits) == 20
+    assert {chunk.source for chunk, _ in hits} == {"b.txt"}
+
+
+def test_search_after_delete_and_compaction(store):
+    store.upsert(_chunks("a.txt", 20) + _chunks("b.txt", 20))
+    store.delete_source("a.txt")
+    store._compact(force=True)
+
+    hits = store.search("report patch", top_k=50, mode="dense")
+
+    assert {chunk.source for chunk, _ in hits} == {"b.txt"}
+
+
+def test_second_open_is_read_only_and_follows_snapshots(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "reader_refresh_seconds", 0)
+    store.upsert(_chunks("a.txt", 20))
+    store._compact(force=True)
+
+    reader = VectorService(HashingEmbedder(64), index_path=tmp_path)
+    try:
+        assert reader.read_only
+        assert len(reader.search("report", top_k=50, mode="dense")) == 20
+        with pytest.raises(StoreLockedError):
+            reader.delete_source("a.txt")
+
+        store.upsert(_chunks("b.txt", 10))
+        store.delete_source("a.txt")
+        store._compact(force=True)
+
+        hits = reader.search("report", top_k=50, mode="hybrid")
+        assert {chunk.source for chunk, _ in hits} == {"b.txt"}
+    finally:
+        reader.close()
@@ -1,41 +1,74 @@
-from uuid import uuid4
+import hashlib
+import re
+import unicodedata
+from typing import Iterable, Iterator
 from langchain_core.documents import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from config.settings import settings
-from models.chunk import Chunk
+from models.chunk import ChunkRecord
+from utils.chunker import get_chunker
 
+_WHITESPACE = re.compile(r"\s+")
 
-def split_document(docs: list[Document], source: str, suffix: str) -> list[Chunk]:
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalize and collapse whitespace so cosmetic edits hash equal."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def content_hash(text: str, source: str) -> str:
     """
-    Split a list of LangChain Document objects into our Pydantic Chunk models.
+    Deterministic, content-addressed chunk id.
 
-    Uses settings.chunk_size and settings.chunk_overlap to create overlapping
-    text windows, then wraps each in a Chunk with metadata.
+    Args:
+        text (str): Chunk text (normalized before hashing).
+        source (str): Original filename or URL.
+
+    Returns:
+        str: 32-character hex digest, the same width as a uuid4 hex id.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(source.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_text(text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def split_document(
+    docs: Iterable[Document], source: str, suffix: str
+) -> Iterator[ChunkRecord]:
+    """
+    Lazily split LangChain Document objects into ChunkRecords.
+
+    Uses the shared Chunker (see utils.chunker), which cuts exactly like
+    RecursiveCharacterTextSplitter with settings.chunk_size and
+    settings.chunk_overlap and splits chunks longer than
+    settings.chunk_max_tokens of the embedder's tokenizer further. Documents are
+    pulled from `docs` one at a time, so a `lazy_load()` iterator is never
+    materialized. Records of one Document share its metadata dict; call
+    `to_chunk()` before handing one out of the service.
 
     Args:
-        docs (List[Document]): Loaded documents, each with .page_content and .metadata.
+        docs (Iterable[Document]): Loaded documents, each with .page_content and .metadata.
         source (str): Original filename or URL (for citation later).
         suffix (str): File extension (without leading dot), used as the Chunk.type.
 
-    Returns:
-        List[Chunk]: A list of chunks with unique IDs and preserved metadata.
+    Yields:
+        ChunkRecord: Chunks with content-hash IDs and preserved metadata, in order.
+        Re-splitting the same file yields the same IDs.
     """
-    # Split documents into overlapping chunks
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=settings.chunk_size, chunk_overlap=settings.chunk_overlap
+    chunker = get_chunker(
+        settings.chunk_size,
+        settings.chunk_overlap,
+        settings.chunk_max_tokens,
+        settings.embedding_model,
     )
-    split_docs = splitter.split_documents(docs)
-
-    # Wrap the docs into Chunks
-    chunks: list[Chunk] = []
-    for index, doc in enumerate(split_docs):
-        chunk = Chunk(
-            chunk_id=uuid4().hex,
-            text=doc.page_content,
-            source=source,
-            type=suffix.lstrip("."),
-            index=index,
-            metadata=doc.metadata,
-        )
-        chunks.append(chunk)
-    return chunks
+    chunk_type = suffix.lstrip(".")
+
+    index = 0
+    for doc in docs:
+        metadata = dict(doc.metadata)
+        for text in chunker.split_text(doc.page_content):
+            yield ChunkRecord(
+                content_hash(text, source), text, source, chunk_type, index, metadata
+            )
+            index += 1
@@ -0,0 +1,262 @@
+# backend/utils/chunker.py
+
+"""
+Chunker behind `chunk_util.split_document`.
+
+Produces exactly the chunks of LangChain's RecursiveCharacterTextSplitter
+(default separators, separators kept at the start of the following piece,
+whitespace stripped), so chunk ids of existing corpora stay stable. The
+algorithm is the same: split on the coarsest separator present, merge
+pieces shorter than `chunk_size` into windows that keep up to
+`chunk_overlap` characters of the previous one, and recurse into longer
+pieces with the finer separators. It works on (start, end) offsets into
+the original text instead of building, re-joining and measuring
+substrings, and the final character-level cut is computed arithmetically
+instead of one character at a time.
+
+With a token budget, every chunk is measured with the embedder's tokenizer,
+and a chunk that does not fit is split again the same way with a
+proportionally smaller character size, so the embedding model never
+silently truncates it. Chunks that fit are left as LangChain made them.
+"""
+
+import logging
+from collections import deque
+from functools import lru_cache
+from typing import Any, Deque, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEPARATORS = ("\n\n", "\n", " ", "")
+
+Span = Tuple[int, int]
+
+
+@lru_cache(maxsize=None)
+def load_tokenizer(model_name: str) -> Any:
+    """
+    Hugging Face tokenizer of `model_name`, loaded once per process.
+
+    Returns:
+        Any: The tokenizer, or None when transformers or the model files are
+        unavailable.
+    """
+    try:
+        from transformers import AutoTokenizer
+
+        return AutoTokenizer.from_pretrained(model_name)
+    except (ImportError, OSError, ValueError) as e:
+        logger.warning(
+            "Tokenizer for %s unavailable (%s); sizing chunks by characters only",
+            model_name,
+            e,
+        )
+        return None
+
+
+def _pieces(text: str, start: int, end: int, sep: str) -> Iterator[Span]:
+    """
+    Non-empty pieces of text[start:end] split on `sep`, each separator kept
+    at the start of the piece that follows it (re.split semantics).
+    """
+    pos = text.find(sep, start, end)
+    if pos == -1:
+        yield start, end
+        return
+    if pos > start:
+        yield start, pos
+    step = len(sep)
+    while True:
+        following = text.find(sep, pos + step, end)
+        if following == -1:
+            yield pos, end
+            return
+        yield pos, following
+        pos = following
+
+
+class Chunker:
+    """
+    Splits text into chunks of at most `chunk_size` characters sharing up
+    to `chunk_overlap` characters and, with a tokenizer, at most
+    `max_tokens` tokens.
+
+    Args:
+        chunk_size (int): Maximum characters per chunk.
+        chunk_overlap (int): Characters shared by consecutive chunks.
+        separators (Sequence[str]): Preferred break points, coarsest first;
+            "" (a character-level cut) should come last.
+        tokenizer (Any): Hugging Face tokenizer, or None for characters only.
+        max_tokens (int): Token budget per chunk, excluding special tokens.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        separators: Sequence[str] = DEFAULT_SEPARATORS,
+        tokenizer: Any = None,
+        max_tokens: int = 0,
+    ):
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError(
+                f"chunk_overlap ({chunk_overlap}) must be in [0, chunk_size)"
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = tuple(separators)
+        self.tokenizer = tokenizer if max_tokens > 0 else None
+        self.max_tokens = max_tokens
+
+    @staticmethod
+    def _merge(spans: List[Span], size: int, overlap: int, out: List[Span]) -> None:
+        """
+        Merge contiguous pieces into windows of at most `size` characters,
+        each starting with at most `overlap` characters of the previous one
+        (TextSplitter._merge_splits with an empty separator).
+        """
+        window: Deque[Span] = deque()
+        total = 0
+        for start, end in spans:
+            length = end - start
+            if total + length > size and window:
+                out.append((window[0][0], window[-1][1]))
+                while total > overlap or (total + length > size and total > 0):
+                    first_start, first_end = window.popleft()
+                    total -= first_end - first_start
+            window.append((start, end))
+            total += length
+        if window:
+            out.append((window[0][0], window[-1][1]))
+
+    @staticmethod
+    def _cut(start: int, end: int, size: int, overlap: int, out: List[Span]) -> None:
+        """`_merge` over single characters, computed without visiting them."""
+        step = size - overlap
+        while start + size < end:
+            out.append((start, start + size))
+            start += step
+        if start < end:
+            out.append((start, end))
+
+    def _split(
+        self,
+        text: str,
+        start: int,
+        end: int,
+        separators: Sequence[str],
+        size: int,
+        overlap: int,
+        out: List[Span],
+    ) -> None:
+        """RecursiveCharacterTextSplitter._split_text over text[start:end]."""
+        sep, finer = separators[-1], ()
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                sep = candidate
+                break
+            if text.find(candidate, start, end) != -1:
+                sep, finer = candidate, separators[i + 1 :]
+                break
+        if sep == "":
+            if size > 1:
+                self._cut(start, end, size, overlap, out)
+            else:
+                out.extend((i, i + 1) for i in range(start, end))
+            return
+
+        good: List[Span] = []
+        for piece in _pieces(text, start, end, sep):
+            if piece[1] - piece[0] < size:
+                good.append(piece)
+                continue
+            if good:
+                self._merge(good, size, overlap, out)
+                good = []
+            if finer:
+                self._split(text, piece[0], piece[1], finer, size, overlap, out)
+            else:
+                out.append(piece)
+        if good:
+            self._merge(good, size, overlap, out)
+
+    def _chunk_spans(
+        self, text: str, start: int, end: int, size: int, overlap: int
+    ) -> List[Span]:
+        """Stripped, non-empty chunk spans of text[start:end]."""
+        raw: List[Span] = []
+        self._split(text, start, end, self.separators, size, overlap, raw)
+        spans = []
+        for chunk_start, chunk_end in raw:
+            chunk = text[chunk_start:chunk_end]
+            stripped = chunk.lstrip()
+            if not stripped:
+                continue
+            chunk_start += len(chunk) - len(stripped)
+            spans.append((chunk_start, chunk_start + len(stripped.rstrip())))
+        return spans
+
+    def _fit_tokens(self, text: str, spans: List[Span]) -> Iterator[str]:
+        """Yield the chunks of `spans`, re-splitting those over max_tokens."""
+        chunks = [text[start:end] for start, end in spans]
+        encoded = self.tokenizer(chunks, add_special_tokens=False)["input_ids"]
+        for (start, end), chunk, ids in zip(spans, chunks, encoded):
+            tokens = len(ids)
+            size = (end - start) * self.max_tokens // tokens if tokens else 0
+            if tokens <= self.max_tokens or size < 1:
+                yield chunk
+                continue
+            overlap = self.chunk_overlap * size // self.chunk_size
+            yield from self._fit_tokens(
+                text, self._chunk_spans(text, start, end, size, overlap)
+            )
+
+    def spans(self, text: str) -> List[Span]:
+        """
+        (start, end) offsets of the character-sized chunks of `text`, as
+        RecursiveCharacterTextSplitter would cut and strip them.
+        """
+        return self._chunk_spans(
+            text, 0, len(text), self.chunk_size, self.chunk_overlap
+        )
+
+    def split_text(self, text: str) -> Iterator[str]:
+        """Yield the stripped, non-empty chunks of `text` in order."""
+        spans = self.spans(text)
+        if self.tokenizer is not None and spans:
+            yield from self._fit_tokens(text, spans)
+            return
+        for start, end in spans:
+            yield text[start:end]
+
+
+@lru_cache(maxsize=8)
+def get_chunker(
+    chunk_size: int,
+    chunk_overlap: int,
+    max_tokens: int = 0,
+    tokenizer_name: Optional[str] = None,
+) -> Chunker:
+    """
+    Shared Chunker for a configuration (built once per process).
+
+    Args:
+        chunk_size (int): Maximum characters per chunk.
+        chunk_overlap (int): Characters shared by consecutive chunks.
+        max_tokens (int): Model window in tokens, special tokens included
+            (0 sizes by characters only).
+        tokenizer_name (Optional[str]): Hugging Face id of the embedder.
+
+    Returns:
+        Chunker: Token-aware when the tokenizer could be loaded.
+    """
+    tokenizer = None
+    if max_tokens > 0 and tokenizer_name:
+        tokenizer = load_tokenizer(tokenizer_name)
+    if tokenizer is not None:
+        max_tokens -= tokenizer.num_special_tokens_to_add()
+    return Chunker(
+        chunk_size, chunk_overlap, tokenizer=tokenizer, max_tokens=max_tokens
+    )